@@ -0,0 +1,231 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Benchmarks for TecMFA log processing.
+
+--imports: cold start of each kind of process - every sample is a fresh interpreter importing only what that
+process needs. "before split" is what every process paid when the log parser imported plotly & pythonping at load.
+    python TecMFA_benchmark.py --imports [--repeat 5]
+
+--memory LOG: bytes held per parsed instance of LOG, Instance records vs the dict records used before 2.8.
+    python TecMFA_benchmark.py --memory .\temp\<host>\TecMFALogs.txt
+
+--scan LOG: parse throughput (MB/s, instances/s) of LOG finding marker lines in the memory mapped log vs reading 
+& matching it line by line (TecMFA_parser_core.mmap_scan). Use a log of 100MB+ so the result isn't just start up.
+    python TecMFA_benchmark.py --scan big.log [--repeat 3]
+
+--suite: synthetic logs (TecMFA_log_generator) of each of --sizes, each parsed, summarised & rendered in a fresh 
+interpreter - lines/s, instances/s, seconds per stage & peak RSS after each stage. Logs are kept in --dir and 
+reused by later runs. Render needs plotly.
+    python TecMFA_benchmark.py --suite [--sizes 1MB,100MB,1GB] [--dir .\benchmark]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+import_targets = [ # (process, statement executed in a fresh interpreter)
+    ("parse worker (TecMFA_parser_core)", "import TecMFA_parser_core"),
+    ("collector (TechMFA_log_parser_2.7.py)",
+        "import importlib.util; spec = importlib.util.spec_from_file_location('collector', 'TechMFA_log_parser_2.7.py'); "
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))"),
+    ("render worker (TecMFA_report)", "import TecMFA_report"),
+    ("before split (plotly + pythonping)", "import plotly.graph_objects, plotly.subplots, pythonping"),
+]
+
+probe = """
+import time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+except ImportError: # Windows
+    peak = float("nan")
+print(seconds, peak)
+"""
+
+def time_import(statement, repeat):
+    """
+    Returns (median seconds, median peak RSS MB) of statement over repeat fresh interpreters, None if it failed
+    (e.g. plotly not installed).
+    """
+    seconds = []
+    peaks = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", probe.format(statement=statement)], cwd=here, capture_output=True, text=True
+            )
+        if result.returncode != 0:
+            return None
+        elapsed, peak = result.stdout.split()
+        seconds.append(float(elapsed))
+        peaks.append(float(peak))
+    return (statistics.median(seconds), statistics.median(peaks))
+
+def benchmark_imports(repeat):
+    print("{:<42} {:>12} {:>14}".format("process", "import (ms)", "peak RSS (MB)"))
+    for name, statement in import_targets:
+        measured = time_import(statement, repeat)
+        if measured is None:
+            print("{:<42} {:>12}".format(name, "unavailable"))
+        else:
+            print("{:<42} {:>12.1f} {:>14.1f}".format(name, measured[0] * 1000, measured[1]))
+
+suite_probe = """
+import json, os, sys, time
+sys.path.insert(0, {here!r})
+import TecMFA_parser_core
+
+def peak(): 
+    try: 
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # MB on Linux
+    except ImportError: # Windows
+        return float("nan")
+
+stages = dict()
+start = time.perf_counter()
+block = TecMFA_parser_core.process_log({path!r})
+block.pop("Checkpoint")
+stages["Parse"] = [time.perf_counter() - start, peak()]
+start = time.perf_counter()
+summary = TecMFA_parser_core.calculate_summary_table_data(block)
+stages["Summarise"] = [time.perf_counter() - start, peak()]
+try: 
+    import TecMFA_report
+except ImportError: # plotly not installed
+    stages["Render"] = None
+else: 
+    os.makedirs(r".\\report", exist_ok=True)
+    start = time.perf_counter()
+    TecMFA_report.plot_graph("graph: individual host", block, summary)
+    stages["Render"] = [time.perf_counter() - start, peak()]
+print(json.dumps({{"Instances": len(block["Data"]), "Stages": stages}}))
+"""
+
+def count_lines(path): 
+    lines = 0
+    with open(path, "rb") as log: 
+        for chunk in iter(lambda: log.read(1024 * 1024), b""): 
+            lines += chunk.count(b"\n")
+    return lines
+
+def synthetic_log(directory, size): 
+    """
+    Path of a synthetic log of size (e.g. "100MB") in directory, generated unless already there.
+    """
+    import TecMFA_log_generator
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "synthetic_{}.txt".format(size.upper()))
+    if not os.path.exists(path): 
+        print("Generating {} ...".format(path))
+        TecMFA_log_generator.generate_log(path, TecMFA_log_generator.parse_size(size))
+    return path
+
+def benchmark_suite(sizes, directory):
+    print("{:<8} {:>10} {:>10} {:>12} {:>12} {:>10} {:>10} {:>10} {:>12}".format(
+        "size", "lines", "instances", "lines/s", "instances/s", "parse s", "summary s", "render s", "peak RSS MB"
+    ))
+    for size in sizes: 
+        path = os.path.abspath(synthetic_log(directory, size))
+        lines = count_lines(path)
+        result = subprocess.run(
+            [sys.executable, "-c", suite_probe.format(here=here, path=path)], cwd=os.path.abspath(directory), 
+            capture_output=True, text=True
+            )
+        if result.returncode != 0: 
+            print("{:<8} failed: {}".format(size, result.stderr.strip().splitlines()[-1:]))
+            continue
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        stages = measured["Stages"]
+        parse_seconds = stages["Parse"][0]
+        render = "{:.2f}".format(stages["Render"][0]) if stages["Render"] else "n/a"
+        peak = max(stage[1] for stage in stages.values() if stage)
+        print("{:<8} {:>10} {:>10} {:>12.0f} {:>12.0f} {:>10.2f} {:>10.2f} {:>10} {:>12.1f}".format(
+            size, lines, measured["Instances"], lines / parse_seconds, measured["Instances"] / parse_seconds, 
+            parse_seconds, stages["Summarise"][0], render, peak
+        ))
+
+def instance_memory(path, record):
+    """
+    Returns (instances, bytes allocated & still held per instance) of process_log(path) with record as the 
+    type of instance records.
+    """
+    import TecMFA_parser_core
+    TecMFA_parser_core.instance_record = record
+    gc.collect()
+    tracemalloc.start()
+    try: 
+        processed = TecMFA_parser_core.process_log(path)
+        processed.pop("Checkpoint") # only Data is kept once committed
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+    finally: 
+        tracemalloc.stop()
+        TecMFA_parser_core.instance_record = TecMFA_parser_core.Instance
+    count = len(processed["Data"])
+    return (count, held / count if count else 0)
+
+def benchmark_memory(path):
+    import TecMFA_parser_core
+    print("{:<28} {:>10} {:>20}".format("records", "instances", "bytes per instance"))
+    for name, record in (("dict (before)", dict), ("Instance (__slots__)", TecMFA_parser_core.Instance)): 
+        count, per_instance = instance_memory(path, record)
+        print("{:<28} {:>10} {:>20.0f}".format(name, count, per_instance))
+
+def time_scan(path, mapped, repeat): 
+    """
+    Returns (instances, median seconds) of parsing path with stream_log, mapped: TecMFA_parser_core.mmap_scan.
+    """
+    import TecMFA_parser_core
+    TecMFA_parser_core.mmap_scan = mapped
+    seconds = []
+    try: 
+        for _ in range(repeat): 
+            start = time.perf_counter()
+            count = sum(1 for instance in TecMFA_parser_core.stream_log(path))
+            seconds.append(time.perf_counter() - start)
+    finally: 
+        TecMFA_parser_core.mmap_scan = True
+    return (count, statistics.median(seconds))
+
+def benchmark_scan(path, repeat):
+    size = os.path.getsize(path) / 1024 / 1024
+    print("{} - {:.1f} MB".format(path, size))
+    print("{:<28} {:>10} {:>10} {:>14}".format("reader", "seconds", "MB/s", "instances/s"))
+    for name, mapped in (("line by line", False), ("mmap", True)): 
+        count, seconds = time_scan(path, mapped, repeat)
+        print("{:<28} {:>10.2f} {:>10.1f} {:>14.0f}".format(name, seconds, size / seconds, count / seconds))
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description="TecMFA benchmarks")
+    arguments.add_argument("--imports", action="store_true", help="cold start import time of each process type")
+    arguments.add_argument("--memory", metavar="LOG", help="bytes per parsed instance of LOG, dict vs Instance records")
+    arguments.add_argument("--scan", metavar="LOG", help="parse throughput of LOG, mmap vs line by line")
+    arguments.add_argument("--suite", action="store_true", help="parse / summarise / render synthetic logs of --sizes")
+    arguments.add_argument("--sizes", default="1MB,100MB,1GB", help="comma separated sizes of synthetic logs for --suite")
+    arguments.add_argument("--dir", default=r".\benchmark", help="where --suite keeps its synthetic logs")
+    arguments.add_argument("--repeat", type=int, default=5, help="samples per measurement (median reported)")
+    args = arguments.parse_args()
+
+    if args.imports:
+        benchmark_imports(args.repeat)
+    elif args.memory: 
+        benchmark_memory(args.memory)
+    elif args.scan: 
+        benchmark_scan(args.scan, args.repeat)
+    elif args.suite: 
+        benchmark_suite(args.sizes.split(","), args.dir)
+    else:
+        arguments.print_help()
@@ -0,0 +1,173 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Summary of instances held as typed columns (numpy) instead of a list of dicts - for months of history across the
+whole fleet rather than one nightly log. Same output as TecMFA_parser_core.calculate_summary_table_data.
+
+Columns:
+    End_to_end, Okta_to_end: float64, nan where not calculated ("" / NULL)
+    Auth_type, Auth_sub_type, Network_type, Outcome: int8 codes, index into the *_codes lists below (0 = anything else)
+    Errors: int32, length of the instance's Errors
+
+numpy is imported here & nowhere in the parse core, so parse workers don't load it.
+"""
+import math
+import numpy as np
+from TecMFA_parser_core import new_sketch, sketch_log_gamma
+
+auth_type_codes = ["", "Online", "Offline"]
+auth_sub_type_codes = ["", "SMS:OKTA", "PUSH:OKTA", "24hr | Office"]
+network_type_codes = ["", "4G", "VPN", "LAN"] # "" also holds None (no IP), sketched as "Unknown"
+outcome_codes = ["", "Success", "Failed / Cancelled"]
+
+def code_lookup(codes):
+    return dict((value, code) for code, value in enumerate(codes))
+
+auth_type_lookup = code_lookup(auth_type_codes)
+auth_sub_type_lookup = code_lookup(auth_sub_type_codes)
+network_type_lookup = code_lookup(network_type_codes)
+outcome_lookup = code_lookup(outcome_codes)
+
+def to_float(value):
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except Exception as e:
+        print("c:", e)
+        return math.nan
+
+def columns_from_rows(rows):
+    """
+    rows: iterable of (auth_type, auth_sub_type, network_type, outcome, errors length, end_to_end, okta_to_end)
+    e.g. straight from a query of the instances table. One pass, each column appended as it goes.
+    """
+    auth_type, auth_sub_type, network_type, outcome, errors, end_to_end, okta_to_end = [], [], [], [], [], [], []
+    for row in rows:
+        auth_type.append(auth_type_lookup.get(row[0], 0))
+        auth_sub_type.append(auth_sub_type_lookup.get(row[1], 0))
+        network_type.append(network_type_lookup.get(row[2], 0))
+        outcome.append(outcome_lookup.get(row[3], 0))
+        errors.append(row[4] or 0)
+        end_to_end.append(to_float(row[5]))
+        okta_to_end.append(to_float(row[6]))
+    return {
+        "Auth_type": np.array(auth_type, dtype=np.int8),
+        "Auth_sub_type": np.array(auth_sub_type, dtype=np.int8),
+        "Network_type": np.array(network_type, dtype=np.int8),
+        "Outcome": np.array(outcome, dtype=np.int8),
+        "Errors": np.array(errors, dtype=np.int32),
+        "End_to_end": np.array(end_to_end, dtype=np.float64),
+        "Okta_to_end": np.array(okta_to_end, dtype=np.float64)
+    }
+
+def columns_from_block(block):
+    """
+    Columns of block["Data"] (process_log output).
+    """
+    return columns_from_rows(
+        (
+            instance["Auth_type"], instance["Auth_sub_type"], instance["Network_type"], instance["Outcome"],
+            len(instance["Errors"]), instance["End_to_end"], instance["Okta_to_end"]
+        ) for instance in block["Data"]
+    )
+
+def running_sum(values):
+    """
+    Sum of values (nan skipped) added left to right like the loop in calculate_summary_table_data - np.sum adds
+    pairwise so the last digits would differ. 0 (int) when there's nothing to add, as the loop leaves it.
+    """
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return 0
+    return float(np.cumsum(values)[-1])
+
+def sketch_array(values):
+    """
+    new_sketch of values (nan skipped) - log bucket of every value at once, counted with np.unique.
+    """
+    values = values[~np.isnan(values)]
+    sketch = new_sketch()
+    sketch["Count"] = int(len(values))
+    positive = values[values > 0]
+    sketch["Zero"] = sketch["Count"] - int(len(positive))
+    if len(positive):
+        indexes, counts = np.unique(np.ceil(np.log(positive) / sketch_log_gamma).astype(np.int64), return_counts=True)
+        sketch["Bins"] = dict((str(int(index)), int(count)) for index, count in zip(indexes, counts))
+    return sketch
+
+def sketch_columns(columns):
+    """
+    Same as TecMFA_parser_core.sketch_durations, from columns.
+    """
+    sketches = {
+        "End_to_end": sketch_array(columns["End_to_end"]),
+        "Okta_to_end": sketch_array(columns["Okta_to_end"]),
+        "Network_type": {}
+    }
+    for code in np.unique(columns["Network_type"]):
+        mask = columns["Network_type"] == code
+        sketches["Network_type"][network_type_codes[code] or "Unknown"] = {
+            "End_to_end": sketch_array(columns["End_to_end"][mask]),
+            "Okta_to_end": sketch_array(columns["Okta_to_end"][mask])
+        }
+    return sketches
+
+def calculate_summary_from_columns(columns):
+    """
+    calculate_summary_table_data from columns: counts from bincount of the codes, sums & success counts from masks.
+    """
+    total = len(columns["Auth_type"])
+    auth_counts = np.bincount(columns["Auth_type"], minlength=len(auth_type_codes))
+    sub_type_counts = np.bincount(columns["Auth_sub_type"], minlength=len(auth_sub_type_codes))
+    network_counts = np.bincount(columns["Network_type"], minlength=len(network_type_codes))
+    success = columns["Outcome"] == outcome_lookup["Success"]
+    online = columns["Auth_type"] == auth_type_lookup["Online"]
+    offline = columns["Auth_type"] == auth_type_lookup["Offline"]
+
+    summary = {
+        "Block_instance_total": total,
+        "Online": {
+            "Count": int(auth_counts[auth_type_lookup["Online"]]), "Online_%": 0, "Success_%": 0,
+            "Success_count": int(np.count_nonzero(online & success))
+            },
+        "Offline": {
+            "Count": int(auth_counts[auth_type_lookup["Offline"]]), "Offline_%": 0, "Success_%": 0,
+            "Success_count": int(np.count_nonzero(offline & success))
+            },
+        "Auth_sub_type": {
+            "24hr_or_office_count": int(sub_type_counts[auth_sub_type_lookup["24hr | Office"]]),
+            "SMS:OKTA_count": int(sub_type_counts[auth_sub_type_lookup["SMS:OKTA"]]),
+            "PUSH:OKTA_count": int(sub_type_counts[auth_sub_type_lookup["PUSH:OKTA"]])
+        },
+        "Errors": {
+            "Count": int(columns["Errors"].sum(dtype=np.int64))
+        },
+        "Network_type": {
+            "4G_count": int(network_counts[network_type_lookup["4G"]]),
+            "VPN_count": int(network_counts[network_type_lookup["VPN"]]),
+            "LAN_count": int(network_counts[network_type_lookup["LAN"]]),
+            "4G_%": 0, "VPN_%": 0, "LAN_%": 0 # never calculated by calculate_summary_table_data either (checks _% != 0)
+        },
+        "End_to_end_sums": {
+            "Online": running_sum(columns["End_to_end"][online]),
+            "Offline": running_sum(columns["End_to_end"][offline]),
+        },
+        "End_to_end_averages": {"Online": 0, "Offline": 0},
+        "Okta_to_end_sums": running_sum(columns["Okta_to_end"][online]),
+        "Okta_to_end_averages": 0,
+        "Sketches": sketch_columns(columns)
+    }
+
+    if summary["Online"]["Count"] != 0:
+        summary["End_to_end_averages"]["Online"] = round(summary["End_to_end_sums"]["Online"] / summary["Online"]["Count"], 2)
+        summary["Online"]["Online_%"] = round(summary["Online"]["Count"] / total * 100, 1)
+        summary["Online"]["Success_%"] = round(summary["Online"]["Success_count"] / summary["Online"]["Count"] * 100, 1)
+        summary["Okta_to_end_averages"] = round(summary["Okta_to_end_sums"] / summary["Online"]["Count"], 2)
+    if summary["Offline"]["Count"] != 0:
+        summary["End_to_end_averages"]["Offline"] = round(summary["End_to_end_sums"]["Offline"] / summary["Offline"]["Count"], 2)
+        summary["Offline"]["Offline_%"] = round(summary["Offline"]["Count"] / total * 100, 1)
+        summary["Offline"]["Success_%"] = round(summary["Offline"]["Success_count"] / summary["Offline"]["Count"] * 100, 1)
+    return summary
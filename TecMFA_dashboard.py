@@ -0,0 +1,431 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Fleet dashboard: .\dashboard\index.html backed by pre-aggregated data shards the page loads when they're needed,
+instead of one giant cumulative / violin figure holding every host. Opening it loads only the manifest, picking a
+tenancy loads its hosts & daily trend, picking a day loads the hosts of that day. Hosts are searched, filtered by
+network type, sorted & paged in the browser so 10k+ hosts stay quick.
+
+    dashboard\index.html
+    dashboard\manifest.js                     tenancies, network types, days
+    dashboard\<tenancy>\hosts.js              one row per host - machineName, latest averages, p50/p90, last collected
+    dashboard\<tenancy>\days.js               per day & network type: counts, success, averages, p50/p90/p99
+    dashboard\<tenancy>\day\<YYYY-MM-DD>.js   per host & network type of that day: counts & averages
+
+Shards are JSON handed to tecmfa_shard(name, data) & loaded with a <script> tag - fetch() of a file isn't
+allowed when the page is opened from disk / a share. Only the days that received instances since the last build
+started (instances.ingested, set when a host is committed) are aggregated again - whatever their date, so a host
+collected days late still lands in its days - every other day is kept from build.json. The whole history is only
+re-read when the tenancies change or with --full.
+
+    python TecMFA_dashboard.py [--full]       (also run by TechMFA_log_parser after each window)
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime as dt
+from TecMFA_parser_core import new_sketch, sketch_log_gamma, sketch_percentiles
+
+event_store = r".\tecmfa.sqlite" # written by TechMFA_log_parser
+dashboard_dir = r".\dashboard"
+tenancy_hostlists = {} # tenancy: hostlist (one host per line, as in hostlist.txt - the event store's host key) e.g. {"tenancy_a": r".\xxx.txt", "tenancy_b": r".\yyy.txt"}
+default_tenancy = "Fleet" # tenancy of hosts in none of tenancy_hostlists
+
+def load_tenancies():
+    """
+    {host: tenancy} from tenancy_hostlists, first hostlist listing a host wins. Hosts not listed: default_tenancy.
+    """
+    tenancy_of = dict()
+    for tenancy, hostlist in tenancy_hostlists.items():
+        try:
+            with open(hostlist, "r") as f:
+                for host in f:
+                    tenancy_of.setdefault(host.strip(), tenancy)
+        except Exception as e:
+            print("db1:", e)
+    tenancy_of.pop("", None)
+    return tenancy_of
+
+def tenancy_key(tenancy): # directory name of a tenancy's shards
+    return re.sub(r"[^\w.-]", "_", tenancy)
+
+def write_shard(path, name, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as shard:
+        shard.write("tecmfa_shard({}, ".format(json.dumps(name)))
+        json.dump(data, shard, separators=(",", ":"))
+        shard.write(");\n")
+
+def new_aggregate():
+    return {
+        "Count": 0, "Online": 0, "Offline": 0, "Success": 0, "Errors": 0, "Hosts": set(),
+        "End_to_end_sum": 0.0, "Okta_to_end_sum": 0.0, "End_to_end": new_sketch(), "Okta_to_end": new_sketch()
+    }
+
+def sketch_bucket(value): # bin of value in a sketch (as sketch_add), None for the Zero count
+    return str(math.ceil(math.log(value) / sketch_log_gamma)) if value > 0 else None
+
+def sketch_count(sketch, bucket):
+    sketch["Count"] += 1
+    if bucket is None:
+        sketch["Zero"] += 1
+    else:
+        sketch["Bins"][bucket] = sketch["Bins"].get(bucket, 0) + 1
+
+def aggregate_add(aggregate, host, online, offline, success, has_errors, end_to_end, okta_to_end, end_to_end_bucket, okta_to_end_bucket):
+    aggregate["Count"] += 1
+    aggregate["Hosts"].add(host)
+    aggregate["Online"] += online
+    aggregate["Offline"] += offline
+    aggregate["Success"] += success
+    aggregate["Errors"] += has_errors
+    if end_to_end is not None:
+        aggregate["End_to_end_sum"] += end_to_end
+        sketch_count(aggregate["End_to_end"], end_to_end_bucket)
+    if okta_to_end is not None:
+        aggregate["Okta_to_end_sum"] += okta_to_end
+        sketch_count(aggregate["Okta_to_end"], okta_to_end_bucket)
+
+def aggregate_finish(aggregate):
+    """
+    Aggregate as it goes in a shard: sums & sketches replaced by averages & percentiles.
+    """
+    timed = aggregate["End_to_end"]["Count"]
+    okta_timed = aggregate["Okta_to_end"]["Count"]
+    return {
+        "Count": aggregate["Count"], "Online": aggregate["Online"], "Offline": aggregate["Offline"],
+        "Success": aggregate["Success"], "Errors": aggregate["Errors"], "Hosts": len(aggregate["Hosts"]),
+        "End_to_end_avg": round(aggregate["End_to_end_sum"] / timed, 2) if timed else 0,
+        "Okta_to_end_avg": round(aggregate["Okta_to_end_sum"] / okta_timed, 2) if okta_timed else 0,
+        "End_to_end": sketch_percentiles(aggregate["End_to_end"]),
+        "Okta_to_end": sketch_percentiles(aggregate["Okta_to_end"])
+    }
+
+day_host_columns = ["Host", "Network", "Instances", "Online", "Offline", "Success", "Errors", "Avg end to end", "Avg Okta"]
+
+def day_host_rows(host_day):
+    """
+    Rows of day_host_columns from {(host, network type): [count, online, offline, success, errors, end to end sum, 
+    timed, okta sum, okta timed]} - counts & averages only, no percentiles per host per day.
+    """
+    rows = []
+    for (host, network_type), (count, online, offline, success, errors, end_to_end, timed, okta_to_end, okta_timed) in sorted(host_day.items()):
+        rows.append([
+            host, network_type, count, online, offline, success, errors, 
+            round(end_to_end / timed, 2) if timed else 0, round(okta_to_end / okta_timed, 2) if okta_timed else 0
+        ])
+    return rows
+
+def aggregate_days(connection, ingested_since, tenancy_of):
+    """
+    One pass over the instances of every day that received an instance at / after ingested_since (epoch seconds,
+    None: every instance).
+    Returns ({tenancy: {day: {network type / "All": aggregate}}}, 
+             {tenancy: {day: {(host, network type): [count, online, offline, success, errors, sums & timed...]}}})
+    """
+    query = "SELECT date, host, network_type, auth_type, outcome, coalesce(errors, '') != '', end_to_end, okta_to_end FROM instances"
+    parameters = ()
+    if ingested_since is not None:
+        query += " WHERE date IN (SELECT DISTINCT date FROM instances WHERE ingested >= ?)"
+        parameters = (ingested_since,)
+    days = dict()
+    host_days = dict()
+    for day, host, network_type, auth_type, outcome, has_errors, end_to_end, okta_to_end in connection.execute(query, parameters):
+        tenancy = tenancy_of.get(host, default_tenancy)
+        network_type = network_type or "Unknown"
+        online = auth_type == "Online"
+        offline = auth_type == "Offline"
+        success = outcome == "Success"
+        end_to_end_bucket = sketch_bucket(end_to_end) if end_to_end is not None else None # bucketed once for both aggregates
+        okta_to_end_bucket = sketch_bucket(okta_to_end) if okta_to_end is not None else None
+        day_aggregates = days.setdefault(tenancy, {}).setdefault(day, {})
+        for key in ("All", network_type):
+            aggregate = day_aggregates.get(key)
+            if aggregate is None:
+                aggregate = day_aggregates[key] = new_aggregate()
+            aggregate_add(aggregate, host, online, offline, success, has_errors, end_to_end, okta_to_end, end_to_end_bucket, okta_to_end_bucket)
+        host_day = host_days.setdefault(tenancy, {}).setdefault(day, {})
+        totals = host_day.get((host, network_type))
+        if totals is None:
+            totals = host_day[(host, network_type)] = [0, 0, 0, 0, 0, 0.0, 0, 0.0, 0]
+        totals[0] += 1
+        totals[1] += online
+        totals[2] += offline
+        totals[3] += success
+        totals[4] += has_errors
+        if end_to_end is not None:
+            totals[5] += end_to_end
+            totals[6] += 1
+        if okta_to_end is not None:
+            totals[7] += okta_to_end
+            totals[8] += 1
+    return (days, host_days)
+
+host_columns = [
+    "Host", "Hostname", "Last_day", "Online_avg", "Offline_avg", "Okta_avg", "Instances", "End_to_end_p50", "End_to_end_p90",
+    "Okta_to_end_p50", "Okta_to_end_p90", "Network_types", "Last_collected"
+]
+
+def host_rows(connection, tenancy_of):
+    """
+    {tenancy: [row of host_columns, ...]} of every host in daily_averages / host_sketches - one row per host
+    from the per host tables, no instance is read. Host is the hostlist name every table is keyed by, Hostname
+    the machineName of its log (host_summaries) which its report is named after.
+    """
+    hosts = dict()
+    for host, day, online, offline, okta in connection.execute(
+        "SELECT host, day, online_end_to_end, offline_end_to_end, okta_to_end FROM daily_averages ORDER BY host, day"
+    ):
+        hosts[host] = [host, None, day, online, offline, okta, 0, 0, 0, 0, 0, [], None] # last day wins
+    for host, sketches in connection.execute("SELECT host, sketches FROM host_sketches"):
+        row = hosts.setdefault(host, [host, None, None, None, None, None, 0, 0, 0, 0, 0, [], None])
+        try:
+            sketches = json.loads(sketches)
+            end_to_end = sketch_percentiles(sketches["End_to_end"])
+            okta_to_end = sketch_percentiles(sketches["Okta_to_end"])
+            row[6:12] = [
+                sketches["End_to_end"]["Count"], end_to_end["p50"], end_to_end["p90"], okta_to_end["p50"],
+                okta_to_end["p90"], sorted(sketches["Network_type"])
+            ]
+        except Exception as e:
+            print("db2:", host, e)
+    try:
+        for host, hostname in connection.execute("SELECT host, hostname FROM host_summaries"):
+            if host in hosts:
+                hosts[host][1] = hostname
+    except sqlite3.OperationalError: # store from before host_summaries
+        pass
+    try:
+        for host, last_collected in connection.execute("SELECT host, last_collected FROM host_history"):
+            if host in hosts and last_collected:
+                hosts[host][12] = dt.fromtimestamp(last_collected).strftime("%Y-%m-%d %H:%M")
+    except sqlite3.OperationalError: # no host_history yet
+        pass
+    rows = dict()
+    for host in sorted(hosts):
+        rows.setdefault(tenancy_of.get(host, default_tenancy), []).append(hosts[host])
+    return rows
+
+def load_build_state():
+    try:
+        with open(os.path.join(dashboard_dir, "build.json"), "r") as f:
+            return json.load(f)
+    except Exception: # first build
+        return {"Built": None, "Build_start": None, "Tenancies": None, "Days": {}}
+
+def build_dashboard(store=None, full=False):
+    """
+    Write / bring up to date the dashboard from the event store (default event_store). Returns number of days
+    aggregated.
+    """
+    build_start = time.time()
+    tenancy_of = load_tenancies()
+    state = load_build_state()
+    since = state.get("Build_start") # instances committed while the last build ran are picked up by this one
+    if full or since is None or state["Tenancies"] != tenancy_of:
+        since = None
+        state["Days"] = dict()
+
+    connection = sqlite3.connect(store or event_store)
+    try:
+        days, host_days = aggregate_days(connection, since, tenancy_of)
+        hosts = host_rows(connection, tenancy_of)
+    finally:
+        connection.close()
+
+    aggregated = 0
+    for tenancy in days:
+        key = tenancy_key(tenancy)
+        tenancy_days = state["Days"].setdefault(tenancy, {})
+        for day in days[tenancy]:
+            tenancy_days[day] = dict((network_type, aggregate_finish(aggregate)) for network_type, aggregate in days[tenancy][day].items())
+            write_shard(
+                os.path.join(dashboard_dir, key, "day", day + ".js"), "{}/day/{}".format(key, day),
+                {"Day": day, "Columns": day_host_columns, "Rows": day_host_rows(host_days[tenancy][day])}
+            )
+            aggregated += 1
+    network_types = set()
+    for tenancy in set(state["Days"]) | set(hosts):
+        key = tenancy_key(tenancy)
+        tenancy_days = state["Days"].get(tenancy, {})
+        for day in tenancy_days:
+            network_types.update(network_type for network_type in tenancy_days[day] if network_type != "All")
+        write_shard(os.path.join(dashboard_dir, key, "days.js"), key + "/days", dict(sorted(tenancy_days.items())))
+        write_shard(os.path.join(dashboard_dir, key, "hosts.js"), key + "/hosts", {"Columns": host_columns, "Rows": hosts.get(tenancy, [])})
+
+    state["Built"] = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+    state["Build_start"] = build_start
+    state["Tenancies"] = tenancy_of
+    write_shard(os.path.join(dashboard_dir, "manifest.js"), "manifest", {
+        "Built": state["Built"],
+        "Network_types": sorted(network_types),
+        "Tenancies": [
+            {
+                "Name": tenancy, "Key": tenancy_key(tenancy), "Hosts": len(hosts.get(tenancy, [])),
+                "First_day": min(state["Days"].get(tenancy) or [None]), "Last_day": max(state["Days"].get(tenancy) or [None])
+            } for tenancy in sorted(set(state["Days"]) | set(hosts))
+        ]
+    })
+    with open(os.path.join(dashboard_dir, "build.json"), "w") as f:
+        json.dump(state, f)
+    with open(os.path.join(dashboard_dir, "index.html"), "w") as f:
+        f.write(dashboard_page)
+    print("Dashboard: {} tenancy days aggregated{}, {} hosts, {:.1f}s".format(
+        aggregated, "" if since is None else " (ingested since {})".format(dt.fromtimestamp(since).strftime("%Y-%m-%d %H:%M:%S")), sum(len(rows) for rows in hosts.values()),
+        time.time() - build_start
+    ))
+    return aggregated
+
+dashboard_page = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>TecMFA fleet</title>
+<style>
+    body { font-family: Courier New, monospace; color: RebeccaPurple; margin: 20px; }
+    table { border-collapse: collapse; margin: 10px 0; }
+    th { background: grey; color: white; cursor: pointer; padding: 4px 8px; }
+    td { border: 1px solid darkslategray; color: darkslategray; padding: 2px 8px; text-align: center; }
+    tr:nth-child(even) td { background: lightgrey; }
+    .day { cursor: pointer; }
+    #chart { height: 400px; }
+</style>
+</head>
+<body>
+<h2>TecMFA fleet <small id="built"></small></h2>
+<div>
+    Tenancy <select id="tenancy"></select>
+    Network <select id="network"><option value="All">All</option></select>
+    Host <input id="search" placeholder="search hosts">
+    Days <select id="range"><option>30</option><option>90</option><option>365</option><option value="0">all</option></select>
+</div>
+<div id="chart"></div>
+<h3>Daily <small>(click a day for its hosts)</small></h3>
+<table id="days"></table>
+<h3 id="hosts_title">Hosts</h3>
+<div><button id="previous">&lt;</button> <span id="page"></span> <button id="next">&gt;</button></div>
+<table id="hosts"></table>
+<script>
+var shards = {}, waiting = {}, manifest = null, tenancy = null, day = null, sortColumn = 0, sortDescending = false, page = 0, pageRows = 100;
+function tecmfa_shard(name, data) { shards[name] = data; (waiting[name] || []).forEach(function (done) { done(data); }); delete waiting[name]; }
+function load(name, done) { // data shard <name>.js, once
+    if (shards[name]) { return done(shards[name]); }
+    if (waiting[name]) { return waiting[name].push(done); }
+    waiting[name] = [done];
+    var script = document.createElement("script");
+    script.src = name + ".js";
+    document.head.appendChild(script);
+}
+function $(id) { return document.getElementById(id); }
+function escape(value) { // text of host / tenancy / network names etc. safe to put in HTML & quoted attributes
+    return String(value === null || value === undefined ? "" : value).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+}
+function cells(tag, values) { // values escaped, but for {html: markup already escaped} e.g. a link
+    return "<tr>" + values.map(function (value) { return "<" + tag + ">" + (value !== null && typeof value === "object" && "html" in value ? value.html : escape(value)) + "</" + tag + ">"; }).join("") + "</tr>";
+}
+function network() { return $("network").value; }
+
+function showDays() {
+    load(tenancy + "/days", function (days) {
+        var names = Object.keys(days).sort(), range = parseInt($("range").value, 10);
+        if (range) { names = names.slice(-range); }
+        var rows = names.map(function (name) { return [name, days[name][network()]]; }).filter(function (row) { return row[1]; });
+        $("days").innerHTML = cells("th", ["Day", "Instances", "Hosts", "Online", "Offline", "Success %", "Errors", "Avg end to end", "p50", "p90", "p99", "Avg Okta", "Okta p90"]) +
+            rows.slice().reverse().map(function (row) {
+                var a = row[1];
+                return cells("td", [row[0], a.Count, a.Hosts, a.Online, a.Offline, (a.Success / a.Count * 100).toFixed(1), a.Errors, a.End_to_end_avg,
+                    a.End_to_end.p50, a.End_to_end.p90, a.End_to_end.p99, a.Okta_to_end_avg, a.Okta_to_end.p90]).replace("<tr>", '<tr class="day" data-day="' + escape(row[0]) + '">');
+            }).join("");
+        Array.prototype.forEach.call(document.querySelectorAll("tr.day"), function (row) {
+            row.onclick = function () { day = row.getAttribute("data-day"); page = 0; showHosts(); };
+        });
+        if (window.Plotly) {
+            var x = rows.map(function (row) { return row[0]; });
+            Plotly.react("chart", ["p50", "p90", "p99"].map(function (q) {
+                return {x: x, y: rows.map(function (row) { return row[1].End_to_end[q]; }), name: "End to end " + q, type: "scattergl", mode: "lines"};
+            }).concat([{x: x, y: rows.map(function (row) { return row[1].Okta_to_end.p50; }), name: "Okta p50", type: "scattergl", mode: "lines"}]),
+                {title: "Daily durations (sec)", margin: {t: 40}});
+        }
+    });
+}
+
+function hostTable(done) { // rows of the hosts table: every host of the tenancy, or the hosts of the day picked
+    if (day === null) {
+        load(tenancy + "/hosts", function (hosts) {
+            var networkColumn = hosts.Columns.indexOf("Network_types");
+            done(hosts.Columns, hosts.Rows.filter(function (row) { return network() === "All" || row[networkColumn].indexOf(network()) !== -1; }));
+        });
+    } else {
+        load(tenancy + "/day/" + day, function (shard) {
+            done(shard.Columns, shard.Rows.filter(function (row) { return network() === "All" || row[1] === network(); }));
+        });
+    }
+}
+
+function showHosts() {
+    $("hosts_title").innerHTML = day === null ? "Hosts" : "Hosts on " + escape(day) + ' <button id="all_days">all days</button>';
+    if (day !== null) { $("all_days").onclick = function () { day = null; page = 0; showHosts(); }; }
+    load(tenancy + "/hosts", function (hosts) { // reports are named after the machineName, rows are keyed by hostlist name
+    var hostnameColumn = hosts.Columns.indexOf("Hostname"), hostnames = {};
+    hosts.Rows.forEach(function (row) { hostnames[row[0]] = row[hostnameColumn] || row[0]; });
+    hostTable(function (columns, rows) {
+        var search = $("search").value.toLowerCase();
+        if (search) { rows = rows.filter(function (row) { return (row[0] + " " + (hostnames[row[0]] || "")).toLowerCase().indexOf(search) !== -1; }); }
+        rows.sort(function (a, b) {
+            var x = a[sortColumn], y = b[sortColumn];
+            if (x === y) { return 0; }
+            if (x === null || x === undefined) { return 1; }
+            if (y === null || y === undefined) { return -1; }
+            return (x < y ? -1 : 1) * (sortDescending ? -1 : 1);
+        });
+        var pages = Math.max(1, Math.ceil(rows.length / pageRows));
+        page = Math.min(page, pages - 1);
+        $("page").textContent = "page " + (page + 1) + " of " + pages + " (" + rows.length + " hosts)";
+        $("hosts").innerHTML = cells("th", columns) + rows.slice(page * pageRows, (page + 1) * pageRows).map(function (row) {
+            var link = {html: '<a href="../report/' + escape(encodeURIComponent(hostnames[row[0]] || row[0])) + '.html">' + escape(row[0]) + "</a>"};
+            return cells("td", [link].concat(row.slice(1).map(function (value) { return Array.isArray(value) ? value.join(" ") : value; })));
+        }).join("");
+        Array.prototype.forEach.call(document.querySelectorAll("#hosts th"), function (header, i) {
+            header.onclick = function () { sortDescending = sortColumn === i ? !sortDescending : false; sortColumn = i; showHosts(); };
+        });
+    });
+    });
+}
+
+function showTenancy() { tenancy = $("tenancy").value; day = null; page = 0; showDays(); showHosts(); }
+$("tenancy").onchange = showTenancy;
+$("network").onchange = function () { page = 0; showDays(); showHosts(); };
+$("range").onchange = showDays;
+$("search").oninput = function () { page = 0; showHosts(); };
+$("previous").onclick = function () { page = Math.max(0, page - 1); showHosts(); };
+$("next").onclick = function () { page += 1; showHosts(); };
+
+var plotly = document.createElement("script"); // shared bundle of the reports, chart skipped without it
+plotly.src = "../report/plotly.min.js";
+plotly.onload = function () { if (tenancy) { showDays(); } };
+document.head.appendChild(plotly);
+
+load("manifest", function (data) {
+    manifest = data;
+    $("built").textContent = "built " + data.Built;
+    $("tenancy").innerHTML = data.Tenancies.map(function (t) { return '<option value="' + escape(t.Key) + '">' + escape(t.Name) + " (" + escape(t.Hosts) + " hosts)</option>"; }).join("");
+    $("network").innerHTML += data.Network_types.map(function (type) { return "<option>" + escape(type) + "</option>"; }).join("");
+    if (data.Tenancies.length) { showTenancy(); }
+});
+</script>
+</body>
+</html>
+"""
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description="Build the TecMFA fleet dashboard from the event store")
+    arguments.add_argument("--full", action="store_true", help="aggregate every day again, not only the latest")
+    arguments.add_argument("--store", default=event_store, help="event store (default: {})".format(event_store))
+    args = arguments.parse_args()
+    build_dashboard(args.store, args.full)
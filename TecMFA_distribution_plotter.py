@@ -4,36 +4,60 @@
 
 from datetime import datetime as dt
 from datetime import time as t
+import json
 import os
-import plotly.graph_objects as go
-import plotly.subplots as sp
-import numpy as np
+import sqlite3
+from TecMFA_parser_core import merge_sketches, sketch_percentiles
 
-tenancy_a_dir = r".\xxx" # change xxx to appropriate tenancy directory name
-tenancy_b_dir = r".\yyy" # change yyy to appropriate tenancy directory name
+event_store = r".\tecmfa.sqlite" # written by TechMFA_log_parser
+tenancy_a_hostlist = r".\xxx.txt" # change xxx to appropriate tenancy hostlist (one host per line, as in hostlist.txt)
+tenancy_b_hostlist = r".\yyy.txt" # change yyy to appropriate tenancy hostlist (one host per line, as in hostlist.txt)
 
-def extract_averages_from_file(mode, directory):
+def extract_averages_from_store(mode, hostlist):
     """
-    To be used with files in average_output_end_to_end directory & average_output_okta_to_end.
-    returns temp{"hostname": [1.1, 2.2, 3.3, n], "hostname2": [5.5, n]} 
+    To be used with daily_averages table of event_store (keyed by hostlist name), only hosts listed in hostlist.
+    returns temp{"hostname": [[1.1, 2.2], [3.3, n]], "hostname2": [[5.5, n]]} (summary) or 
+    temp{"hostname": 1.1, "hostname2": 5.5} (okta - latest day)
     """
     temp = dict()
-    for host in os.listdir(directory):
-        try:
-            with open(os.path.join(directory, host), "r") as f:
-                temp[host[:-4]] = []
-                for line in f:
-                    if mode == "summary": # end to end
-                        listified_line = line.strip().split(",")
-                        online_e2e_avg, offline_e2e_avg = listified_line[0], listified_line[1]
-                        daily_avg_for_host = [float(online_e2e_avg), float(offline_e2e_avg)]
-                        temp[host[:-4]].append(daily_avg_for_host)
-                    elif mode == "okta": # okta to end
-                        temp[host[:-4]] = float(line.strip())
-        except Exception as e:
-            print("o:", e)
+    try:
+        with open(hostlist, "r") as f:
+            hosts = set(host.strip() for host in f if host.strip())
+        connection = sqlite3.connect(event_store)
+        rows = connection.execute(
+            "SELECT host, online_end_to_end, offline_end_to_end, okta_to_end FROM daily_averages ORDER BY host, day"
+            ).fetchall()
+        connection.close()
+        for host, online_e2e_avg, offline_e2e_avg, okta_avg in rows:
+            if host not in hosts:
+                continue
+            if mode == "summary": # end to end
+                temp.setdefault(host, []).append([online_e2e_avg, offline_e2e_avg])
+            elif mode == "okta": # okta to end
+                temp[host] = okta_avg
+    except Exception as e:
+        print("o:", e)
     return {"Data": temp}
 
+def extract_quantiles_from_store(hostlist):
+    """
+    p50/p90/p99 of end to end & okta to end durations of the hosts in hostlist, merged from host_sketches.
+    returns {"End_to_end": {"p50": 1.1, "p90": 2.2, "p99": 3.3}, "Okta_to_end": {...}}
+    """
+    quantiles = dict()
+    try:
+        with open(hostlist, "r") as f:
+            hosts = set(host.strip() for host in f if host.strip())
+        connection = sqlite3.connect(event_store)
+        rows = connection.execute("SELECT host, sketches FROM host_sketches").fetchall()
+        connection.close()
+        sketches = [json.loads(row[1]) for row in rows if row[0] in hosts]
+        for duration in ("End_to_end", "Okta_to_end"):
+            quantiles[duration] = sketch_percentiles(merge_sketches(sketch[duration] for sketch in sketches))
+    except Exception as e:
+        print("o2:", e)
+    return quantiles
+
 def plot_graph(mode, tenancy_a, tenancy_b):
     """
     Parameters: 
@@ -43,6 +67,7 @@ def plot_graph(mode, tenancy_a, tenancy_b):
     "graph: individual host" - includes 2 tables in addition to line graph.
     "graph: cumulative" - reads txt files from average_output_end_to_end & okta_to_end directories to craft line graph
     """
+    import plotly.graph_objects as go # on first use, extracting averages doesn't need plotly
     
     if mode == "graph: violin": 
         try: 
@@ -57,7 +82,7 @@ def plot_graph(mode, tenancy_a, tenancy_b):
 
             trace1 = go.Violin(
                     x=tenancy_a_list_of_logs, 
-                    y=np.repeat("tenancy_a", len(tenancy_a_list_of_logs)),
+                    y=["tenancy_a"] * len(tenancy_a_list_of_logs),
                     box_visible=True,
                     meanline_visible=True,
                     points="all",
@@ -72,7 +97,7 @@ def plot_graph(mode, tenancy_a, tenancy_b):
             
             trace2 =go.Violin(
                     x=tenancy_b_list_of_logs, 
-                    y=np.repeat("tenancy_b", len(tenancy_b_list_of_logs)),
+                    y=["tenancy_b"] * len(tenancy_b_list_of_logs),
                     box_visible=True,
                     meanline_visible=True,
                     points="all",
@@ -106,11 +131,14 @@ def plot_graph(mode, tenancy_a, tenancy_b):
                     gridwidth=1,
                 )
             )
-            fig.write_html(r".\average_report\okta_averages_violin.html")
+            fig.write_html(r".\average_report\okta_averages_violin.html", include_plotlyjs="directory") # shared .\average_report\plotly.min.js
         except Exception as e: 
             print("p2:", e)
 
-tenancy_a_okta_data = extract_averages_from_file("okta", tenancy_a_dir)
-tenancy_b_okta_data = extract_averages_from_file("okta", tenancy_b_dir)
+tenancy_a_okta_data = extract_averages_from_store("okta", tenancy_a_hostlist)
+tenancy_b_okta_data = extract_averages_from_store("okta", tenancy_b_hostlist)
 
 plot_graph(mode="graph: violin", tenancy_a=tenancy_a_okta_data, tenancy_b=tenancy_b_okta_data)
+
+print("tenancy_a durations (sec):", extract_quantiles_from_store(tenancy_a_hostlist))
+print("tenancy_b durations (sec):", extract_quantiles_from_store(tenancy_b_hostlist))
@@ -0,0 +1,159 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Synthetic TecMFALogs.txt for testing & benchmarking process_log / calculate_summary_table_data without client logs.
+Same layout as the client logs: "=====" rows between instances, "TecMFA UI Initiated", username & IP lines, Okta
+start / MFA_REQUIRED, online & offline success, failures (anomalies #2, #3 & #5), |Error| codes of known_exceptions,
+local user bypasses, noise lines and sessions that cross midnight.
+
+    python TecMFA_log_generator.py .\synthetic.txt --size 100MB [--seed 1] [--online 0.6 --offline 0.25 ...]
+
+Same seed & settings always give the same log.
+"""
+import argparse
+import random
+from datetime import datetime as dt
+from datetime import timedelta
+from TecMFA_parser_core import (
+    known_exceptions, spec_ip_check_1, spec_ip_check_2, spec_not_registered_for_offline, spec_offline_initiate,
+    spec_online_failure, spec_pw_changed
+)
+
+generator_defaults = {
+    "Online": 0.6, # share of instances authenticated with Okta
+    "Offline": 0.25, # share authenticated with offline TOTP
+    "Failed": 0.1, # share that fail (online failure, not registered for offline, password changed)
+    "Local": 0.05, # share of local user bypasses (excluded by the parser)
+    "Mfa": 0.5, # online instances with an MFA_REQUIRED challenge (sms / push) rather than remembered
+    "Errors": 0.1, # instances with |Error| lines
+    "Cross_midnight": 0.02, # instances started just before midnight that finish after it
+    "Noise": 20, # most noise lines between two marker lines
+    "Hostname": "SYNTH01",
+    "Users": 3
+}
+
+error_codes = ["E0000068", "E0000004", "E0000109", "E0000068"] # code of each of known_exceptions
+
+noise_lines = [
+    "Window handle {} created for credential provider tile",
+    "Credential provider GetSerialization called, usage scenario {}",
+    "Loading configuration from registry key HKLM\\SOFTWARE\\TecMFA ({} values)",
+    "Tile selected, field count {}",
+    "Checking network connectivity, adapter index {}",
+    "UI thread heartbeat {}"
+]
+
+def parse_size(text):
+    """
+    "1MB", "100MB", "1GB", "512KB" or plain bytes -> bytes
+    """
+    text = text.strip().upper()
+    for suffix, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+def log_line(stamp, entry, level="Info"):
+    return "{}.{:04d}|{}|{}\n".format(stamp.strftime("%Y-%m-%d %H:%M:%S"), stamp.microsecond // 100, level, entry)
+
+def noise(lines, r, stamp, settings):
+    for _ in range(r.randint(0, settings["Noise"])):
+        lines.append(log_line(stamp, r.choice(noise_lines).format(r.randint(0, 9999))))
+
+def generate_instance(r, stamp, settings):
+    """
+    Lines of one instance starting at stamp (closed by the "=====" row), returns (lines, stamp of the last line).
+    """
+    lines = []
+    kind = r.choices(
+        ["Online", "Offline", "Failed", "Local"],
+        [settings["Online"], settings["Offline"], settings["Failed"], settings["Local"]]
+    )[0]
+    lines.append(log_line(stamp, "TecMFA UI Initiated Version : v8.{}".format(r.choice([1, 2]))))
+    noise(lines, r, stamp, settings)
+    stamp += timedelta(seconds=r.uniform(0.1, 1.5))
+    lines.append(log_line(stamp, "SAM value : user{:03d}".format(r.randint(1, settings["Users"]))))
+    if kind == "Local":
+        lines.append(log_line(stamp, "Bypassing TecMFA for local users."))
+        return (lines, stamp)
+
+    online = kind == "Online" or (kind == "Failed" and r.random() < 0.5)
+    if online:
+        ip = r.choice(["10.1.{}.{}", "172.16.{}.{}", "172.20.{}.{}", "192.168.{}.{}"]).format(r.randint(0, 255), r.randint(1, 254))
+        lines.append(log_line(stamp, "{} : {}".format(spec_ip_check_1, ip)))
+        stamp += timedelta(seconds=r.uniform(0.2, 2))
+        lines.append(log_line(stamp, "Initializing Okta Authentication."))
+        noise(lines, r, stamp, settings)
+        mfa = r.random() < settings["Mfa"]
+        if mfa:
+            stamp += timedelta(seconds=r.uniform(0.5, 3))
+            lines.append(log_line(stamp, "In ProcessAuthnResponse Status: MFA_REQUIRED"))
+        if r.random() < settings["Errors"]:
+            for _ in range(r.randint(1, 3)):
+                stamp += timedelta(seconds=r.uniform(1, 20))
+                error = r.randrange(len(known_exceptions))
+                lines.append(log_line(stamp, "Error : Code - {} {}".format(error_codes[error], known_exceptions[error]), "Error"))
+        stamp += timedelta(seconds=r.uniform(2, 40) if mfa else r.uniform(0.5, 5))
+        if kind == "Failed":
+            lines.append(log_line(stamp, spec_online_failure))
+        else:
+            lines.append(log_line(stamp, "ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully."))
+            factor = r.choice(["sms:OKTA", "push:OKTA"]) if mfa else ""
+            lines.append(log_line(stamp, "Current selected factor: {}".format(factor)))
+    else:
+        if r.random() < 0.3:
+            lines.append(log_line(stamp, "{} : 192.168.{}.{}".format(spec_ip_check_2, r.randint(0, 255), r.randint(1, 254))))
+        stamp += timedelta(seconds=r.uniform(0.5, 3))
+        lines.append(log_line(stamp, spec_offline_initiate))
+        noise(lines, r, stamp, settings)
+        stamp += timedelta(seconds=r.uniform(5, 60))
+        if kind == "Failed":
+            lines.append(log_line(stamp, r.choice([spec_not_registered_for_offline, spec_pw_changed])))
+        else:
+            lines.append(log_line(stamp, "OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP."))
+    stamp += timedelta(seconds=r.uniform(0.1, 1))
+    lines.append(log_line(stamp, "Closing credential provider UI"))
+    return (lines, stamp)
+
+def generate_log(path, size, seed=1, start=dt(2023, 1, 1, 7, 30), **settings):
+    """
+    Write a synthetic log of about size bytes (whole instances, stops at the first instance past size) to path.
+    settings: any of generator_defaults. Written as it's generated so any size fits in memory.
+    Returns (bytes written, instances written).
+    """
+    settings = dict(generator_defaults, **settings)
+    r = random.Random(seed)
+    stamp = start
+    written = 0
+    instances = 0
+    with open(path, "w", newline="\n") as log:
+        header = "=====\n" + log_line(stamp, "Environment machineName:{} osVersion:10.0.19045".format(settings["Hostname"]))
+        log.write(header)
+        written += len(header.encode())
+        while written < size:
+            if r.random() < settings["Cross_midnight"]:
+                before_midnight = dt.combine(stamp.date(), dt.min.time()) + timedelta(hours=23, minutes=59, seconds=r.uniform(30, 58))
+                stamp = before_midnight if before_midnight > stamp else before_midnight + timedelta(days=1)
+            else:
+                stamp += timedelta(minutes=r.uniform(5, 600))
+            lines, stamp = generate_instance(r, stamp, settings)
+            lines.append("=====\n")
+            text = "".join(lines)
+            log.write(text)
+            written += len(text.encode())
+            instances += 1
+    return (written, instances)
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description="Write a synthetic TecMFALogs.txt")
+    arguments.add_argument("path")
+    arguments.add_argument("--size", default="1MB", help="approximate size e.g. 1MB, 100MB, 1GB")
+    arguments.add_argument("--seed", type=int, default=1)
+    for key, value in generator_defaults.items():
+        arguments.add_argument("--" + key.lower().replace("_", "-"), dest=key, type=type(value), default=value)
+    args = arguments.parse_args()
+    settings = dict((key, getattr(args, key)) for key in generator_defaults)
+    written, instances = generate_log(args.path, parse_size(args.size), args.seed, **settings)
+    print("{}: {} bytes, {} instances".format(args.path, written, instances))
@@ -0,0 +1,913 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Parsing & summarising of TecMFALogs.txt - process_log & calculate_summary_table_data.
+stream_log yields instances as they are parsed, summary_add / sketch_instance consume them one at a time. A log 
+is parsed incrementally by resuming stream_log from resume_checkpoint and saving new_checkpoint once stored.
+Standard library only so collector & parser processes start quickly - plotting lives in TecMFA_report.
+"""
+import hashlib
+import json
+import locale
+import math
+import mmap
+import os
+import re
+import sys
+
+checkpoint_dir = r".\checkpoint"
+checkpoint_head_bytes = 4096 # length of head of log hashed to detect rotation
+log_encoding = locale.getpreferredencoding(False) # same decoding as open(path, "r")
+mmap_scan = True # find marker lines by searching the memory mapped log, False to read & match it line by line
+mmap_window_bytes = 4 * 1024 * 1024 # searched for markers at a time, bounds the list of hits held
+sketch_relative_accuracy = 0.01 # quantiles from sketches are within 1% of the true duration
+sketch_log_gamma = math.log((1 + sketch_relative_accuracy) / (1 - sketch_relative_accuracy))
+
+def determine_network_type(ip): # based on IP address
+    """
+    10.x.x.x == SIM # change as required to indicate WWAN connection
+    172.x.x.x == VPN # change as required to indicate company VPN
+    # get IP range for all the different lans on the network? or all else being LAN or office wifi? 
+    Return type of network
+    """
+    try: 
+        if ip[:6] == "10.1.": # change as required to indicate WWAN IP
+            return "4G"
+        elif ip[:6] == "172.1" or ip[:6] == "172.2": # change as required to indicate company VPN IP address ranges
+            return "VPN"
+        else: # everything else i.e. lan office. 
+            return "LAN"
+    except Exception as e: 
+        print("r1:", e) 
+
+def extract_hostname(line):
+    """
+    Hostname from the first line of the log holding "machineName", None if it isn't in the line.
+    """
+    for word in line.split(" "):
+        if "machineName" in word:
+            return word[12:]
+    return None
+
+def extract_hostname_from_path(path):
+    """
+    Fallback when the log holds no "machineName" line and the caller didn't name the host (see process_log).
+    """
+    return path[path.rfind("\\")+1:-3]
+
+def fingerprint_log_head(path, length=checkpoint_head_bytes):
+    """
+    Hash of the first length bytes of the log - changes when the log has been rotated / recreated.
+    Returns (fingerprint, number of bytes hashed)
+    """
+    with open(path, "rb") as log:
+        head = log.read(length)
+    return (hashlib.sha1(head).hexdigest(), len(head))
+
+def load_checkpoint(host):
+    """
+    Returns checkpoint saved by save_checkpoint for host or None if there isn't one (first run / unreadable).
+    """
+    try: 
+        path = os.path.join(checkpoint_dir, "{}.json".format(host))
+        if os.path.exists(path): 
+            with open(path, "r") as f: 
+                return json.load(f)
+    except Exception as e: 
+        print("k1:", e)
+    return None
+
+def save_checkpoint(host, checkpoint):
+    try: 
+        path = os.path.join(checkpoint_dir, "{}.json".format(host))
+        with open(path + ".tmp", "w") as f: 
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path) # never leave a half written checkpoint behind
+    except Exception as e: 
+        print("k2:", e)
+
+def checkpoint_valid(path, checkpoint):
+    """
+    True if the log at path is the same log the checkpoint was taken from and has only grown since.
+    Truncation (smaller than checkpoint offset) or rotation (head of file differs) means a full reparse.
+    """
+    try: 
+        if checkpoint is None or "Instances_after" not in checkpoint: # none / still holding Data (early 2.8)
+            return False
+        if os.path.getsize(path) < checkpoint["Offset"]: # truncated
+            return False
+        fingerprint, _ = fingerprint_log_head(path, checkpoint["Fingerprint_length"])
+        return fingerprint == checkpoint["Fingerprint"] # rotated if different
+    except Exception as e: 
+        print("k3:", e)
+        return False
+
+def resume_checkpoint(path, host): 
+    """
+    Checkpoint of host (hostlist name) to resume the log at path from - passed to stream_log / process_log - None 
+    for a full parse (no checkpoint, or the log was rotated / truncated). The new checkpoint (new_checkpoint) is 
+    saved by the caller once the instances parsed since are stored, as it's the only copy of them.
+    """
+    checkpoint = load_checkpoint(host)
+    if not checkpoint_valid(path, checkpoint): 
+        return None # full reparse
+    return checkpoint
+
+# Anomalies
+# to be used if no auth success (online or offline) - time stamp to be used to specify time taken without success
+spec_offline_initiate = "OfflineTOTP authentication user control loaded" # anomaly #1
+# anomaly - no auth success (on or offline) and no spec_offline_initiate - outcome of: failure 
+spec_online_failure = "Okta non recoverable error message label: Authentication Failed" # anomaly #2
+# anomaly #3 - not registered for offline! 
+spec_not_registered_for_offline = "Your computer is offline. Please register with any offline factor"
+# anomaly #4 - No offline enrollments exists for user - not yet used
+# 
+# anomaly #5 - PASSWORD_CHANGED: 
+spec_pw_changed = "PASSWORD_CHANGED:"
+
+spec_ip_check_1 = "XForwadedIP is sent through the request"
+spec_ip_check_2 = "localIP" # note if offline, no IP is specified
+
+# errors
+error_header = "|Error|"
+known_exceptions = [ # occurences of error code are followed by the worded errors in list, just for reference.
+    "Your passCode doesn't match our records. Please try again.", # Error : Code - E0000068
+    "Authentication Failed", # Error : Code - E0000004
+    "An SMS message was recently sent. Please wait 30 seconds before trying again.", # Error : Code - E0000109
+    "Your token doesn't match our records. Please try again." # Error : Code - E0000068 
+    ]
+
+def timestamp_ticks(stamp):
+    """
+    "2022-12-07 16:37:36.7484" (timestamp at the start of every log entry) to microseconds since 1970-01-01.
+    Fixed layout so fields are sliced out, days counted with the proleptic Gregorian calendar (same as datetime).
+    """
+    year, month, day = int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10])
+    if month <= 2: 
+        year -= 1
+        month += 9
+    else: 
+        month -= 3
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + (153 * month + 2) // 5 + day - 1
+    days = era * 146097 + day_of_era - 719468
+    seconds = int(stamp[11:13]) * 3600 + int(stamp[14:16]) * 60 + int(stamp[17:19])
+    return (days * 86400 + seconds) * 1000000 + int((stamp[20:] + "000000")[:6]) # fraction of variable length
+
+def calc_section_times(prev, now):
+    """
+    prev, now: full timestamps "YYYY-MM-DD HH:MM:SS.ffff" (see extract_timestamp). Returns seconds between.
+    """
+    try:
+        if prev != "" and now != "": 
+            delta = timestamp_ticks(now) - timestamp_ticks(prev)
+            return round(delta / 1000000, 2)
+        else: 
+            return 0
+    except Exception as e:
+        print("d:", e)
+        return 0
+
+class Instance: 
+    """
+    Record of one MFA instance - same keys & item access as the dict it replaces (instance["End_to_end"], 
+    dict(instance), **instance) but held in slots: ~a quarter of the memory of a 12 key dict & nothing for the 
+    GC to track per key. Repeated strings (Date, IP) are interned by the handlers so every 
+    instance of a day / address shares one copy.
+    """
+    __slots__ = (
+        "Instance", "Date", "Time", "Version", "Auth_type", "Auth_sub_type", "Outcome", "IP", "Network_type", 
+        "Errors", "End_to_end", "Okta_to_end"
+    )
+
+    def __init__(self, Instance=0, Date="", Time="", Version="8.1", Auth_type="", Auth_sub_type="", Outcome="", 
+                 IP="", Network_type="", Errors="", End_to_end="", Okta_to_end=""):
+        self.Instance = Instance
+        self.Date = Date
+        self.Time = Time
+        self.Version = Version
+        self.Auth_type = Auth_type
+        self.Auth_sub_type = Auth_sub_type
+        self.Outcome = Outcome
+        self.IP = IP
+        self.Network_type = Network_type
+        self.Errors = Errors
+        self.End_to_end = End_to_end
+        self.Okta_to_end = Okta_to_end
+
+    def __getitem__(self, key): 
+        return getattr(self, key)
+
+    def __setitem__(self, key, value): 
+        setattr(self, key, value)
+
+    def keys(self): 
+        return self.__slots__
+
+    def __iter__(self): 
+        return iter(self.__slots__)
+
+    def __eq__(self, other): 
+        return dict(self) == dict(other)
+
+    def __repr__(self): 
+        return "Instance({})".format(dict(self))
+
+instance_record = Instance # type of the records of entire_log, dict for the records used before 2.8 (see TecMFA_benchmark --memory)
+
+def initialise_or_reset_block(): # an instance of MFA inside log file specified by activity between ==== rows.
+    return instance_record(
+        Instance=0, Date="", Time="", Version="8.1", Auth_type="", 
+        Auth_sub_type="", Outcome="", IP="", Network_type="", Errors="", 
+        End_to_end="", Okta_to_end=""
+        )
+
+def instance_to_json(instance): # json.dump default= for Instance records
+    return dict(instance)
+
+def instance_row(instance): 
+    """
+    Values of instance in the order of Instance.__slots__ (the columns of the instances table after host & 
+    username), durations not calculated ("") as None.
+    """
+    return tuple(
+        None if key in ("End_to_end", "Okta_to_end") and instance[key] == "" else instance[key] for key in Instance.__slots__
+    )
+
+def instance_from_row(row): # Instance record of an instance_row / row of the instances table, None back to ""
+    return instance_record(**dict((key, "" if value is None else value) for key, value in zip(Instance.__slots__, row)))
+
+def initialise_parser_state():
+    """
+    Everything process_log carries from one line to the next. Plain values only so it can be saved in a checkpoint.
+    """
+    return {
+        "Block": initialise_or_reset_block(), 
+        "Username": "-", # identified once per entire log not inside block
+        "Hostname": None, # from first "machineName" line
+        "Error_count": 0, "Instance_count": 0, 
+        # initialised to "" so not to get reference before creation exception. Full timestamps i.e. date & time.
+        "T_start": "", "T_end": "", "T_contingency_end": "", "Okta_start_time": "", "Okta_end_time": "", 
+        "Flag_mfa": False, 
+        "Flag_local_user": False, # used to exclude from collection & analysis - 2.6.6
+        "N_minus_1": "", 
+        "N_minus_2": "", # typically "====="
+        "N_minus_3": "" # typically last known entry for TecMFA instance
+    }
+
+# Line handlers - each receives the parser state, the line and the list of finished instances (entire_log).
+def on_instance_start(state, line, entire_log): # start of a new instance of authentication
+    if "=====" in state["N_minus_2"]: # Means block is finished: 
+        block = state["Block"]
+        t_end = extract_timestamp(state["N_minus_3"])
+        elapsed_time = calc_section_times(prev=state["T_start"], now=t_end)
+        if elapsed_time <= 0 or elapsed_time > 300: # extreme outliers / anomalies remove from report
+            pass
+        else: 
+            block["End_to_end"] = elapsed_time
+            # Check if empty, then fail otherwise succeed
+            if block["Outcome"] == "": 
+                block["Outcome"] = "Failed / Cancelled"
+
+            # Check if online (has IP)
+            if block["IP"] != "" and block["Auth_type"] != "Offline": 
+                block["Auth_type"] = "Online" 
+                okta_elapsed_time = calc_section_times(prev=state["Okta_start_time"], now=state["Okta_end_time"])
+                if okta_elapsed_time == 0: # failed to auth i.e. didn't get an okta time due to ERROR
+                    okta_elapsed_time = calc_section_times(prev=state["Okta_start_time"], now=t_end)
+                    block["Auth_sub_type"] = "24hr | Office" # Anomaly for blank output in report - comment out line to observe in report.
+                block["Okta_to_end"] = okta_elapsed_time
+            else: 
+                block["Auth_type"] = "Offline"
+
+            # Check if local user
+            if state["Flag_local_user"] == False: 
+                state["Instance_count"] += 1
+                block["Instance"] = state["Instance_count"]
+                entire_log.append(block) # *********** ADD
+            else: 
+                state["Flag_local_user"] = False
+
+        # Reset timers
+        state["Okta_start_time"] = ""
+        state["Okta_end_time"] = ""
+        state["T_start"] = ""
+        state["T_end"] = ""
+
+        state["Flag_mfa"] = False
+        state["Block"] = initialise_or_reset_block() # Reset
+    block = state["Block"]
+    if "Version : v8.2" in line: # extract version
+        block["Version"] = "8.2"
+    d_start, t_start = extract_date_time(line)
+    state["T_start"] = d_start + " " + t_start
+    block["Date"] = sys.intern(d_start) 
+    block["Time"] = t_start[:-5]
+    # state["T_contingency_end"] = "" # reset contingency for each block! 
+
+def on_username(state, line, entire_log): 
+    state["Username"] = extract_username(extract_log_entry(line)).strip()
+
+def on_ip_1(state, line, entire_log): # extract IP from XForwardedIP line
+    state["Block"]["IP"] = sys.intern(extract_ip_1(extract_log_entry(line)).strip())
+    state["Block"]["Network_type"] = determine_network_type(state["Block"]["IP"]) # SIM, VPN or LAN
+
+def on_ip_2(state, line, entire_log): # extract IP from localIP line
+    state["Block"]["IP"] = sys.intern(extract_ip_2(extract_log_entry(line)).strip())
+    state["Block"]["Network_type"] = determine_network_type(state["Block"]["IP"]) # SIM, VPN or LAN
+
+def on_error(state, line, entire_log): # look for and process |Error|
+    state["Error_count"] += 1 
+    state["Block"]["Errors"] += extract_log_entry(line)[1:] + "<br>" # add error to Error list of block 
+
+def on_online_success(state, line, entire_log): # SUCCESS - online
+    block = state["Block"]
+    block["Auth_type"] = "Online"
+    state["T_end"] = extract_timestamp(line) # calculate end time for instance
+    if state["Flag_mfa"] == False:
+        state["Okta_end_time"] = state["T_end"]
+    block["End_to_end"] = calc_section_times(prev=state["T_start"], now=state["T_end"])
+    block["Outcome"] = "Success"
+
+def on_offline_success(state, line, entire_log): # SUCCESS - offline
+    block = state["Block"]
+    block["Auth_type"] = "Offline"
+    state["T_end"] = extract_timestamp(line) # calculate end time for instance
+    block["End_to_end"] = calc_section_times(prev=state["T_start"], now=state["T_end"])
+    block["Outcome"] = "Success"
+
+def on_selected_factor(state, line, entire_log): # check auth sub type - only occurs after online_success
+    state["Block"]["Auth_sub_type"] = extract_current_selected_factor(extract_log_entry(line))
+
+def on_offline_initiate(state, line, entire_log): # used as contingency to missing on/off successful auth
+    state["T_contingency_end"] = extract_timestamp(line)
+
+def on_failure(state, line, entire_log): # online failure / no offline mechanism registered / password changed
+    state["T_end"] = extract_timestamp(line)
+
+def on_okta_start(state, line, entire_log): # Okta start - mark start of OKTA process - 2.6.6
+    state["Okta_start_time"] = extract_timestamp(line)
+
+def on_mfa_required(state, line, entire_log): # mark start of MFA required OKTA response - i.e. otherwise would be end of non-MFA OKTA process 2.6.6
+    state["Okta_end_time"] = extract_timestamp(line)
+    state["Flag_mfa"] = True
+
+def on_local_user(state, line, entire_log): 
+    state["Flag_local_user"] = True
+
+# (marker, handler) in order of precedence - when a line holds more than one marker the first listed wins, 
+# same as the if/elif chain this replaces. Lines are matched as raw bytes so noise lines are never decoded.
+log_line_rules = [
+    ("TecMFA UI Initiated", on_instance_start), 
+    ("SAM value", on_username), # username
+    (spec_ip_check_1, on_ip_1), 
+    (spec_ip_check_2, on_ip_2), 
+    (error_header, on_error), 
+    ("ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully.", on_online_success), 
+    ("OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP.", on_offline_success), 
+    ("Current selected factor:", on_selected_factor), 
+    (spec_offline_initiate, on_offline_initiate), 
+    (spec_online_failure, on_failure), # online failure
+    (spec_not_registered_for_offline, on_failure), # failure - no offline mechanism registered! 
+    (spec_pw_changed, on_failure), # failure - anomaly #4
+    ("Initializing Okta Authentication", on_okta_start), 
+    ("In ProcessAuthnResponse Status: MFA_REQUIRED", on_mfa_required), 
+    ("Bypassing TecMFA for local users.", on_local_user), 
+]
+log_line_precedence = {marker.encode(): rank for rank, (marker, handler) in enumerate(log_line_rules)}
+log_line_handlers = {marker.encode(): handler for marker, handler in log_line_rules}
+log_line_pattern = re.compile(b"|".join(re.escape(marker.encode()) for marker, handler in log_line_rules)) # one scan per line
+instance_start_marker = log_line_rules[0][0].encode()
+log_line_markers = list(log_line_handlers) # searched for one at a time by scan_mapped_lines
+
+def decode_log_line(raw):
+    return raw.decode(log_encoding, "replace").replace("\r\n", "\n") # as read by open(path, "r")
+
+def process_log(path, checkpoint=None, hostname=None):
+    """
+    Rules: 
+    # "Current selected factor:" blank means 'remember 24 hours' likely set while on VPN or 10.55.x.x
+    # "TecMFA UI Initiated" marks the start of the instance 
+    # look for |Error| 
+        # Add to dictionary under ["Error]
+    # Look for either: "=====" (Auth failed and instance concluded) OR online_success OR offline_success
+    # "ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully OR 
+        "OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP."
+        # means success
+    # check 
+    Each line is classified once against log_line_pattern and passed to its handler in log_line_handlers.
+
+    Shape of block (list of Instance records, used like dictionaries):
+    [
+        {
+            Instance: <used to plot instances in sequence> , 
+            Date: <log entry>, Time: <log entry>, Version: <log entry>, 
+            Auth_type: <online / offline>, Auth_sub_type: <24_or_office, sms_okta, push_okta>,
+            Outcome: <succeeded / failed / timeout | cancelled>, IP: "", Network_type: <4G, LAN, VPN>, Errors: <row of error after |Error|>,
+            End_to_end: <time in seconds>,
+            Okta_to_end: <time in seconds> # Okta (online) to end of MFA instance
+        }
+    ]
+
+    Averaged data: 
+    Using above block, 
+
+    checkpoint: optional, as returned under ["Checkpoint"] by a previous call on the same log - parsing resumes 
+    from its offset & parser state and Data holds only the instances finished since (["Resumed"]: True). The 
+    checkpoint holds no instances, they're kept by the caller (event store). Caller must check it is valid 
+    (checkpoint_valid).
+    The new checkpoint is taken at the start of the last "TecMFA UI Initiated" line that followed a "=====" row, 
+    i.e. before the previous instance is finalised, so resuming gives exactly the same result as a full parse. 
+    Instances finished after that point were returned already (checkpoint["Instances_after"]) and are skipped when 
+    resuming rather than returned twice.
+    hostname: of a log without a "machineName" line, e.g. the hostlist name it was fetched from - every fetched log 
+    is named TecMFALogs.txt so the path can't tell hosts apart. Default: extract_hostname_from_path.
+
+    returns list of summarised dictionaries (blocks)
+    """
+    parse = {}
+    entire_log = list(stream_log(path, checkpoint, parse)) # Instance records (initialise_or_reset_block)
+    resumed = checkpoint is not None
+    checkpoint = new_checkpoint(path, parse)
+    state = parse["State"]
+    if state["Hostname"] is not None: 
+        hostname = state["Hostname"]
+    elif hostname is None: 
+        hostname = extract_hostname_from_path(path)
+    return {
+        "Data": entire_log, "Username": state["Username"], "Hostname": hostname, "Checkpoint": checkpoint, 
+        "Resumed": resumed, # Data follows on from the instances returned by the call the checkpoint came from
+        "Line_errors": parse["Line_errors"] # lines a handler failed on ("err")
+    } # for averaging with another function
+
+def new_checkpoint(path, parse):
+    """
+    Checkpoint of the log at path once stream_log has read it to the end (parse: its parse dict), None if no 
+    boundary was found. Offset, fingerprint of the head & parser state only - a few hundred bytes whatever the 
+    size of the log.
+    """
+    boundary = parse["Boundary"]
+    if boundary is None: 
+        return None
+    fingerprint, fingerprint_length = fingerprint_log_head(path)
+    return {
+        "Offset": boundary["Offset"], "Fingerprint": fingerprint, "Fingerprint_length": fingerprint_length, 
+        "State": boundary["State"], "Instances_after": parse["Finished"] - boundary["Finished"]
+    }
+
+def stream_log(path, checkpoint=None, parse=None):
+    """
+    Generator of the Instance records of the log at path, each yielded as soon as the "=====" boundary after it 
+    is read - nothing but the instance being parsed is held, so memory doesn't grow with the log and the caller 
+    (summary_add, sketch_instance, a store writer) works while the log is still being read. process_log is this 
+    collected into a list.
+
+    checkpoint: resume from its offset & state, its Instances_after (yielded before) are not yielded again.
+    parse: optional dict, kept up to date as the log is read:
+        "State": parser state (initialise_parser_state) - Username & Hostname once found
+        "Boundary": None or {"Offset": byte offset of the last boundary, "State": state at it, 
+                             "Finished": number of instances finished before it} - see new_checkpoint
+        "Finished": number of instances finished, including those skipped as Instances_after
+        "Line_errors": number of lines a handler raised on (printed as "err")
+    """
+    if parse is None: 
+        parse = {}
+    state = initialise_parser_state()
+    if checkpoint is not None: # resume
+        state = dict(checkpoint["State"], Block=instance_record(**checkpoint["State"]["Block"]))
+    parse["State"] = state
+    parse["Boundary"] = None # parser state at the last "=====" boundary, becomes the new checkpoint
+    parse["Finished"] = 0
+    parse["Line_errors"] = 0
+    finished = [] # instances finalised by the current line, handed to the caller then cleared
+    skip = checkpoint["Instances_after"] if checkpoint is not None else 0
+
+    # raw bytes of the 2 lines before the first line read, decoded only when a handler needs them
+    history = (state["N_minus_1"].encode(log_encoding, "replace"), state["N_minus_2"].encode(log_encoding, "replace"))
+    hostname_missing = state["Hostname"] is None
+
+    with open(path, "rb") as log:
+        if checkpoint is None: 
+            next(log, b"") # skip the first line which is always =====
+            start = log.tell()
+        else: 
+            start = checkpoint["Offset"]
+        mapped = None
+        if mmap_scan and os.fstat(log.fileno()).st_size > start: # can't map an empty file
+            try: 
+                mapped = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+            except Exception as e: 
+                print("mm:", e) # read line by line instead
+        if mapped is not None: 
+            candidates = scan_mapped_lines(mapped, start, history, hostname_missing)
+        else: 
+            log.seek(start)
+            candidates = scan_log_lines(log, history, hostname_missing)
+
+        try: 
+            for offset, raw, markers, n_minus_2, n_minus_3 in candidates: 
+                if hostname_missing and b"machineName" in raw: # picked up in the same pass, only until found
+                    state["Hostname"] = extract_hostname(decode_log_line(raw))
+                    hostname_missing = False
+                if not markers: # line only holds machineName
+                    continue
+                try:
+                    marker = markers[0] if len(markers) == 1 else min(markers, key=log_line_precedence.get)
+                    handler = log_line_handlers[marker]
+                    line = decode_log_line(raw)
+                    if handler is on_instance_start: # only handler that looks back
+                        state["N_minus_2"] = decode_log_line(n_minus_2)
+                        state["N_minus_3"] = decode_log_line(n_minus_3)
+                        if b"=====" in n_minus_2: 
+                            parse["Boundary"] = {
+                                "Offset": offset, "Finished": parse["Finished"], 
+                                # state as it was before this line
+                                "State": dict(state, Block=dict(state["Block"]), N_minus_1=state["N_minus_2"], N_minus_2=state["N_minus_3"], N_minus_3="")
+                            }
+                    handler(state, line, finished)
+                except Exception as e:
+                    print("err", e)
+                    parse["Line_errors"] += 1
+                if finished: 
+                    for instance in finished: 
+                        parse["Finished"] += 1
+                        if skip: # finished after the checkpoint's boundary, yielded by the parse that took it
+                            skip -= 1
+                            continue
+                        yield instance
+                    finished.clear()
+        finally: 
+            if mapped is not None: 
+                candidates.close() # drop the scanner's slices of the map before closing it
+                mapped.close()
+
+def scan_log_lines(log, history, hostname_missing): 
+    """
+    Lines of log (open in binary, at the first line to parse) that hold a marker - or "machineName" while 
+    hostname_missing - as (offset, raw line, markers, n_minus_2, n_minus_3). n_minus_2 & n_minus_3 are the 2 lines 
+    before it, history holds the 2 lines before the first one. Every line is read & matched, see scan_mapped_lines.
+    """
+    n_minus_1, n_minus_2 = history
+    find_markers = log_line_pattern.findall
+    offset = log.tell()
+    for raw in log: 
+        # Keep last 2 lines in memory
+        n_minus_3 = n_minus_2 # n-3
+        n_minus_2 = n_minus_1 # n-2
+        n_minus_1 = raw # current or n-1
+        markers = find_markers(raw)
+        if markers or (hostname_missing and b"machineName" in raw): 
+            hostname_missing = hostname_missing and b"machineName" not in raw
+            yield (offset, raw, markers, n_minus_2, n_minus_3)
+        offset += len(raw)
+
+def scan_mapped_lines(mapped, start, history, hostname_missing): 
+    """
+    Same as scan_log_lines from the memory mapped log. Each marker is searched for on its own with find (fast 
+    substring search, faster than one regex of every marker) across a window of mmap_window_bytes at a time, 
+    only the lines holding a hit are sliced out & matched against log_line_pattern - noise lines are never 
+    copied, split or looped over in Python. The 2 lines before a line are only looked up for "TecMFA UI 
+    Initiated" lines, the only ones that use them.
+    """
+    find = mapped.find
+    rfind = mapped.rfind
+    find_markers = log_line_pattern.findall
+    size = len(mapped)
+    hostname_at = find(b"machineName", start) if hostname_missing else -1
+    window_start = start
+    while window_start < size: 
+        window_end = find(b"\n", min(window_start + mmap_window_bytes, size) - 1) + 1 or size # whole lines only
+        hits = [] # offsets of every marker in the window, several may be on one line
+        for marker in log_line_markers: 
+            at = find(marker, window_start, window_end)
+            while at != -1: 
+                hits.append(at)
+                at = find(marker, at + 1, window_end)
+        if window_start <= hostname_at < window_end: # machineName may be on a line without a marker
+            hits.append(hostname_at)
+        hits.sort()
+        end = -1 # end of the line last yielded
+        for at in hits: 
+            if at < end: # line already yielded
+                continue
+            begin = rfind(b"\n", start, at) + 1 or start
+            end = find(b"\n", at, window_end) + 1 or window_end
+            raw = mapped[begin:end]
+            markers = find_markers(raw)
+            if instance_start_marker in markers: 
+                yield (begin, raw, markers) + previous_mapped_lines(mapped, start, history, begin)
+            else: 
+                yield (begin, raw, markers, None, None)
+        window_start = window_end
+
+def previous_mapped_lines(mapped, start, history, begin): 
+    """
+    (n_minus_2, n_minus_3) - the 2 lines before the line at begin, from history before start.
+    """
+    if begin == start: 
+        return history
+    n_minus_2_begin = mapped.rfind(b"\n", start, begin - 1) + 1 or start
+    n_minus_2 = mapped[n_minus_2_begin:begin]
+    if n_minus_2_begin == start: 
+        return (n_minus_2, history[0])
+    n_minus_3_begin = mapped.rfind(b"\n", start, n_minus_2_begin - 1) + 1 or start
+    return (n_minus_2, mapped[n_minus_3_begin:n_minus_2_begin])
+
+def calculate_summary_table_data(block): 
+    """
+    Takes calculated block and returns data for creating table (2nd table)
+    """
+    summary = new_summary()
+    for instance in block["Data"]: 
+        summary_add(summary, instance)
+    return summary_finish(summary)
+
+def summarise_log(path): 
+    """
+    calculate_summary_table_data of the log at path, read through stream_log - no instance is kept so memory 
+    doesn't depend on the size of the log. Returns (summary, username, hostname)
+    """
+    summary = new_summary()
+    parse = {}
+    for instance in stream_log(path, parse=parse): 
+        summary_add(summary, instance)
+    hostname = parse["State"]["Hostname"] if parse["State"]["Hostname"] is not None else extract_hostname_from_path(path)
+    return (summary_finish(summary), parse["State"]["Username"], hostname)
+
+def new_summary(): 
+    """
+    Empty summary, instances are added one at a time by summary_add & percentages / averages worked out once by 
+    summary_finish.
+    """
+    return {
+        "Block_instance_total": 0, 
+        "Online": {
+            "Count": 0, "Online_%": 0, "Success_%": 0, "Success_count": 0
+            }, # "Online_%" calculated by dividing ["Online"]["Count"] divided by ["Block_instance_total"]
+        "Offline": {
+            "Count": 0, "Offline_%": 0, "Success_%": 0, "Success_count": 0
+            }, # "Offline_%" calculated by dividing ["Offline"]["Count"] divided by ["Block_instance_total"]
+        "Auth_sub_type": {
+            "24hr_or_office_count": 0, "SMS:OKTA_count": 0, "PUSH:OKTA_count": 0
+        },
+        "Errors": {
+            "Count": 0
+        }, 
+        "Network_type": {
+            "4G_count": 0, "VPN_count": 0, "LAN_count": 0, 
+            "4G_%": 0, "VPN_%": 0, "LAN_%": 0 # _% calculated by _count divided by ["Block_instance_total"]
+        },
+        "End_to_end_sums": {
+            "Online": 0, "Offline": 0, 
+        }, 
+        "End_to_end_averages": { 
+            "Online": 0, # ["End_to_end_sums"]["Online"] divided by ["Online"]["Count"]
+            "Offline": 0 # ["End_to_end_sums"]["Offline"] divided by ["Offline"]["Count"]
+        }, 
+        "Okta_to_end_sums": 0, 
+        "Okta_to_end_averages": 0, # ["Okta_to_end_sums"] divided by ["Online"]["Count"]
+        "Sketches": new_sketches() # distributions of End_to_end & Okta_to_end, see new_sketch
+    }
+
+def summary_add(summary, instance): 
+    summary["Block_instance_total"] += 1
+    sketch_instance(summary["Sketches"], instance)
+    try: 
+        if instance["Auth_type"] == "Online": # Auth, outcomes & end_to_end sum
+            summary["Online"]["Count"] += 1
+            if instance["Outcome"] == "Success":
+                summary["Online"]["Success_count"] += 1
+                # TODO: check whether all online is equivalent to usage of Okta 
+            try: 
+                summary["Okta_to_end_sums"] += float(instance["Okta_to_end"])
+            except Exception as e:
+                print("x:", e)
+            try: 
+                summary["End_to_end_sums"]["Online"] += float(instance["End_to_end"])
+            except Exception as e: 
+                print("xx:", e)
+        elif instance["Auth_type"] == "Offline": 
+            summary["Offline"]["Count"] += 1 
+            if instance["Outcome"] == "Success":
+                summary["Offline"]["Success_count"] += 1
+            try: 
+                summary["End_to_end_sums"]["Offline"] += float(instance["End_to_end"])
+            except Exception as e: 
+                print("y:", e)
+
+        if instance["Auth_sub_type"] == "SMS:OKTA": # Auth sub types
+            summary["Auth_sub_type"]["SMS:OKTA_count"] += 1
+        elif instance["Auth_sub_type"] == "PUSH:OKTA": 
+            summary["Auth_sub_type"]["PUSH:OKTA_count"] += 1
+        elif instance["Auth_sub_type"] == "24hr | Office": 
+            summary["Auth_sub_type"]["24hr_or_office_count"] += 1
+        
+        if instance["Network_type"] == "4G": # Network types
+            summary["Network_type"]["4G_count"] += 1
+        elif instance["Network_type"] == "VPN": 
+            summary["Network_type"]["VPN_count"] += 1
+        elif instance["Network_type"] == "LAN": 
+            summary["Network_type"]["LAN_count"] += 1
+
+        if len(instance["Errors"]) != 0: # Errors
+            summary["Errors"]["Count"] += len(instance["Errors"])
+    except Exception as e: 
+        print("w:", e) 
+
+def summary_finish(summary): 
+    try: # Calculate end_to_end time averages 
+        # 0 count check
+        if summary["Online"]["Count"] != 0:
+            summary["End_to_end_averages"]["Online"] = round(summary["End_to_end_sums"]["Online"] / summary["Online"]["Count"], 2) # elapsed time
+            summary["Online"]["Online_%"] = round(summary["Online"]["Count"] / summary["Block_instance_total"] * 100, 1)
+            summary["Online"]["Success_%"] = round(summary["Online"]["Success_count"] / summary["Online"]["Count"] * 100, 1)
+            summary["Okta_to_end_averages"] = round(summary["Okta_to_end_sums"] / summary["Online"]["Count"], 2) # new! 
+
+        # 0 count check
+        if summary["Offline"]["Count"] != 0: 
+            summary["End_to_end_averages"]["Offline"] = round(summary["End_to_end_sums"]["Offline"] / summary["Offline"]["Count"], 2) # elapsed time
+            summary["Offline"]["Offline_%"] = round(summary["Offline"]["Count"] / summary["Block_instance_total"] * 100, 1)
+            summary["Offline"]["Success_%"] = round(summary["Offline"]["Success_count"] / summary["Offline"]["Count"] * 100, 1)
+
+        # 0 count check 
+        if summary["Network_type"]["4G_%"] != 0: 
+            summary["Network_type"]["4G_%"] = round(summary["Network_type"]["4G_count"] / summary["Block_instance_total"] * 100, 1)
+        if summary["Network_type"]["VPN_%"] != 0: 
+            summary["Network_type"]["VPN_%"] = round(summary["Network_type"]["VPN_count"] / summary["Block_instance_total"] * 100, 1)
+        if summary["Network_type"]["LAN_%"] != 0: 
+            summary["Network_type"]["LAN_%"] = round(summary["Network_type"]["LAN_count"] / summary["Block_instance_total"] * 100, 1)
+    except Exception as e: 
+        print("z:", e)
+
+    """ Sample output of summary: - v2.6.6 - Auth_sub_type is applicable for only Okta types.
+    {
+        'Block_instance_total': 144, 
+        'Online': {'Count': 118, 'Online_%': 0.8194444444444444, 'Success_%': 0.9491525423728814, 'Success_count': 112}, 
+        'Offline': {'Count': 26, 'Offline_%': 0.18055555555555555, 'Success_%': 1.0, 'Success_count': 26}, 
+        'Auth_sub_type': {'24hr_or_office_count': 81, 'SMS:OKTA_count': 31, 'PUSH:OKTA_count': 22}, 
+        'Errors': {'Count': 56}, 
+        'Network_type': {'4G_count': 4, 'VPN_count': 84, 'LAN_count': 31, '4G_%': 0.027777777777777776, 'VPN_%': 0.5833333333333334, 'LAN_%': 0.2152777777777778}, 
+        'End_to_end_sums': {'Online': 1820.3257000000006, 'Offline': 684.8079999999999}, 
+        'End_to_end_averages': {'Online': 15.426488983050852, 'Offline': 26.338769230769227}},
+        'Okta_to_end_sums': 450.55, 
+        'Okta_to_end_averages': 3.128819444444444
+
+    """
+    return summary
+
+def merge_summaries(summary, other): 
+    """
+    Add the counts & sums of summary other to summary (both new_summary, finished or not) - the running summary of 
+    a host grows by the instances parsed since its checkpoint without reading the ones before. Run summary_finish 
+    after for its averages & percentages.
+    """
+    summary["Block_instance_total"] += other["Block_instance_total"]
+    for auth_type in ("Online", "Offline"): 
+        for key in ("Count", "Success_count"): 
+            summary[auth_type][key] += other[auth_type][key]
+    for key in summary["Auth_sub_type"]: 
+        summary["Auth_sub_type"][key] += other["Auth_sub_type"][key]
+    summary["Errors"]["Count"] += other["Errors"]["Count"]
+    for key in ("4G_count", "VPN_count", "LAN_count"): 
+        summary["Network_type"][key] += other["Network_type"][key]
+    for key in ("Online", "Offline"): 
+        summary["End_to_end_sums"][key] += other["End_to_end_sums"][key]
+    summary["Okta_to_end_sums"] += other["Okta_to_end_sums"]
+    sketches, other_sketches = summary["Sketches"], other["Sketches"]
+    for duration in ("End_to_end", "Okta_to_end"): 
+        sketches[duration] = merge_sketches([sketches[duration], other_sketches[duration]])
+    for network_type, durations in other_sketches["Network_type"].items(): 
+        merged = sketches["Network_type"].setdefault(network_type, {"End_to_end": new_sketch(), "Okta_to_end": new_sketch()})
+        for duration in ("End_to_end", "Okta_to_end"): 
+            merged[duration] = merge_sketches([merged[duration], durations[duration]])
+    return summary
+
+def new_sketch():
+    """
+    Mergeable quantile sketch of durations (DDSketch): Bins counts durations by log bucket 
+    ceil(log(duration) / log(gamma)), so any quantile is within sketch_relative_accuracy of the real one and two 
+    sketches merge by adding counts - fleet wide percentiles without re-reading any instance.
+    Bins keys are str so the sketch is unchanged by a round trip through JSON.
+    """
+    return {"Count": 0, "Zero": 0, "Bins": {}}
+
+def sketch_add(sketch, value):
+    sketch["Count"] += 1
+    if value <= 0: 
+        sketch["Zero"] += 1
+        return
+    index = str(math.ceil(math.log(value) / sketch_log_gamma))
+    sketch["Bins"][index] = sketch["Bins"].get(index, 0) + 1
+
+def merge_sketches(sketches):
+    """
+    Returns a new sketch holding every duration of sketches, O(number of bins).
+    """
+    merged = new_sketch()
+    for sketch in sketches: 
+        merged["Count"] += sketch["Count"]
+        merged["Zero"] += sketch["Zero"]
+        for index, count in sketch["Bins"].items(): 
+            merged["Bins"][index] = merged["Bins"].get(index, 0) + count
+    return merged
+
+def sketch_quantile(sketch, q):
+    """
+    Duration at quantile q (0 - 1) of sketch, 0 if empty.
+    """
+    if sketch["Count"] == 0: 
+        return 0
+    rank = q * (sketch["Count"] - 1)
+    seen = sketch["Zero"]
+    if rank < seen: 
+        return 0
+    for index in sorted(sketch["Bins"], key=int): 
+        seen += sketch["Bins"][index]
+        if rank < seen: 
+            gamma = math.exp(sketch_log_gamma)
+            return round(2 * gamma ** int(index) / (gamma + 1), 2) # middle of the bucket
+    return 0
+
+def sketch_percentiles(sketch): 
+    return {"p50": sketch_quantile(sketch, 0.5), "p90": sketch_quantile(sketch, 0.9), "p99": sketch_quantile(sketch, 0.99)}
+
+def sketch_durations(block):
+    """
+    Sketches of End_to_end & Okta_to_end of every instance of block, overall and by Network_type:
+    {"End_to_end": sketch, "Okta_to_end": sketch, "Network_type": {"4G": {"End_to_end": sketch, "Okta_to_end": sketch}, n}}
+    Instances without a network type (offline, no IP) are under "Unknown".
+    """
+    sketches = new_sketches()
+    for instance in block["Data"]: 
+        sketch_instance(sketches, instance)
+    return sketches
+
+def new_sketches(): 
+    return {"End_to_end": new_sketch(), "Okta_to_end": new_sketch(), "Network_type": {}}
+
+def sketch_instance(sketches, instance): 
+    """
+    Add the durations of one instance to sketches (new_sketches / sketch_durations).
+    """
+    network_type = instance["Network_type"] or "Unknown"
+    if network_type not in sketches["Network_type"]: 
+        sketches["Network_type"][network_type] = {"End_to_end": new_sketch(), "Okta_to_end": new_sketch()}
+    for duration in ("End_to_end", "Okta_to_end"): 
+        if instance[duration] == "": # not calculated e.g. Okta_to_end of offline instance
+            continue
+        try: 
+            value = float(instance[duration])
+        except Exception as e: 
+            print("sk:", e)
+            continue
+        sketch_add(sketches[duration], value)
+        sketch_add(sketches["Network_type"][network_type][duration], value)
+
+def extract_current_selected_factor(line): 
+    """
+    Only occurs after Online authentication. 
+    Entry beyond |Info|
+    can be three outcomes: 
+        Current selected factor: sms:OKTA
+        Current selected factor: push:OKTA
+        Current selected factor: # blank i.e. remember for 24 hours OR logging in from office
+    Returns value depending on log entry.
+    """
+    temp = line[24:]
+    if "sms:OKTA" in temp: 
+        return "SMS:OKTA"
+    elif "push:OKTA" in temp: 
+        return "PUSH:OKTA"
+    else: # blank
+        return "24hr | Office"
+
+def extract_date_time(line):
+    try: 
+        index = line.find("|Info|")
+        if index == -1:
+            index = line.find("|Error|")
+        return line[:index].split(" ")
+    except Exception as e:
+        print("v:", e)
+    
+def extract_timestamp(line):
+    """
+    "2022-12-07 16:37:36.7484|Info|..." -> "2022-12-07 16:37:36.7484"
+    """
+    d, t = extract_date_time(line)
+    return d + " " + t
+
+def extract_log_entry(line):
+    return line[30:]
+
+def extract_ip_1(line): 
+    return line[42:]
+
+def extract_ip_2(line):
+    return line[10:]
+
+def extract_username(line):
+    return line[12:]
@@ -0,0 +1,99 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Reachability of hosts before their log is fetched. Every host of a sweep is probed at once with asyncio (up to
+probe_concurrency in flight) instead of one 2 x 2 second ping after another, and each host answering is handed to
+the fetch stage straight away so fetching starts while the rest are still being probed.
+Results are cached for probe_cache_ttl seconds so a host isn't probed again by the next sweep - the collector drops
+the result of a host it retries (forget_probe) so the retry probes it for real.
+"""
+import asyncio
+import threading
+import time
+
+probe_method = "tcp" # "tcp": connect to probe_port (SMB, what the UNC copy needs anyway), "ping": ICMP via pythonping
+probe_port = 445
+probe_timeout = 2 # seconds before a host is taken as unreachable
+probe_concurrency = 256 # probes in flight at once
+probe_cache_ttl = 60 # seconds a probe result is reused
+
+probe_cache = {} # host: (reachable, time.monotonic() when probed)
+probe_cache_lock = threading.Lock()
+
+def ping_host(d):
+    try:
+        import pythonping # on first use, not at start up
+        result = pythonping.ping(d.strip(), timeout=2, count=2)
+        if result.success():
+            return True
+    except Exception as e:
+        # print("b:", e)
+        return False
+
+def cached_probe(host):
+    """
+    Reachability of host from a probe in the last probe_cache_ttl seconds, None if there wasn't one.
+    """
+    with probe_cache_lock:
+        cached = probe_cache.get(host)
+    if cached is not None and time.monotonic() - cached[1] < probe_cache_ttl:
+        return cached[0]
+    return None
+
+def forget_probe(host): # e.g. the copy failed after all, probe again next time
+    with probe_cache_lock:
+        probe_cache.pop(host, None)
+
+async def tcp_probe(host):
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host.strip(), probe_port), probe_timeout)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        return True
+    except Exception as e:
+        # print("p1:", host, e) # debug
+        return False
+
+async def probe_host(host, limit): # probes host (cached_probe is checked by the caller) & caches the result
+    async with limit:
+        if probe_method == "ping": # pythonping blocks, run in the default thread pool
+            reachable = bool(await asyncio.get_running_loop().run_in_executor(None, ping_host, host))
+        else:
+            reachable = await tcp_probe(host)
+    with probe_cache_lock:
+        probe_cache[host] = (reachable, time.monotonic())
+    return reachable
+
+async def probe_hosts_async(hosts, reachable, unreachable=None, probed=None):
+    limit = asyncio.Semaphore(probe_concurrency)
+
+    async def probe(host):
+        answered = cached_probe(host)
+        if answered is None:
+            answered = await probe_host(host, limit)
+            if probed is not None:
+                probed(host, answered)
+        if answered:
+            reachable(host)
+        elif unreachable is not None:
+            unreachable(host)
+
+    await asyncio.gather(*(probe(host) for host in hosts))
+
+def probe_hosts(hosts, reachable, unreachable=None, probed=None):
+    """
+    Probe every host concurrently, started in the order of hosts. reachable(host) is called as soon as a host
+    answers (e.g. to put it on the fetch stage's ready queue), unreachable(host) for the others. Returns once
+    every host has answered or timed out.
+    probed(host, answered): called only for hosts actually probed, not those answered from the cache - e.g. to
+    count availability. The callbacks run in the event loop so should only touch memory (no store writes).
+    """
+    try:
+        asyncio.run(probe_hosts_async(hosts, reachable, unreachable, probed))
+    except Exception as e:
+        print("p:", e)
@@ -0,0 +1,509 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Regression corpus for TecMFA_parser_core. Logs in .\regression (synthetic, hand written edge cases & anonymised
+client logs) with the instances & summary each must give checked in next to them as <log>.expected.json.
+A faster parse (new matcher, mmap reader, incremental mode...) must not move instance boundaries or change the
+> 300 sec outlier filter, the Okta_to_end fallback or the exclusion of local users - every engine is run side by
+side on every log and compared with the expected output & with the reference engine.
+
+    python TecMFA_regression.py                     check every log of the corpus, exit code 1 on any mismatch
+    python TecMFA_regression.py --throughput        MB/s of each engine on each log as well [--repeat 3]
+    python TecMFA_regression.py --log big.log       same differential check of any log(s) against the reference
+                                                    engine only (nothing expected), e.g. 100MB synthetic / client log
+    python TecMFA_regression.py --update            rewrite the expected files from the reference engine - review
+                                                    the diff before committing it
+    python TecMFA_regression.py --add LOG NAME      anonymise a client log into the corpus as NAME.txt (then --update)
+    python TecMFA_regression.py --synthetic         regenerate the synthetic logs of synthetic_corpus
+
+Engines:
+    reference: frozen copy of the 2.7 process_log & calculate_summary_table_data (reference_process_log), with
+        only the deliberate 2.8 changes applied - none of the 2.8 handlers, so it can catch a change to them
+    line: process_log reading line by line (mmap_scan = False)
+    mmap: process_log searching the memory mapped log (mmap_scan = True)
+    mmap small windows: mmap with mmap_window_bytes of 97 so lines & hits straddle windows
+    incremental: log parsed as it grows - cut in 3 pieces, each resumed from the checkpoint of the one before
+    stream summary: summarise_log (summary accumulated from stream_log, no instances held)
+    columnar: TecMFA_columnar summary of the parsed instances (skipped when numpy isn't installed)
+"""
+import argparse
+from datetime import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import TecMFA_parser_core
+
+corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regression")
+
+synthetic_corpus = [ # (log name, size, seed, TecMFA_log_generator settings)
+    ("synthetic_mixed.txt", "40KB", 1, {"Noise": 3}),
+    ("synthetic_errors_midnight.txt", "40KB", 2, {"Errors": 0.5, "Cross_midnight": 0.3, "Local": 0.15, "Noise": 5}),
+    ("synthetic_offline_failed.txt", "40KB", 3, {"Online": 0.2, "Offline": 0.4, "Failed": 0.35, "Mfa": 0.9, "Noise": 3}),
+]
+
+def as_json(value): # Instance records -> dicts, tuples -> lists: same shape as the expected files
+    return json.loads(json.dumps(value, default=TecMFA_parser_core.instance_to_json))
+
+def parsed_output(block, summary): # what an engine returns, as_json after it's timed
+    return {"Hostname": block["Hostname"], "Username": block["Username"], "Data": block["Data"], "Summary": summary}
+
+def reference_hostname(path): # extract_hostname_from_path of 2.7: first "machineName" line, else the file name
+    hostname_line = ""
+    with open(path, "r", encoding=TecMFA_parser_core.log_encoding, errors="replace") as log:
+        for line in log:
+            if "machineName" in line:
+                hostname_line = line
+                break
+    for word in hostname_line.split(" "):
+        if "machineName" in word:
+            return word[12:]
+    return path[path.rfind("\\")+1:-3]
+
+def reference_section_times(prev, now): # calc_section_times of 2.7 on full timestamps, parsed by strptime
+    try:
+        if prev != "" and now != "":
+            delta = datetime.strptime(now, "%Y-%m-%d %H:%M:%S.%f") - datetime.strptime(prev, "%Y-%m-%d %H:%M:%S.%f")
+            return round(delta.total_seconds(), 2)
+        else:
+            return 0
+    except Exception as e:
+        print("d:", e)
+        return 0
+
+def reference_process_log(path):
+    """
+    process_log of 2.7, frozen: one if/elif chain over every decoded line, plain dicts. Only the deliberate
+    changes of 2.8 are applied - durations between full timestamps (date & time, so instances crossing midnight
+    aren't dropped), the hostname from the "machineName" line & the log decoded as log_encoding with errors
+    replaced. The extract_* helpers are shared as they are unchanged since 2.7. Nothing of the 2.8 parser
+    (handlers, parser state, matcher) is used, so a change to those shows up as a mismatch.
+    """
+    def timestamp(line):
+        d, t = TecMFA_parser_core.extract_date_time(line)
+        return d + " " + t
+
+    def initialise_or_reset_block():
+        return {
+            "Instance": 0, "Date": "", "Time": "", "Version": "8.1", "Auth_type": "",
+            "Auth_sub_type": "", "Outcome": "", "IP": "", "Network_type": "", "Errors": "",
+            "End_to_end": "", "Okta_to_end": ""
+            }
+
+    core = TecMFA_parser_core
+    entire_log = []
+    hostname = reference_hostname(path)
+    username = "-"
+    instance_count = 0
+    t_start = ""
+    t_end = ""
+    okta_start_time = ""
+    okta_end_time = ""
+    flag_mfa = False
+    flag_local_user = False
+    block = initialise_or_reset_block()
+
+    with open(path, "r", encoding=core.log_encoding, errors="replace") as log:
+        next(log, "") # skip the first line which is always =====
+        n_minus_1 = ""
+        n_minus_2 = ""
+        n_minus_3 = ""
+        for line in log:
+            try:
+                n_minus_3 = n_minus_2
+                n_minus_2 = n_minus_1
+                n_minus_1 = line
+
+                if "TecMFA UI Initiated" in line:
+                    if "=====" in n_minus_2: # block is finished
+                        t_end = timestamp(n_minus_3)
+                        elapsed_time = reference_section_times(prev=t_start, now=t_end)
+                        if elapsed_time <= 0 or elapsed_time > 300:
+                            pass
+                        else:
+                            block["End_to_end"] = elapsed_time
+                            if block["Outcome"] == "":
+                                block["Outcome"] = "Failed / Cancelled"
+                            if block["IP"] != "" and block["Auth_type"] != "Offline":
+                                block["Auth_type"] = "Online"
+                                okta_elapsed_time = reference_section_times(prev=okta_start_time, now=okta_end_time)
+                                if okta_elapsed_time == 0:
+                                    okta_elapsed_time = reference_section_times(prev=okta_start_time, now=t_end)
+                                    block["Auth_sub_type"] = "24hr | Office"
+                                block["Okta_to_end"] = okta_elapsed_time
+                            else:
+                                block["Auth_type"] = "Offline"
+                            if flag_local_user == False:
+                                instance_count += 1
+                                block["Instance"] = instance_count
+                                entire_log.append(block)
+                            else:
+                                flag_local_user = False
+                        okta_start_time = ""
+                        okta_end_time = ""
+                        t_start = ""
+                        t_end = ""
+                        flag_mfa = False
+                        block = initialise_or_reset_block()
+                    if "Version : v8.2" in line:
+                        block["Version"] = "8.2"
+                    d_start, time_start = core.extract_date_time(line)
+                    t_start = d_start + " " + time_start
+                    block["Date"] = d_start
+                    block["Time"] = time_start[:-5]
+                elif "SAM value" in line:
+                    username = core.extract_username(core.extract_log_entry(line)).strip()
+                elif core.spec_ip_check_1 in line:
+                    block["IP"] = core.extract_ip_1(core.extract_log_entry(line)).strip()
+                    block["Network_type"] = core.determine_network_type(block["IP"])
+                elif core.spec_ip_check_2 in line:
+                    block["IP"] = core.extract_ip_2(core.extract_log_entry(line)).strip()
+                    block["Network_type"] = core.determine_network_type(block["IP"])
+                elif core.error_header in line:
+                    block["Errors"] += core.extract_log_entry(line)[1:] + "<br>"
+                elif "ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully." in line:
+                    block["Auth_type"] = "Online"
+                    t_end = timestamp(line)
+                    if flag_mfa == False:
+                        okta_end_time = t_end
+                    block["End_to_end"] = reference_section_times(prev=t_start, now=t_end)
+                    block["Outcome"] = "Success"
+                elif "OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP." in line:
+                    block["Auth_type"] = "Offline"
+                    t_end = timestamp(line)
+                    block["End_to_end"] = reference_section_times(prev=t_start, now=t_end)
+                    block["Outcome"] = "Success"
+                elif "Current selected factor:" in line:
+                    block["Auth_sub_type"] = core.extract_current_selected_factor(core.extract_log_entry(line))
+                elif core.spec_offline_initiate in line:
+                    pass # contingency end, never used
+                elif core.spec_online_failure in line:
+                    t_end = timestamp(line)
+                elif core.spec_not_registered_for_offline in line:
+                    t_end = timestamp(line)
+                elif core.spec_pw_changed in line:
+                    t_end = timestamp(line)
+                elif "Initializing Okta Authentication" in line:
+                    okta_start_time = timestamp(line)
+                elif "In ProcessAuthnResponse Status: MFA_REQUIRED" in line:
+                    okta_end_time = timestamp(line)
+                    flag_mfa = True
+                elif "Bypassing TecMFA for local users." in line:
+                    flag_local_user = True
+            except Exception as e:
+                print("err", e)
+    return {"Data": entire_log, "Username": username, "Hostname": hostname}
+
+def reference_summary(block):
+    """
+    calculate_summary_table_data of 2.7, frozen, + the Sketches 2.8 adds (sketch_durations).
+    """
+    summary = {
+        "Block_instance_total": len(block["Data"]),
+        "Online": {"Count": 0, "Online_%": 0, "Success_%": 0, "Success_count": 0},
+        "Offline": {"Count": 0, "Offline_%": 0, "Success_%": 0, "Success_count": 0},
+        "Auth_sub_type": {"24hr_or_office_count": 0, "SMS:OKTA_count": 0, "PUSH:OKTA_count": 0},
+        "Errors": {"Count": 0},
+        "Network_type": {"4G_count": 0, "VPN_count": 0, "LAN_count": 0, "4G_%": 0, "VPN_%": 0, "LAN_%": 0},
+        "End_to_end_sums": {"Online": 0, "Offline": 0},
+        "End_to_end_averages": {"Online": 0, "Offline": 0},
+        "Okta_to_end_sums": 0,
+        "Okta_to_end_averages": 0
+    }
+    try:
+        for instance in block["Data"]:
+            if instance["Auth_type"] == "Online":
+                summary["Online"]["Count"] += 1
+                if instance["Outcome"] == "Success":
+                    summary["Online"]["Success_count"] += 1
+                try:
+                    summary["Okta_to_end_sums"] += float(instance["Okta_to_end"])
+                except Exception as e:
+                    print("x:", e)
+                try:
+                    summary["End_to_end_sums"]["Online"] += float(instance["End_to_end"])
+                except Exception as e:
+                    print("xx:", e)
+            elif instance["Auth_type"] == "Offline":
+                summary["Offline"]["Count"] += 1
+                if instance["Outcome"] == "Success":
+                    summary["Offline"]["Success_count"] += 1
+                try:
+                    summary["End_to_end_sums"]["Offline"] += float(instance["End_to_end"])
+                except Exception as e:
+                    print("y:", e)
+
+            if instance["Auth_sub_type"] == "SMS:OKTA":
+                summary["Auth_sub_type"]["SMS:OKTA_count"] += 1
+            elif instance["Auth_sub_type"] == "PUSH:OKTA":
+                summary["Auth_sub_type"]["PUSH:OKTA_count"] += 1
+            elif instance["Auth_sub_type"] == "24hr | Office":
+                summary["Auth_sub_type"]["24hr_or_office_count"] += 1
+
+            if instance["Network_type"] == "4G":
+                summary["Network_type"]["4G_count"] += 1
+            elif instance["Network_type"] == "VPN":
+                summary["Network_type"]["VPN_count"] += 1
+            elif instance["Network_type"] == "LAN":
+                summary["Network_type"]["LAN_count"] += 1
+
+            if len(instance["Errors"]) != 0:
+                summary["Errors"]["Count"] += len(instance["Errors"])
+    except Exception as e:
+        print("w:", e)
+
+    try:
+        if summary["Online"]["Count"] != 0:
+            summary["End_to_end_averages"]["Online"] = round(summary["End_to_end_sums"]["Online"] / summary["Online"]["Count"], 2)
+            summary["Online"]["Online_%"] = round(summary["Online"]["Count"] / summary["Block_instance_total"] * 100, 1)
+            summary["Online"]["Success_%"] = round(summary["Online"]["Success_count"] / summary["Online"]["Count"] * 100, 1)
+            summary["Okta_to_end_averages"] = round(summary["Okta_to_end_sums"] / summary["Online"]["Count"], 2)
+        if summary["Offline"]["Count"] != 0:
+            summary["End_to_end_averages"]["Offline"] = round(summary["End_to_end_sums"]["Offline"] / summary["Offline"]["Count"], 2)
+            summary["Offline"]["Offline_%"] = round(summary["Offline"]["Count"] / summary["Block_instance_total"] * 100, 1)
+            summary["Offline"]["Success_%"] = round(summary["Offline"]["Success_count"] / summary["Offline"]["Count"] * 100, 1)
+        if summary["Network_type"]["4G_%"] != 0: # never true - percentages of network types stay 0 as in 2.7
+            summary["Network_type"]["4G_%"] = round(summary["Network_type"]["4G_count"] / summary["Block_instance_total"] * 100, 1)
+        if summary["Network_type"]["VPN_%"] != 0:
+            summary["Network_type"]["VPN_%"] = round(summary["Network_type"]["VPN_count"] / summary["Block_instance_total"] * 100, 1)
+        if summary["Network_type"]["LAN_%"] != 0:
+            summary["Network_type"]["LAN_%"] = round(summary["Network_type"]["LAN_count"] / summary["Block_instance_total"] * 100, 1)
+    except Exception as e:
+        print("z:", e)
+    summary["Sketches"] = TecMFA_parser_core.sketch_durations(block)
+    return summary
+
+def reference_engine(path):
+    block = reference_process_log(path)
+    return parsed_output(block, reference_summary(block))
+
+def process_log_engine(mapped, window=None):
+    def engine(path):
+        saved = (TecMFA_parser_core.mmap_scan, TecMFA_parser_core.mmap_window_bytes)
+        TecMFA_parser_core.mmap_scan = mapped
+        if window is not None:
+            TecMFA_parser_core.mmap_window_bytes = window
+        try:
+            block = TecMFA_parser_core.process_log(path)
+        finally:
+            TecMFA_parser_core.mmap_scan, TecMFA_parser_core.mmap_window_bytes = saved
+        block.pop("Checkpoint")
+        return parsed_output(block, TecMFA_parser_core.calculate_summary_table_data(block))
+    return engine
+
+def incremental_engine(path, pieces=3):
+    """
+    process_log of path as if it had been collected pieces times while it grew: the first 1/pieces of its bytes
+    (cut mid line), then 2/pieces resumed from that checkpoint and so on up to the whole log. Instances are the
+    Data of every piece one after the other, as the collector stores them.
+    """
+    with open(path, "rb") as log:
+        data = log.read()
+    growing = tempfile.mkdtemp()
+    try:
+        grown = os.path.join(growing, os.path.basename(path))
+        checkpoint = None
+        data_of_pieces = []
+        for piece in range(1, pieces + 1):
+            with open(grown, "wb") as log:
+                log.write(data[:len(data) * piece // pieces])
+            if checkpoint is not None and not TecMFA_parser_core.checkpoint_valid(grown, checkpoint):
+                checkpoint = None
+            block = TecMFA_parser_core.process_log(grown, checkpoint)
+            checkpoint = block.pop("Checkpoint")
+            data_of_pieces.extend(block["Data"])
+    finally:
+        shutil.rmtree(growing, True)
+    block["Data"] = data_of_pieces
+    return parsed_output(block, TecMFA_parser_core.calculate_summary_table_data(block))
+
+def stream_summary_engine(path):
+    """
+    Instances from process_log, summary from summarise_log - the summary of a log too big to hold.
+    """
+    block = TecMFA_parser_core.process_log(path)
+    summary, username, hostname = TecMFA_parser_core.summarise_log(path)
+    return {"Hostname": hostname, "Username": username, "Data": block["Data"], "Summary": summary}
+
+def columnar_engine(path):
+    import TecMFA_columnar # numpy
+    block = TecMFA_parser_core.process_log(path)
+    summary = TecMFA_columnar.calculate_summary_from_columns(TecMFA_columnar.columns_from_block(block))
+    return parsed_output(block, summary)
+
+engines = [ # (name, function of path returning parsed_output)
+    ("reference", reference_engine),
+    ("line", process_log_engine(False)),
+    ("mmap", process_log_engine(True)),
+    ("mmap small windows", process_log_engine(True, window=97)),
+    ("incremental", incremental_engine),
+    ("stream summary", stream_summary_engine),
+    ("columnar", columnar_engine),
+]
+
+def first_difference(expected, actual):
+    """
+    Where actual first differs from expected, as text - "" when they're the same.
+    """
+    for key in ("Hostname", "Username"):
+        if expected[key] != actual[key]:
+            return "{}: expected {!r}, got {!r}".format(key, expected[key], actual[key])
+    for i, (expected_instance, actual_instance) in enumerate(zip(expected["Data"], actual["Data"])):
+        if expected_instance != actual_instance:
+            fields = [key for key in expected_instance if expected_instance[key] != actual_instance.get(key)]
+            return "instance #{} ({} {}) differs in {}: expected {}, got {}".format(
+                i + 1, expected_instance["Date"], expected_instance["Time"], ", ".join(fields),
+                dict((key, expected_instance[key]) for key in fields), dict((key, actual_instance.get(key)) for key in fields)
+            )
+    if len(expected["Data"]) != len(actual["Data"]):
+        return "expected {} instances, got {}".format(len(expected["Data"]), len(actual["Data"]))
+    if expected["Summary"] != actual["Summary"]:
+        keys = [key for key in expected["Summary"] if expected["Summary"][key] != actual["Summary"].get(key)]
+        return "summary differs in {}".format(", ".join(keys))
+    return ""
+
+def expected_path(log):
+    return os.path.splitext(log)[0] + ".expected.json"
+
+def corpus_logs():
+    return sorted(
+        os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir) if name.endswith(".txt")
+    )
+
+def run_engine(function, path, repeat=1):
+    """
+    Returns (output as_json, median seconds) of function(path), output None & seconds the exception if it raised.
+    """
+    seconds = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            output = function(path)
+        except Exception as e:
+            return (None, e)
+        seconds.append(time.perf_counter() - start)
+    return (as_json(output), sorted(seconds)[len(seconds) // 2])
+
+def check_logs(logs, against_expected=True, throughput=False, repeat=3):
+    """
+    Run every engine on each of logs & compare with <log>.expected.json (against_expected) and the reference
+    engine. Prints a line per log & engine, MB/s with throughput. Returns the number of mismatches.
+    """
+    mismatches = 0
+    for log in logs:
+        size = os.path.getsize(log) / 1024 / 1024
+        print("{} ({:.2f} MB)".format(os.path.basename(log), size))
+        expected = None
+        if against_expected:
+            try:
+                with open(expected_path(log)) as f:
+                    expected = json.load(f)
+            except Exception as e:
+                print("  no expected output, run --update:", e)
+                mismatches += 1
+                continue
+        reference = None
+        for name, function in engines:
+            output, seconds = run_engine(function, log, repeat if throughput else 1)
+            if output is None and isinstance(seconds, ImportError):
+                print("  {:<20} skipped ({})".format(name, seconds))
+                continue
+            if output is None:
+                print("  {:<20} FAILED {}: {}".format(name, type(seconds).__name__, seconds))
+                mismatches += 1
+                continue
+            if reference is None:
+                reference = output
+            difference = first_difference(expected, output) if expected is not None else ""
+            if not difference and name != "reference":
+                difference = first_difference(reference, output)
+                difference = difference and "not the same as reference - " + difference
+            mismatches += bool(difference)
+            speed = "  {:>8.1f} MB/s".format(size / seconds) if throughput and seconds > 0 else ""
+            print("  {:<20} {}{}".format(name, "MISMATCH " + difference if difference else "ok", speed))
+    return mismatches
+
+def update_expected(logs):
+    for log in logs:
+        output = as_json(reference_engine(log))
+        with open(expected_path(log), "w", newline="\n") as f:
+            json.dump(output, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print("{}: {} instances".format(expected_path(log), len(output["Data"])))
+
+ip_pattern = re.compile(r"\b(\d{1,3}\.\d{1,3})\.(\d{1,3})\.(\d{1,3})\b")
+
+def anonymise_log(source, destination):
+    """
+    Copy of a client log with usernames ("SAM value : ") replaced by user<n>, hostnames ("machineName:") by
+    HOST<n> - wherever they appear in the log - and the last 2 octets of every IP address by a hash of them.
+    The first 2 octets are kept as determine_network_type depends on them, timestamps & everything else is untouched
+    so the log parses into the same instances.
+    """
+    with open(source, "r", encoding=TecMFA_parser_core.log_encoding, errors="replace", newline="") as log:
+        text = log.read()
+    replacements = {}
+    for pattern, alias in ((r"SAM value : ([^\r\n]+)", "user{}"), (r"machineName:(\S+)", "HOST{}")):
+        found = []
+        for value in re.findall(pattern, text):
+            value = value.strip()
+            if value and value not in found:
+                found.append(value)
+        for n, value in enumerate(found):
+            replacements.setdefault(value, alias.format(n + 1))
+    if replacements: # one pass so a replacement is never replaced again, longest first ("DOMAIN\user" before "user")
+        aliases = dict((value.lower(), alias) for value, alias in replacements.items())
+        names = re.compile(r"(?<!\w)({})(?!\w)".format(
+            "|".join(re.escape(value) for value in sorted(replacements, key=len, reverse=True))), re.IGNORECASE)
+        text = names.sub(lambda match: aliases[match.group(1).lower()], text)
+
+    def anonymise_ip(match):
+        digest = hashlib.sha1(match.group(0).encode()).digest()
+        return "{}.{}.{}".format(match.group(1), digest[0], digest[1] % 254 + 1)
+
+    text = ip_pattern.sub(anonymise_ip, text)
+    with open(destination, "w", encoding=TecMFA_parser_core.log_encoding, newline="") as log:
+        log.write(text)
+    return replacements
+
+def generate_synthetic_corpus():
+    import TecMFA_log_generator
+    for name, size, seed, settings in synthetic_corpus:
+        written, instances = TecMFA_log_generator.generate_log(
+            os.path.join(corpus_dir, name), TecMFA_log_generator.parse_size(size), seed, **settings
+        )
+        print("{}: {} bytes, {} instances".format(name, written, instances))
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description="TecMFA parser regression corpus & differential check")
+    arguments.add_argument("--throughput", action="store_true", help="also time each engine on each log")
+    arguments.add_argument("--repeat", type=int, default=3, help="samples per timing with --throughput (median reported)")
+    arguments.add_argument("--log", nargs="+", metavar="LOG", help="differential check of LOG(s) against the reference engine")
+    arguments.add_argument("--update", action="store_true", help="rewrite expected output of the corpus from the reference engine")
+    arguments.add_argument("--add", nargs=2, metavar=("LOG", "NAME"), help="anonymise LOG into the corpus as NAME.txt")
+    arguments.add_argument("--synthetic", action="store_true", help="regenerate the synthetic logs of the corpus")
+    args = arguments.parse_args()
+
+    if args.add:
+        destination = os.path.join(corpus_dir, args.add[1] + ".txt")
+        replaced = anonymise_log(args.add[0], destination)
+        print("{} written, {} usernames / hostnames replaced - check it holds nothing identifying, then --update".format(
+            destination, len(replaced)))
+    elif args.synthetic:
+        generate_synthetic_corpus()
+    elif args.update:
+        update_expected(corpus_logs())
+    else:
+        if args.log:
+            failed = check_logs(args.log, against_expected=False, throughput=args.throughput, repeat=args.repeat)
+        else:
+            failed = check_logs(corpus_logs(), throughput=args.throughput, repeat=args.repeat)
+        print("{} mismatch(es)".format(failed) if failed else "All engines match")
+        sys.exit(1 if failed else 0)
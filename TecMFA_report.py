@@ -0,0 +1,362 @@
+# HZH
+# Version: 2.8
+# Date: 2026-10-17
+
+"""
+Rendering of reports with plotly - plot_graph & write_report. Imported on first use by TechMFA_log_parser so 
+processes that only collect or parse never load plotly.
+
+Hosts with thousands of instances (busy shared machines): above webgl_threshold instances the duration chart is 
+drawn with WebGL (Scattergl) from the points lttb keeps, and above table_inline_rows only the latest instances are 
+in the report's table - the rest are paged in from <host>.instances.js next to the report when asked for.
+"""
+import json
+import plotly.graph_objects as go
+import plotly.subplots as sp
+
+webgl_threshold = 2000 # instances above which the duration chart is Scattergl & downsampled
+downsample_points = 2000 # points kept of each duration line by lttb
+table_inline_rows = 500 # instances in the table of the report, older ones paged in from <host>.instances.js
+
+table_columns = [ # instance fields in order of the columns of the instance table
+    "Instance", "Date", "Time", "End_to_end", "Version", "Auth_type", "Auth_sub_type", "Okta_to_end", "Outcome", 
+    "IP", "Network_type", "Errors"
+]
+
+# Pages the instance table: loads <host>.instances.js with a <script> tag on first use (fetch() of a file isn't 
+# allowed when the report is opened from disk / a share) and restyles the table with a page of its columns.
+# Page 0 is the latest table_inline_rows instances, as rendered in the report.
+instance_pager_script = """
+(function () {
+    var gd = document.getElementById("{plot_id}");
+    var trace = __TRACE__, rows = __ROWS__, total = __TOTAL__, page = 0, columns = null;
+    var bar = document.createElement("div");
+    bar.style.cssText = "font-family: Courier New, monospace; margin: 10px;";
+    var older = document.createElement("button"), newer = document.createElement("button"), label = document.createElement("span");
+    older.textContent = "< Older instances";
+    newer.textContent = "Newer instances >";
+    label.style.margin = "0 10px";
+    bar.appendChild(older); bar.appendChild(label); bar.appendChild(newer);
+    gd.parentNode.insertBefore(bar, gd.nextSibling);
+    function show() {
+        var end = total - page * rows, start = Math.max(0, end - rows);
+        label.textContent = "Instances " + (start + 1) + " - " + end + " of " + total;
+        if (columns) {
+            Plotly.restyle(gd, {"cells.values": [columns.map(function (column) { return column.slice(start, end); })]}, [trace]);
+        }
+    }
+    function go(step) {
+        var pages = Math.ceil(total / rows);
+        page = Math.min(Math.max(page + step, 0), pages - 1);
+        if (columns) { return show(); }
+        window.tecmfa_instances = function (loaded) { columns = loaded; show(); };
+        var script = document.createElement("script");
+        script.src = __SOURCE__;
+        document.head.appendChild(script);
+    }
+    older.onclick = function () { go(1); };
+    newer.onclick = function () { go(-1); };
+    show();
+})();
+"""
+
+def write_report(fig, path, post_script=None):
+    """
+    html holds only the figure, plotly.js is loaded from plotly.min.js in the same directory (written once by 
+    plotly if missing) instead of a copy of the bundle (several MB) being embedded in every report.
+    post_script: javascript run once the figure is drawn, "{plot_id}" is the id of its div.
+    """
+    fig.write_html(path, include_plotlyjs="directory", post_script=post_script)
+
+def instance_columns(data):
+    """
+    Columns of the instance table (table_columns) from one pass over data.
+    """
+    columns = [[] for _ in table_columns]
+    appends = [column.append for column in columns]
+    for instance in data:
+        for append, key in zip(appends, table_columns):
+            append(instance[key])
+    return columns
+
+def lttb(x, y, points):
+    """
+    Largest Triangle Three Buckets: indexes of points of the line (x, y) that keep its shape. First & last are 
+    kept, the rest is split into points - 2 buckets and each keeps the point making the largest triangle with the 
+    point kept before it & the average of the next bucket - spikes survive, unlike taking every nth point.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return list(range(n))
+    kept = [0]
+    bucket = (n - 2) / (points - 2)
+    previous = 0
+    for i in range(points - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        average_x = sum(x[end:next_end]) / (next_end - end)
+        average_y = sum(y[end:next_end]) / (next_end - end)
+        previous_x, previous_y = x[previous], y[previous]
+        largest = -1
+        for j in range(start, end):
+            area = abs((previous_x - average_x) * (y[j] - previous_y) - (previous_x - x[j]) * (average_y - previous_y))
+            if area > largest:
+                largest = area
+                previous = j
+        kept.append(previous)
+    kept.append(n - 1)
+    return kept
+
+def duration_trace(x, y, name):
+    """
+    Line of durations y ("" where not calculated) by instance x. go.Scatter (SVG) of every point up to 
+    webgl_threshold instances, above that go.Scattergl (WebGL) of the downsample_points lttb keeps.
+    """
+    if len(x) <= webgl_threshold:
+        return go.Scatter(x=x, y=y, name=name, marker=dict(size=3), line=dict(width=1))
+    plotted_x = []
+    plotted_y = []
+    for instance, duration in zip(x, y):
+        if duration != "" and duration is not None:
+            plotted_x.append(instance)
+            plotted_y.append(float(duration))
+    kept = lttb(plotted_x, plotted_y, downsample_points)
+    return go.Scattergl(
+        x=[plotted_x[i] for i in kept], y=[plotted_y[i] for i in kept], mode="lines", 
+        name="{} ({} of {} points)".format(name, len(kept), len(plotted_x)), marker=dict(size=3), line=dict(width=1)
+    )
+
+def write_instance_pages(columns, path):
+    """
+    Every row of the instance table as tecmfa_instances(<columns as JSON>); - the script instance_pager_script loads.
+    """
+    with open(path, "w") as pages:
+        pages.write("tecmfa_instances(")
+        json.dump(columns, pages, separators=(",", ":"))
+        pages.write(");\n")
+
+def plot_graph(mode, block, summary=None):
+    """
+    Parameters: 
+    Block: processed_device_block, device_summarised or cumulative_devices_summary - depending on type of output desired.
+    Mode:
+    "graph: individual host" - includes 2 tables in addition to line graph.
+    "graph: cumulative" - daily end to end averages of every host (load_averages_from_store) to craft line graph
+    """
+
+    headerColor = "grey"
+    rowEvenColor = "lightgrey"
+    rowOddColor = "white"
+
+    x_axis = []
+    datapoint = 0 # x i.e. instances
+    end_to_end = []
+    okta_to_end = []
+    
+    if mode == "graph: individual host": # includes two other tables. 
+        username = block["Username"]
+        hostname = block["Hostname"]
+        columns = [[] for _ in table_columns]
+        pager = None # instance_pager_script when the table doesn't hold every instance
+    
+        try: 
+            columns = instance_columns(block["Data"]) # single pass, also the x & y of the line graph
+            x_axis = list(range(1, len(columns[0]) + 1))
+            end_to_end = columns[table_columns.index("End_to_end")]
+            okta_to_end = columns[table_columns.index("Okta_to_end")]
+        except Exception as e: 
+            print("e3:", e)
+
+        table_cells = columns
+        if len(x_axis) > table_inline_rows: # latest rows only, every row in <host>.instances.js
+            table_cells = [column[-table_inline_rows:] for column in columns]
+            try: 
+                write_instance_pages(columns, r".\report\{}.instances.js".format(hostname))
+                pager = instance_pager_script.replace("__TRACE__", "2").replace("__ROWS__", str(table_inline_rows)) \
+                    .replace("__TOTAL__", str(len(x_axis))).replace("__SOURCE__", json.dumps("{}.instances.js".format(hostname)))
+            except Exception as e: 
+                print("t3:", e)
+
+        try: # table: individual instances or the device
+            table_individual_instances = go.Table(
+                header=dict(values=[
+                    "#", "Date", "Time", "Duration (secs)", "Version", "Auth type", 
+                    "Online auth", "Okta duration (secs)", "Outcome", "IP", "Network", "Errors"
+                    ],
+                    line_color="darkslategray", 
+                    fill_color=headerColor,
+                    align="center",
+                    font=dict(color='white', size=15)
+                ), 
+                cells=dict(values=table_cells, # columns of table_columns
+                    line_color="darkslategray", 
+                    fill_color = [[rowOddColor,rowEvenColor,rowOddColor, rowEvenColor,rowOddColor]*5],
+                    align=["center","center","center","center","center","center","center","center","center","center","center","left"],
+                    font = dict(color = 'darkslategray', size = 13)
+                ), 
+                columnwidth=[1,2,2,2,2,2,2,2,2,2,2,10]
+            )
+        except Exception as e: 
+            print("t:", e)
+
+        try: # table: summarised for entire device log 
+            table_summary_auth = go.Table(
+                header=dict(values=[
+                    "Auth count", "Online %", "Offline %", "Online success %", "Offline success %", "Avg Online duration (sec)", 
+                    "Avg Offline duration (sec)", "Avg Okta duration (sec)", "4G %", "VPN %", "LAN %"
+                    ],
+                    line_color='darkslategray',
+                    fill_color='lightskyblue',
+                    align="center", 
+                    font=dict(color='darkslategray', size=15)
+                ), 
+                cells=dict(values=[
+                    [summary["Block_instance_total"]],
+                    [summary["Online"]["Online_%"]], 
+                    [summary["Offline"]["Offline_%"]],
+                    [summary["Online"]["Success_%"]],
+                    [summary["Offline"]["Success_%"]],
+                    [summary["End_to_end_averages"]["Online"]],
+                    [summary["End_to_end_averages"]["Offline"]],
+                    [summary["Okta_to_end_averages"]],
+                    [summary["Network_type"]["4G_%"]],
+                    [summary["Network_type"]["VPN_%"]], 
+                    [summary["Network_type"]["LAN_%"]]
+                ],
+                    line_color='darkslategray',
+                    fill_color='lightcyan',
+                    align="center", 
+                    font=dict(color='darkslategray', size=13)
+                ), 
+                columnwidth=[1,2,2,2,2,2,2,2,2,2,2,2,2,2,2]
+            )
+        except Exception as e: 
+            print("t2:", e)
+
+        try: # build and export the report which includes the graph and 2x tables.
+            fig = sp.make_subplots( # https://plotly.com/python/table-subplots/
+                rows=9,
+                cols=1, 
+                specs=[
+                    [{"type": "xy", "rowspan": 4}], 
+                    [{"type": "xy"}], 
+                    [{"type": "xy"}], 
+                    [{"type": "xy"}], 
+                    [{"type": "table", "rowspan": 3}],
+                    [{"type": "table"}], 
+                    [{"type": "table"}],
+                    [{"type": "table", "rowspan": 2}],
+                    [{"type": "table"}]
+                ],
+                vertical_spacing=0.06
+            )
+            # line graph
+            fig.add_trace(duration_trace(x_axis, end_to_end, "End to end duration (sec)"), row=1, col=1)
+            fig.add_trace(duration_trace(x_axis, okta_to_end, "Okta response duration (sec)"), row=1, col=1)
+            fig.add_trace(table_individual_instances, row=5, col=1) # table 1 - trace 2, paged by instance_pager_script
+            fig.add_trace(table_summary_auth, row=8, col=1) # table 2
+            
+            fig.update_layout(
+                title = hostname + "//" + username,
+                xaxis_title = "End to end times for TechMFA instances",
+                yaxis_title = "Time (sec)",
+                legend_title = "Legend",
+                font=dict(
+                    family = "Courier New, monospace",
+                    size = 18,
+                    color = "RebeccaPurple"
+                    ), 
+                height=2500
+                )
+            write_report(fig, r".\report\{}.html".format(hostname), post_script=pager) # write report to directory
+        except Exception as e: 
+            print("plot err:", e)
+        
+    elif mode == "graph: cumulative": # cumulative_devices_summary
+        try:
+            fig = go.Figure()
+            for host in block["Data"]: # device_summarised
+                datapoint = 0 
+                x_axis = [] 
+                averages_online = [] 
+                averages_offline = [] 
+
+                for list_of_two_averages in block["Data"][host]:
+                    datapoint += 1
+                    x_axis.append(datapoint)
+                    averages_online.append(list_of_two_averages[0])
+                    averages_offline.append(list_of_two_averages[1])
+                
+                fig.add_trace(
+                    go.Scatter(
+                        x = x_axis[:],
+                        y = averages_online[:],
+                        name = host + ": " + "Online avg", # mojo
+                        marker=dict(size=3),
+                        line=dict(width=1)
+                        )
+                    )
+                
+                fig.add_trace(
+                    go.Scatter(
+                        x = x_axis[:], 
+                        y = averages_offline[:],
+                        name = host + ": " + "Offline avg",
+                        marker=dict(size=3),
+                        line=dict(width=1)
+                    )
+                )
+
+            fig.update_layout(
+                title = "Daily snapshot of end-to-end average (online & offline) based on entire log (per host)",
+                xaxis_title = "Snapshot (daily)",
+                yaxis_title = "Time (sec)",
+                legend_title = "Legend",
+                font=dict(
+                    family = "Courier New, monospace",
+                    size=18,
+                    color = "RebeccaPurple"
+                    )
+                )
+            write_report(fig, r".\average_report\total_averages.html")
+        except Exception as e:
+            print("p:", e)
+
+    elif mode == "graph: violin": 
+        try: 
+            list_of_log_avgs = [] # contains average okta times as calculated for each host/log.
+                        
+            for host in block["Data"]: # device_summarised
+                list_of_log_avgs.append(block["Data"][host])
+
+            fig = go.Figure(
+                data=go.Violin(
+                    x=list_of_log_avgs, 
+                    box_visible=True,
+                    meanline_visible=True,
+                    points="all",
+                    orientation="h",
+                    jitter=0.05,
+                    pointpos=0,
+                    marker=dict(size=3),
+                    line_color="black",
+                    fillcolor="#636EFA",
+                    opacity=0.6,
+                    name="",
+                    )
+                )
+
+            fig.update_layout(
+                title = "Okta authentication duration averages based on entire log (per host)",
+                yaxis_title = "Tenancy",
+                xaxis_title = "Time (sec)",
+                font=dict(
+                    family = "Courier New, monospace",
+                    size=18,
+                    color = "RebeccaPurple"
+                    )
+                )
+            write_report(fig, r".\average_report\okta_averages_violin.html")
+        except Exception as e: 
+            print("p2:", e)
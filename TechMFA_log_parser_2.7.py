@@ -50,16 +50,112 @@ Add feature to check for existence of folders, if not then create - DONE
 Logic: 
 Note that when calculating percentage for how many MFA challenge occurs (push, sms, offline) ensure to add each 
 of its counts to the entire instance count before dividing the count by the sums.
+
+Version 2.8:
+* Hosts are collected through a staged pipeline instead of one at a time: a pool of fetch workers pings and copies 
+each log over its UNC path (no more shared Z: mapping) into a per-host temp directory, and a separate pool of process 
+workers parses, summarises and renders. A bounded queue between the two stages provides backpressure.
+* Incremental parsing: a checkpoint per host (.\checkpoint\<host>.json) records the byte offset of the last 
+complete "=====" boundary, a fingerprint of the head of the log and the parser state at that point - no instances. 
+The next run resumes from the offset, only the instances added since are committed and merged into the host's 
+running summary (host_summaries). A truncated or rotated log triggers a full reparse. Reports are rendered from 
+the instances in the event store.
+* Delta fetch: the per-host temp copy is kept between runs and only the bytes appended to the remote log since are 
+read (seek to the size of the local copy). Full copy when the head of the remote log differs (rotated) or it shrank.
+* stream_log finds the markers of each line with one precompiled regex of all markers (log_line_pattern, in 
+scan_log_lines) or by searching the memory mapped log (scan_mapped_lines), and dispatches the first of them in 
+log_line_rules order to its handler (log_line_handlers) instead of testing every line against each marker in an 
+if/elif chain.
+* Durations are calculated from the full date & time of each entry (timestamp_ticks slices the fixed layout into 
+integer microseconds, no strptime) - sessions that cross midnight are no longer negative and dropped as outliers.
+* Parsing & summarising runs in a process pool (parse_workers) so it uses every core. Logs already collected can be 
+processed in bulk: TechMFA_log_parser_2.7.py --batch .\temp [--workers N] - results are committed & rendered by 
+a single writer in host order, same output as processing them one by one.
+* Hostname ("machineName") is picked up during the parse instead of separately scanning the log before parsing and 
+again when committing - each log is read from disk once.
+* Parsed instances & daily averages are committed to one SQLite database (.\tecmfa.sqlite) in a single transaction 
+per host (keyed by its hostlist name, not the machineName of its log), replacing the per-host average_output_end_to_end & average_output_okta_to_end txt files. Cumulative & 
+violin charts are built from one query each instead of opening a file per host.
+* Logs unchanged since last processed (same size, mtime & hash of the tail - fingerprint_log) are skipped: no parse, 
+summary, commit or report. Skips are counted in run_stats.
+* Reports reference one shared plotly.min.js written next to them (.\report\plotly.min.js) rather than embedding 
+the whole plotly.js bundle in every html file. Time spent rendering is totalled in run_stats.
+* Reports are no longer rendered inline after each parse: write_host_results queues them in the render_queue table 
+of the event store and render_workers processes drain it in parallel (during the window, or after it when 
+render_during_window is False). Queued reports survive a restart and are rendered on the next drain.
+* Parsing & summarising moved to TecMFA_parser_core (standard library only) and rendering to TecMFA_report. plotly 
+and pythonping are imported on first use, so fetch / parse workers start without loading them.
+* Each host's summary carries mergeable sketches (DDSketch) of end to end & okta to end durations, stored in the 
+host_sketches table. Fleet & network type p50/p90/p99 are merged from them (load_quantiles_from_store) and 
+printed after each window, TecMFA_distribution_plotter does the same per tenancy.
+* Fleet summary over all stored history (TechMFA_log_parser_2.7.py --summary [--since YYYY-MM-DD]): instances are 
+loaded as typed columns - numpy arrays of durations & small int codes of auth type, sub type, network type & 
+outcome - and counts, sums & averages come from bincounts & masks (TecMFA_columnar) instead of a loop over dicts.
+* Parsed instances are Instance records (__slots__, item access like the dicts they replace) with dates & IPs 
+interned - a fraction of the memory per instance. TecMFA_benchmark.py --memory LOG reports bytes per instance of both.
+* TecMFA_parser_core.stream_log yields each instance as soon as its "=====" boundary is read (process_log collects 
+it into a list). Summaries & sketches are accumulated one instance at a time (new_summary / summary_add / 
+summary_finish, sketch_instance) - summarise_log summarises a log of any size without holding its instances. 
+parse_host_log summarises each instance as it is streamed and keeps only its row for the commit.
+* Logs are memory mapped & searched for each marker with find (scan_mapped_lines) - only lines holding a marker 
+are sliced out & decoded, the 2 lines before an instance start only looked up for that line. Falls back to reading 
+line by line (mmap_scan = False, empty / unmappable file). TecMFA_benchmark.py --scan LOG compares the two.
+* Scheduling: the collector sleeps until the window opens instead of waking every 10 seconds. Hosts that can't be 
+fetched or processed are retried on their own timer (retry_backoff_seconds, doubling up to retry_backoff_max_seconds) instead of 
+re-sweeping every host every 5 seconds, and the scheduler sleeps until the next timer. Progress of each window is 
+kept in the event store (run_windows, run_hosts) so a restart during the window carries on where it left off 
+without processing done hosts again - last_run & previous_reset_time are gone.
+* Reachability is its own stage (TecMFA_probe): every host of a sweep is probed at once with asyncio - a TCP 
+connect to port 445 by default (probe_method = "ping" for pythonping) - and hosts are fetched as they answer. 
+Results are cached for probe_cache_ttl seconds. Unreachable hosts get a retry timer like failed copies, and 
+a host given a retry timer is always probed again rather than answered from the cache.
+* Hosts are collected in order of expected value rather than hostlist.txt order: host_history (event store) keeps 
+when each host was last seen & collected, how fast its log grows and how often it answers at each hour of day (real probes only, 
+cached answers aren't counted), saved once per sweep. prioritise_hosts puts hosts likely to be online with the most data waiting first (never collected hosts before 
+all others) and reachable hosts are fetched best ranked first.
+* TecMFA_log_generator writes synthetic TecMFALogs.txt of any size & mix (online / offline / failed / local user, 
+MFA, |Error| codes, sessions crossing midnight). TecMFA_benchmark.py --suite [--sizes 1MB,100MB,1GB] parses, 
+summarises & renders them and reports lines/s, instances/s, time per stage & peak RSS.
+* Run record: every stage of every host (probe, fetch & bytes transferred, parse, summarise, commit, render) is 
+timed and appended as a JSON line to .\run_record.jsonl (record_stage, written in batches after probing, each 
+sweep & window by write_run_records), with the exception when it failed. Each 
+window / batch ends with a summary line (Stage "Run": counters of processed, unchanged, unreachable & failed hosts, 
+totals per stage, exceptions grouped by stage, collector_version) which is also printed as a table. Lines a parse 
+handler failed on ("err") are counted per host. A report that fails to render no longer stops the render drain.
+* Regression corpus (.\regression): synthetic & hand written edge case logs (outliers, Okta_to_end fallback, local 
+users, boundaries, CRLF) with their expected instances & summary checked in. TecMFA_regression.py runs every parse 
+engine (frozen copy of the 2.7 parser as reference, line by line, mmap, incremental, streamed & columnar summary) side by side on each 
+log and fails on any mismatch, --throughput times them, --add anonymises a client log into the corpus.
+* Host reports scale with busy machines: columns of the instance table come from one pass over the instances. Above 
+webgl_threshold instances the duration chart is Scattergl of the points kept by LTTB downsampling (lttb, 
+downsample_points per line). Above table_inline_rows the report's table holds the latest instances only and older 
+ones are paged in from .\report\<host>.instances.js when asked for. Reports of smaller hosts are unchanged.
+* Fleet dashboard (TecMFA_dashboard, .\dashboard\index.html): per tenancy (tenancy_hostlists) daily totals &
+percentiles, one row per host and one shard per day, pre-aggregated from the event store after each run. Only the
+days that received instances since the last build (instances.ingested) are aggregated again unless --full - 
+however old the instances of a host collected late. The page loads the shards it needs as scripts so it
+works from file://. The cumulative all hosts chart is only drawn up to fleet_chart_max_hosts.
 """
 from datetime import datetime as dt
 from datetime import time as t
-import glob
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import hashlib
+import json
 import os
+import queue
+import sqlite3
+import threading
 import time
 import shutil
-import pythonping
-import plotly.graph_objects as go
-import plotly.subplots as sp
+from TecMFA_dashboard import build_dashboard
+from TecMFA_probe import forget_probe, probe_hosts
+from TecMFA_parser_core import (
+    checkpoint_dir, fingerprint_log_head, instance_from_row, instance_row, merge_sketches, merge_summaries, 
+    new_checkpoint, new_summary, resume_checkpoint, save_checkpoint, sketch_percentiles, stream_log, summary_add, 
+    summary_finish
+)
 
 # globals
 processed = False # process only once a day?
@@ -67,51 +163,26 @@ hostlist = r".\hostlist.txt"
 temporary_dir = r".\temp"
 report_output = r".\report"
 summarised_output = r".\output"
-average_output_end_to_end = r".\average_output_end_to_end"
-average_output_okta_to_end = r".\average_output_okta_to_end"
 average_report = r".\average_report"
+event_store = r".\tecmfa.sqlite" # every parsed instance & daily averages of all hosts
+fingerprint_tail_bytes = 65536 # length of tail of log hashed to tell whether it changed since last processed
+render_workers = 2 # processes rendering queued reports
+render_during_window = True # drain the render queue while collecting, False to render once the window has closed
+render_poll_seconds = 5 # how often an idle render drain checks the queue during the window
 start_time = [23, 30]
 end_time = [23, 59]
-
-def obtain_raw_log_file_n_path(path):
-    """check if new txt file has been copied for processing. Also grab timestamp file in directory.
-    """
-    file = max(glob.glob(os.path.join("{}".format(path), "*")), key=os.path.getmtime)
-    timestamp = os.path.getmtime(file)
-    return (file, timestamp)
-
-def file_updated_previous_day(folder, file):
-    try: 
-        path = folder + file
-        if os.path.exists(path):  
-            creation_time = os.path.getmtime(path)
-            diff = time.time() - creation_time 
-        else: 
-            return True # so as to initiate creation of file.
-    except Exception as e: 
-        print("s:", e)
-
-    if diff >= 86400: # over 24 hours since last processed. 
-        return True 
-    else: 
-        return False
-
-def determine_network_type(ip): # based on IP address
-    """
-    10.x.x.x == SIM # change as required to indicate WWAN connection
-    172.x.x.x == VPN # change as required to indicate company VPN
-    # get IP range for all the different lans on the network? or all else being LAN or office wifi? 
-    Return type of network
-    """
-    try: 
-        if ip[:6] == "10.1.": # change as required to indicate WWAN IP
-            return "4G"
-        elif ip[:6] == "172.1" or ip[:6] == "172.2": # change as required to indicate company VPN IP address ranges
-            return "VPN"
-        else: # everything else i.e. lan office. 
-            return "LAN"
-    except Exception as e: 
-        print("r1:", e) 
+remote_log = r"\\{host}\c$\Program Files\TecMFA\Logs\TecMFALogs.txt" # read over UNC, no drive letter required
+fetch_workers = 32 # hosts pinged & copied concurrently (network bound)
+process_workers = 4 # logs parsed, summarised & rendered concurrently
+parse_workers = os.cpu_count() or 1 # processes parsing & summarising logs, 0 to parse in the process worker thread
+pipeline_queue_depth = 64 # fetched logs allowed to wait for a process worker before fetching pauses (backpressure)
+delta_fetch = True # only transfer the appended tail of the remote log, False to always copy the entire log
+retry_backoff_seconds = 30 # wait before re-attempting a host that couldn't be fetched, doubles with each failure
+retry_backoff_max_seconds = 600 # longest wait between attempts of one host
+never_collected_days = 365 # staleness of a host never collected, puts it ahead of hosts with any history
+run_record = r".\run_record.jsonl" # per host per stage timings & a summary of each window, one JSON object per line
+collector_version = "2.8" # written to each run summary, to compare runs across releases
+fleet_chart_max_hosts = 500 # cumulative chart (2 traces per host) only drawn up to this many hosts, the dashboard covers any number
 
 def create_nonexistent_directories(): 
     """
@@ -127,376 +198,18 @@ def create_nonexistent_directories():
         if not os.path.exists(summarised_output): 
             os.makedirs(summarised_output)
 
-        if not os.path.exists(average_output_end_to_end): 
-            os.makedirs(average_output_end_to_end)
-
-        if not os.path.exists(average_output_okta_to_end): 
-            os.makedirs(average_output_okta_to_end)
-
         if not os.path.exists(average_report): 
             os.makedirs(average_report)
 
+        if not os.path.exists(checkpoint_dir): 
+            os.makedirs(checkpoint_dir)
+
         if not os.path.exists(hostlist): 
             with open(hostlist, "w") as f: 
                 pass
     except Exception as e: 
         print("create_nonexistent_directories:", e) 
 
-def extract_hostname_from_path(path):
-    hostname_line = ""
-    with open(path, "r") as log:
-        for line in log:
-            if "machineName" in line:
-                hostname_line = line
-                break
-    hostname_line = hostname_line.split(" ")
-    for line in hostname_line:
-        if "machineName" in line:
-            return line[12:]
-                
-    return path[path.rfind("\\")+1:-3]
-
-def extract_averages_from_file(mode, directory):
-    """
-    To be used with files in average_output_end_to_end directory & average_output_okta_to_end.
-    returns temp{"hostname": [1.1, 2.2, 3.3, n], "hostname2": [5.5, n]} 
-    """
-    temp = dict()
-    for host in os.listdir(directory):
-        try:
-            with open(os.path.join(directory, host), "r") as f:
-                temp[host[:-4]] = []
-                for line in f:
-                    if mode == "summary": # end to end
-                        listified_line = line.strip().split(",")
-                        online_e2e_avg, offline_e2e_avg = listified_line[0], listified_line[1]
-                        daily_avg_for_host = [float(online_e2e_avg), float(offline_e2e_avg)]
-                        temp[host[:-4]].append(daily_avg_for_host)
-                    elif mode == "okta": # okta to end
-                        temp[host[:-4]] = float(line.strip())
-        except Exception as e:
-            print("o:", e)
-    return {"Data": temp}
-
-def process_log(path):
-    """
-    Rules: 
-    # "Current selected factor:" blank means 'remember 24 hours' likely set while on VPN or 10.55.x.x
-    # "TecMFA UI Initiated" marks the start of the instance 
-    # look for |Error| 
-        # Add to dictionary under ["Error]
-    # Look for either: "=====" (Auth failed and instance concluded) OR online_success OR offline_success
-    # "ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully OR 
-        "OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP."
-        # means success
-    # check 
-
-    Shape of block (list of dictionaries) - each MFA instance is a dictionary:
-    [
-        {
-            Instance: <used to plot instances in sequence> , 
-            Date: <log entry>, Time: <log entry>, Version: <log entry>, 
-            Auth_type: <online / offline>, Auth_sub_type: <24_or_office, sms_okta, push_okta>,
-            Outcome: <succeeded / failed / timeout | cancelled>, IP: "", Network_type: <4G, LAN, VPN>, Errors: <row of error after |Error|>,
-            End_to_end: <time in seconds>,
-            Okta_to_end: <time in seconds> # Okta (online) to end of MFA instance
-        }
-    ]
-
-    Averaged data: 
-    Using above block, 
-
-    returns list of summarised dictionaries (blocks)
-    """
-
-    def calc_section_times(prev, now):
-        try:
-            if prev != "" and now != "": 
-                prev = dt.strptime(prev, "%H:%M:%S.%f")
-                now = dt.strptime(now, "%H:%M:%S.%f")
-                delta = now - prev
-                return round(delta.total_seconds(),2)
-            else: 
-                return 0
-        except Exception as e:
-            print("d:", e)
-            return 0
-
-    def initialise_or_reset_block(): # an instance of MFA inside log file specified by activity between ==== rows.
-        return {
-            "Instance": 0, "Date": "", "Time": "", "Version": "8.1", "Auth_type": "", 
-            "Auth_sub_type": "", "Outcome": "", "IP": "", "Network_type": "", "Errors": "", 
-            "End_to_end": "", "Okta_to_end": ""
-            }
-
-    # Anomalies
-    # to be used if no auth success (online or offline) - time stamp to be used to specify time taken without success
-    spec_offline_initiate = "OfflineTOTP authentication user control loaded" # anomaly #1
-    # anomaly - no auth success (on or offline) and no spec_offline_initiate - outcome of: failure 
-    spec_online_failure = "Okta non recoverable error message label: Authentication Failed" # anomaly #2
-    # anomaly #3 - not registered for offline! 
-    spec_not_registered_for_offline = "Your computer is offline. Please register with any offline factor"
-    # anomaly #4 - No offline enrollments exists for user - not yet used
-    # 
-    # anomaly #5 - PASSWORD_CHANGED: 
-    spec_pw_changed = "PASSWORD_CHANGED:"
-
-    spec_ip_check_1 = "XForwadedIP is sent through the request"
-    spec_ip_check_2 = "localIP" # note if offline, no IP is specified
-
-    # errors
-    error_header = "|Error|"
-    known_exceptions = [ # occurences of error code are followed by the worded errors in list, just for reference.
-        "Your passCode doesn't match our records. Please try again.", # Error : Code - E0000068
-        "Authentication Failed", # Error : Code - E0000004
-        "An SMS message was recently sent. Please wait 30 seconds before trying again.", # Error : Code - E0000109
-        "Your token doesn't match our records. Please try again." # Error : Code - E0000068 
-        ]
-
-    # constants i.e. doesn't change for the entire log
-    entire_log = [] # holds dictionaries as specified in the block (initialise_or_reset_block) - later to be processed for averaging
-    hostname = extract_hostname_from_path(path)
-    username = "-" # identified once per entire log not inside block
-
-    error_count = 0
-    instance_count = 0
-
-    # initialised to 0 so not to get reference before creation exception
-    d_start = ""
-    t_start = ""
-    d_end = ""
-    t_end = ""
-    d_contingency_end = ""
-    t_contingency_end = ""
-    okta_start_date = "" # stub
-    okta_start_time = ""
-    okta_end_date = "" # stub
-    okta_end_time = ""
-
-    flag_mfa = False
-    flag_local_user = False # used to exclude from collection & analysis - 2.6.6
-
-    block = initialise_or_reset_block()
-
-    with open(path, "r") as log:
-        next(log) # skip the first line which is always =====
-        
-        n_minus_1 = "" 
-        n_minus_2 = "" # typically "====="
-        n_minus_3 = "" # typically last known entry for TecMFA instance
-        
-        for line in log:
-            try:
-                # Keep last 2 lines in memory
-                n_minus_3 = n_minus_2 # n-3
-                n_minus_2 = n_minus_1 # n-2
-                n_minus_1 = line # current or n-1
-
-                if "TecMFA UI Initiated" in line: # start of a new instance of authentication
-                    if "=====" in n_minus_2: # Means block is finished: 
-                        d_end, t_end = extract_date_time(n_minus_3)
-                        elapsed_time = calc_section_times(prev=t_start, now=t_end)
-                        if elapsed_time <= 0 or elapsed_time > 300: # extreme outliers / anomalies remove from report
-                            pass
-                        else: 
-                            block["End_to_end"] = elapsed_time
-                            # Check if empty, then fail otherwise succeed
-                            if block["Outcome"] == "": 
-                                block["Outcome"] = "Failed / Cancelled"
-
-                            # Check if online (has IP)
-                            if block["IP"] != "" and block["Auth_type"] != "Offline": 
-                                block["Auth_type"] = "Online" 
-                                okta_elapsed_time = calc_section_times(prev=okta_start_time, now=okta_end_time)
-                                if okta_elapsed_time == 0: # failed to auth i.e. didn't get an okta time due to ERROR
-                                    okta_elapsed_time = calc_section_times(prev=okta_start_time, now=t_end)
-                                    block["Auth_sub_type"] = "24hr | Office" # Anomaly for blank output in report - comment out line to observe in report.
-                                block["Okta_to_end"] = okta_elapsed_time
-                            else: 
-                                block["Auth_type"] = "Offline"
-
-                            # Check if local user
-                            if flag_local_user == False: 
-                                instance_count += 1
-                                block["Instance"] = instance_count
-                                entire_log.append(block) # *********** ADD
-                            else: 
-                                flag_local_user = False
-
-                        # Reset timers
-                        okta_start_time = ""
-                        okta_end_time = ""
-                        t_start = ""
-                        t_end = ""
-
-                        flag_mfa = False
-                        block = initialise_or_reset_block() # Reset
-                    if "Version : v8.2" in line: # extract version
-                        block["Version"] = "8.2"
-                    d_start, t_start = extract_date_time(line)
-                    block["Date"] = d_start 
-                    block["Time"] = t_start[:-5]
-                    # t_contingency_end = "" # reset contingency for each block! 
-                elif "SAM value" in line: # username
-                    username = extract_username(extract_log_entry(line)).strip()
-                elif spec_ip_check_1 in line: # extract IP from localIP line
-                    block["IP"] = extract_ip_1(extract_log_entry(line)).strip()
-                    block["Network_type"] = determine_network_type(block["IP"]) # SIM, VPN or LAN
-                elif spec_ip_check_2 in line: # extract IP from XForwardedIP line
-                    block["IP"] = extract_ip_2(extract_log_entry(line)).strip()
-                    block["Network_type"] = determine_network_type(block["IP"]) # SIM, VPN or LAN
-                elif error_header in line: # look for and process |Error|
-                    error_count += 1 
-                    block["Errors"] += extract_log_entry(line)[1:] + "<br>" # add error to Error list of block 
-                elif "ONLINE_AUTHN_SUCCESS: Authenticated with Okta successfully." in line: # SUCCESS - online
-                    block["Auth_type"] = "Online"
-                    d_end, t_end = extract_date_time(line) # calculate end time for instance
-                    if flag_mfa == False:
-                        okta_end_time = t_end
-                    block["End_to_end"] = calc_section_times(prev=t_start, now=t_end)
-                    block["Outcome"] = "Success"
-                elif "OFFLINE_TOTP_AUTHN_SUCCESS: Authenticated with Offline Hardware TOTP." in line: # SUCCESS - offline
-                    block["Auth_type"] = "Offline"
-                    d_end, t_end = extract_date_time(line) # calculate end time for instance
-                    block["End_to_end"] = calc_section_times(prev=t_start, now=t_end)
-                    block["Outcome"] = "Success"
-                elif "Current selected factor:" in line: # check auth sub type - only occurs after online_success
-                    block["Auth_sub_type"] = extract_current_selected_factor(extract_log_entry(line))
-                elif spec_offline_initiate in line: # used as contingency to missing on/off successful auth
-                    d_contingency_end, t_contingency_end = extract_date_time(line)
-                elif spec_online_failure in line: # online failure
-                    d_end, t_end = extract_date_time(line)
-                elif spec_not_registered_for_offline in line: # failure - no offline mechanism registered! 
-                    d_end, t_end = extract_date_time(line)
-                elif spec_pw_changed in line: # failure - anomaly #4
-                    d_end, t_end = extract_date_time(line)
-                elif "Initializing Okta Authentication" in line: # Okta start - mark start of OKTA process - 2.6.6
-                    okta_start_date, okta_start_time = extract_date_time(line)
-                elif "In ProcessAuthnResponse Status: MFA_REQUIRED" in line: # mark start of MFA required OKTA response - i.e. otherwise would be end of non-MFA OKTA process 2.6.6
-                    okta_end_date, okta_end_time = extract_date_time(line)
-                    flag_mfa = True
-                elif "Bypassing TecMFA for local users." in line: 
-                    flag_local_user = True
-            except Exception as e:
-                print("err", e)
-    return {"Data": entire_log, "Username": username, "Hostname": hostname} # for averaging with another function
-
-def calculate_summary_table_data(block): 
-    """
-    Takes calculated block and returns data for creating table (2nd table)
-    """
-    summary = {
-        "Block_instance_total": len(block["Data"]), 
-        "Online": {
-            "Count": 0, "Online_%": 0, "Success_%": 0, "Success_count": 0
-            }, # "Online_%" calculated by dividing ["Online"]["Count"] divided by ["Block_instance_total"]
-        "Offline": {
-            "Count": 0, "Offline_%": 0, "Success_%": 0, "Success_count": 0
-            }, # "Offline_%" calculated by dividing ["Offline"]["Count"] divided by ["Block_instance_total"]
-        "Auth_sub_type": {
-            "24hr_or_office_count": 0, "SMS:OKTA_count": 0, "PUSH:OKTA_count": 0
-        },
-        "Errors": {
-            "Count": 0
-        }, 
-        "Network_type": {
-            "4G_count": 0, "VPN_count": 0, "LAN_count": 0, 
-            "4G_%": 0, "VPN_%": 0, "LAN_%": 0 # _% calculated by _count divided by ["Block_instance_total"]
-        },
-        "End_to_end_sums": {
-            "Online": 0, "Offline": 0, 
-        }, 
-        "End_to_end_averages": { 
-            "Online": 0, # ["End_to_end_sums"]["Online"] divided by ["Online"]["Count"]
-            "Offline": 0 # ["End_to_end_sums"]["Offline"] divided by ["Offline"]["Count"]
-        }, 
-        "Okta_to_end_sums": 0, 
-        "Okta_to_end_averages": 0 # ["Okta_to_end_sums"] divided by ["Online"]["Count"]
-    }
-
-    try: 
-        for instance in block["Data"]:
-            if instance["Auth_type"] == "Online": # Auth, outcomes & end_to_end sum
-                summary["Online"]["Count"] += 1
-                if instance["Outcome"] == "Success":
-                    summary["Online"]["Success_count"] += 1
-                    # TODO: check whether all online is equivalent to usage of Okta 
-                try: 
-                    summary["Okta_to_end_sums"] += float(instance["Okta_to_end"])
-                except Exception as e:
-                    print("x:", e)
-                try: 
-                    summary["End_to_end_sums"]["Online"] += float(instance["End_to_end"])
-                except Exception as e: 
-                    print("xx:", e)
-            elif instance["Auth_type"] == "Offline": 
-                summary["Offline"]["Count"] += 1 
-                if instance["Outcome"] == "Success":
-                    summary["Offline"]["Success_count"] += 1
-                try: 
-                    summary["End_to_end_sums"]["Offline"] += float(instance["End_to_end"])
-                except Exception as e: 
-                    print("y:", e)
-
-            if instance["Auth_sub_type"] == "SMS:OKTA": # Auth sub types
-                summary["Auth_sub_type"]["SMS:OKTA_count"] += 1
-            elif instance["Auth_sub_type"] == "PUSH:OKTA": 
-                summary["Auth_sub_type"]["PUSH:OKTA_count"] += 1
-            elif instance["Auth_sub_type"] == "24hr | Office": 
-                summary["Auth_sub_type"]["24hr_or_office_count"] += 1
-            
-            if instance["Network_type"] == "4G": # Network types
-                summary["Network_type"]["4G_count"] += 1
-            elif instance["Network_type"] == "VPN": 
-                summary["Network_type"]["VPN_count"] += 1
-            elif instance["Network_type"] == "LAN": 
-                summary["Network_type"]["LAN_count"] += 1
-
-            if len(instance["Errors"]) != 0: # Errors
-                summary["Errors"]["Count"] += len(instance["Errors"])
-    except Exception as e: 
-        print("w:", e) 
-
-    try: # Calculate end_to_end time averages 
-        # 0 count check
-        if summary["Online"]["Count"] != 0:
-            summary["End_to_end_averages"]["Online"] = round(summary["End_to_end_sums"]["Online"] / summary["Online"]["Count"], 2) # elapsed time
-            summary["Online"]["Online_%"] = round(summary["Online"]["Count"] / summary["Block_instance_total"] * 100, 1)
-            summary["Online"]["Success_%"] = round(summary["Online"]["Success_count"] / summary["Online"]["Count"] * 100, 1)
-            summary["Okta_to_end_averages"] = round(summary["Okta_to_end_sums"] / summary["Online"]["Count"], 2) # new! 
-
-        # 0 count check
-        if summary["Offline"]["Count"] != 0: 
-            summary["End_to_end_averages"]["Offline"] = round(summary["End_to_end_sums"]["Offline"] / summary["Offline"]["Count"], 2) # elapsed time
-            summary["Offline"]["Offline_%"] = round(summary["Offline"]["Count"] / summary["Block_instance_total"] * 100, 1)
-            summary["Offline"]["Success_%"] = round(summary["Offline"]["Success_count"] / summary["Offline"]["Count"] * 100, 1)
-
-        # 0 count check 
-        if summary["Network_type"]["4G_%"] != 0: 
-            summary["Network_type"]["4G_%"] = round(summary["Network_type"]["4G_count"] / summary["Block_instance_total"] * 100, 1)
-        if summary["Network_type"]["VPN_%"] != 0: 
-            summary["Network_type"]["VPN_%"] = round(summary["Network_type"]["VPN_count"] / summary["Block_instance_total"] * 100, 1)
-        if summary["Network_type"]["LAN_%"] != 0: 
-            summary["Network_type"]["LAN_%"] = round(summary["Network_type"]["LAN_count"] / summary["Block_instance_total"] * 100, 1)
-    except Exception as e: 
-        print("z:", e)
-
-    """ Sample output of summary: - v2.6.6 - Auth_sub_type is applicable for only Okta types.
-    {
-        'Block_instance_total': 144, 
-        'Online': {'Count': 118, 'Online_%': 0.8194444444444444, 'Success_%': 0.9491525423728814, 'Success_count': 112}, 
-        'Offline': {'Count': 26, 'Offline_%': 0.18055555555555555, 'Success_%': 1.0, 'Success_count': 26}, 
-        'Auth_sub_type': {'24hr_or_office_count': 81, 'SMS:OKTA_count': 31, 'PUSH:OKTA_count': 22}, 
-        'Errors': {'Count': 56}, 
-        'Network_type': {'4G_count': 4, 'VPN_count': 84, 'LAN_count': 31, '4G_%': 0.027777777777777776, 'VPN_%': 0.5833333333333334, 'LAN_%': 0.2152777777777778}, 
-        'End_to_end_sums': {'Online': 1820.3257000000006, 'Offline': 684.8079999999999}, 
-        'End_to_end_averages': {'Online': 15.426488983050852, 'Offline': 26.338769230769227}},
-        'Okta_to_end_sums': 450.55, 
-        'Okta_to_end_averages': 3.128819444444444
-
-    """
-    return summary
-
 def generate_hostlist(hostlist):
     """
     Modify .\hostlist.txt - will check if file has changed, if it has will process
@@ -524,415 +237,1063 @@ def all_hosts_processed(hostlist):
     except Exception as e:
         print("c:", e)
 
-def commit_summarised_data_to_file(summary, latest_log):
+store_connection = None
+store_lock = threading.Lock() # one connection shared by the process worker threads
+
+def open_event_store():
     """
-    Write to txt file output from process_log function.
-    data: list of dictionaries.
-    Shape of txt file, two only: ["End_to_end_averages"]["Online"], ["End_to_end_averages"]["Offline"]
+    Connection to event_store, tables & indexes created on first use. host of every table is the host's name in 
+    hostlist.txt (the device name it is fetched by), not the machineName in its log - tenancy hostlists, run_hosts 
+    & host_history all match it whatever the log calls itself.
+    instances: every MFA instance parsed (process_log block) for every host, ingested: epoch seconds of the commit 
+    that wrote it - the dashboard aggregates again only the days that received rows since its last build.
+    daily_averages: one row per host per day, what used to be a line in average_output_end_to_end\<host>.txt and 
+    the content of average_output_okta_to_end\<host>.txt.
+    log_fingerprints: fingerprint_log of each host's log when it was last processed.
+    host_sketches: JSON of summary["Sketches"] (sketch_durations) of every stored instance of each host.
+    host_summaries: running summary (calculate_summary_table_data, without Sketches) of every stored instance of 
+    each host, the machineName (hostname) & username of its log - grows by the instances of each parse.
+    render_queue: hosts whose report is waiting to be rendered (from the tables above), latest per host.
+    host_history: when each host was last seen & collected, its log size & growth and how often it answered 
+    by hour of day (JSON) - the order hosts are collected in (prioritise_hosts).
+    run_windows & run_hosts: progress of each collection window (see run_collection_window) - a restart during 
+    the window carries on with the hosts not yet done & their retry timers.
     """
-    hostname = extract_hostname_from_path(latest_log)
-
-    try: 
-        temp = ""
-        if file_updated_previous_day(r"./average_output_end_to_end", hostname):
-            with open(r".\average_output_end_to_end\{}.txt".format(hostname), "a+") as f:
-                temp += str(summary["End_to_end_averages"]["Online"]) + "," + str(summary["End_to_end_averages"]["Offline"]) # version 2.3
-                f.write(temp + "\n")
-    except Exception as e:
-        print("Commit_summarised_data_to_file - summary:", e)
-    try: 
-        temp = ""
-        if file_updated_previous_day(r"./average_output_okta_to_end", hostname):
-            with open(r".\average_output_okta_to_end\{}.txt".format(hostname), "w") as f: # only one val required
-                temp = str(summary["Okta_to_end_averages"]) # version 2.4
-                f.write(temp + "\n")
-    except Exception as e:
-        print("Commit_summarised_data_to_file - Okta:", e)
-            
-def plot_graph(mode, block, summary=None):
+    global store_connection
+    if store_connection is None: 
+        connection = sqlite3.connect(event_store, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS instances (
+                host TEXT NOT NULL, username TEXT, instance INTEGER, date TEXT NOT NULL, time TEXT NOT NULL, 
+                version TEXT, auth_type TEXT, auth_sub_type TEXT, outcome TEXT, ip TEXT, network_type TEXT, 
+                errors TEXT, end_to_end REAL, okta_to_end REAL, ingested REAL, 
+                PRIMARY KEY (host, date, time, instance) -- time is to the second, instance tells apart 2 in one second
+            );
+            CREATE INDEX IF NOT EXISTS instances_by_date ON instances (date);
+            CREATE INDEX IF NOT EXISTS instances_by_ingested ON instances (ingested);
+            CREATE TABLE IF NOT EXISTS daily_averages (
+                host TEXT NOT NULL, day TEXT NOT NULL, 
+                online_end_to_end REAL, offline_end_to_end REAL, okta_to_end REAL, 
+                PRIMARY KEY (host, day)
+            );
+            CREATE TABLE IF NOT EXISTS log_fingerprints (
+                host TEXT PRIMARY KEY, size INTEGER, mtime REAL, tail_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS host_sketches (
+                host TEXT PRIMARY KEY, sketches TEXT
+            );
+            CREATE TABLE IF NOT EXISTS host_summaries (
+                host TEXT PRIMARY KEY, hostname TEXT, username TEXT, summary TEXT
+            );
+            CREATE TABLE IF NOT EXISTS render_queue (
+                host TEXT PRIMARY KEY, queued_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS host_history (
+                host TEXT PRIMARY KEY, last_seen REAL, last_collected REAL, log_size INTEGER, growth REAL, 
+                availability TEXT
+            );
+            CREATE TABLE IF NOT EXISTS run_windows (
+                window TEXT PRIMARY KEY, finished INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS run_hosts (
+                window TEXT NOT NULL, host TEXT NOT NULL, done INTEGER, attempts INTEGER, next_attempt REAL, 
+                PRIMARY KEY (window, host)
+            );
+            """)
+        store_connection = connection
+    return store_connection
+
+stored_instance_columns = "instance, date, time, version, auth_type, auth_sub_type, outcome, ip, network_type, errors, end_to_end, okta_to_end"
+
+def stored_instances(connection, device):
     """
-    Parameters: 
-    Block: processed_device_block, device_summarised or cumulative_devices_summary - depending on type of output desired.
-    Mode:
-    "graph: individual host" - includes 2 tables in addition to line graph.
-    "graph: cumulative" - reads txt files from average_output_end_to_end & okta_to_end directories to craft line graph
+    Instance records of every stored instance of device, oldest first.
     """
+    return [
+        instance_from_row(row) for row in connection.execute(
+            "SELECT {} FROM instances WHERE host = ? ORDER BY date, time, instance".format(stored_instance_columns), (device,)
+        )
+    ]
 
-    headerColor = "grey"
-    rowEvenColor = "lightgrey"
-    rowOddColor = "white"
+def load_host_summary(connection, device):
+    """
+    (hostname, username, running summary with its Sketches) of device from host_summaries & host_sketches, None 
+    if it has none yet.
+    """
+    row = connection.execute(
+        "SELECT s.hostname, s.username, s.summary, k.sketches FROM host_summaries s JOIN host_sketches k ON k.host = s.host WHERE s.host = ?", 
+        (device,)
+    ).fetchone()
+    if row is None: 
+        return None
+    summary = json.loads(row[2])
+    summary["Sketches"] = json.loads(row[3])
+    return (row[0], row[1], summary)
+
+def summarise_stored_instances(connection, device):
+    summary = new_summary()
+    for row in connection.execute("SELECT {} FROM instances WHERE host = ?".format(stored_instance_columns), (device,)): 
+        summary_add(summary, instance_from_row(row))
+    return summary
 
-    x_axis = []
-    datapoint = 0 # x i.e. instances
-    end_to_end = []
-    okta_to_end = []
-    
-    if mode == "graph: individual host": # includes two other tables. 
-        username = block["Username"]
-        hostname = block["Hostname"]
-    
-        try: 
-            for instance in block["Data"]:
-                datapoint += 1
-                x_axis.append(datapoint)
-                end_to_end.append(instance["End_to_end"])
-                okta_to_end.append(instance["Okta_to_end"])
-        except Exception as e: 
-            print("e3:", e)
-
-        try: # table: individual instances or the device
-            table_individual_instances = go.Table(
-                header=dict(values=[
-                    "#", "Date", "Time", "Duration (secs)", "Version", "Auth type", 
-                    "Online auth", "Okta duration (secs)", "Outcome", "IP", "Network", "Errors"
-                    ],
-                    line_color="darkslategray", 
-                    fill_color=headerColor,
-                    align="center",
-                    font=dict(color='white', size=15)
-                ), 
-                cells=dict(values=[
-                    [val["Instance"] for val in block["Data"]], 
-                    [val["Date"] for val in block["Data"]], 
-                    [val["Time"] for val in block["Data"]], 
-                    [val["End_to_end"] for val in block["Data"]], 
-                    [val["Version"] for val in block["Data"]], 
-                    [val["Auth_type"] for val in block["Data"]], 
-                    [val["Auth_sub_type"] for val in block["Data"]], 
-                    [val["Okta_to_end"] for val in block["Data"]],
-                    [val["Outcome"] for val in block["Data"]], 
-                    [val["IP"] for val in block["Data"]], 
-                    [val["Network_type"] for val in block["Data"]], 
-                    [val["Errors"] for val in block["Data"]]
-                    ],
-                    line_color="darkslategray", 
-                    fill_color = [[rowOddColor,rowEvenColor,rowOddColor, rowEvenColor,rowOddColor]*5],
-                    align=["center","center","center","center","center","center","center","center","center","center","center","left"],
-                    font = dict(color = 'darkslategray', size = 13)
-                ), 
-                columnwidth=[1,2,2,2,2,2,2,2,2,2,2,10]
-            )
-        except Exception as e: 
-            print("t:", e)
-
-        try: # table: summarised for entire device log 
-            table_summary_auth = go.Table(
-                header=dict(values=[
-                    "Auth count", "Online %", "Offline %", "Online success %", "Offline success %", "Avg Online duration (sec)", 
-                    "Avg Offline duration (sec)", "Avg Okta duration (sec)", "4G %", "VPN %", "LAN %"
-                    ],
-                    line_color='darkslategray',
-                    fill_color='lightskyblue',
-                    align="center", 
-                    font=dict(color='darkslategray', size=15)
-                ), 
-                cells=dict(values=[
-                    [summary["Block_instance_total"]],
-                    [summary["Online"]["Online_%"]], 
-                    [summary["Offline"]["Offline_%"]],
-                    [summary["Online"]["Success_%"]],
-                    [summary["Offline"]["Success_%"]],
-                    [summary["End_to_end_averages"]["Online"]],
-                    [summary["End_to_end_averages"]["Offline"]],
-                    [summary["Okta_to_end_averages"]],
-                    [summary["Network_type"]["4G_%"]],
-                    [summary["Network_type"]["VPN_%"]], 
-                    [summary["Network_type"]["LAN_%"]]
-                ],
-                    line_color='darkslategray',
-                    fill_color='lightcyan',
-                    align="center", 
-                    font=dict(color='darkslategray', size=13)
-                ), 
-                columnwidth=[1,2,2,2,2,2,2,2,2,2,2,2,2,2,2]
-            )
-        except Exception as e: 
-            print("t2:", e)
-
-        try: # build and export the report which includes the graph and 2x tables.
-            fig = sp.make_subplots( # https://plotly.com/python/table-subplots/
-                rows=9,
-                cols=1, 
-                specs=[
-                    [{"type": "xy", "rowspan": 4}], 
-                    [{"type": "xy"}], 
-                    [{"type": "xy"}], 
-                    [{"type": "xy"}], 
-                    [{"type": "table", "rowspan": 3}],
-                    [{"type": "table"}], 
-                    [{"type": "table"}],
-                    [{"type": "table", "rowspan": 2}],
-                    [{"type": "table"}]
-                ],
-                vertical_spacing=0.06
-            )
-            # line graph
-            fig.add_trace(go.Scatter(
-                    x = x_axis,
-                    y = end_to_end,
-                    name="End to end duration (sec)",
-                    marker=dict(size=3),
-                    line=dict(width=1)
-                    ), row=1, col=1, 
-                )
-            fig.add_trace(go.Scatter(
-                    x = x_axis, 
-                    y = okta_to_end, 
-                    name="Okta response duration (sec)",
-                    marker=dict(size=3),
-                    line=dict(width=1)
-                    ), row=1, col=1, 
+def commit_summarised_data_to_file(device, block, summary):
+    """
+    Write output from parse_host_log to event_store under device (hostlist name).
+    block: rows of the instances parsed since the host's checkpoint (every instance of the log after a full parse), summary: 
+    summary of those. summary is merged into the host's running summary (host_summaries & host_sketches) - after 
+    a full parse (first / rotated / truncated log) that is worked out again from every stored instance of the host 
+    instead - and today's averages are taken from it. Nothing parsed before the checkpoint is read or written again.
+    Everything for the host is written in one transaction. Raises (recorded as the Commit stage) if it failed.
+    Returns the running summary.
+    """
+    username = block["Username"]
+    commit_start = time.perf_counter()
+    ingested = time.time()
+    rows = ((device, username) + row + (ingested,) for row in block["Data"]) # block["Data"]: instance_row tuples (parse_host_log)
+    try: 
+        with store_lock: 
+            connection = open_event_store()
+            with connection: # transaction
+                connection.executemany("INSERT OR REPLACE INTO instances VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+                stored = load_host_summary(connection, device) if block["Resumed"] else None
+                if stored is None: 
+                    host_summary = summarise_stored_instances(connection, device)
+                else: 
+                    host_summary = merge_summaries(stored[2], summary)
+                summary_finish(host_summary)
+                connection.execute(
+                    "INSERT OR REPLACE INTO daily_averages VALUES (?,?,?,?,?)", (
+                        device, dt.now().strftime("%Y-%m-%d"), host_summary["End_to_end_averages"]["Online"], 
+                        host_summary["End_to_end_averages"]["Offline"], host_summary["Okta_to_end_averages"]
+                    )
                 )
-            fig.add_trace(table_individual_instances, row=5, col=1) # table 1
-            fig.add_trace(table_summary_auth, row=8, col=1) # table 2
-            
-            fig.update_layout(
-                title = hostname + "//" + username,
-                xaxis_title = "End to end times for TechMFA instances",
-                yaxis_title = "Time (sec)",
-                legend_title = "Legend",
-                font=dict(
-                    family = "Courier New, monospace",
-                    size = 18,
-                    color = "RebeccaPurple"
-                    ), 
-                height=2500
+                connection.execute(
+                    "INSERT OR REPLACE INTO host_sketches VALUES (?,?)", (device, json.dumps(host_summary["Sketches"]))
                 )
-            fig.write_html(r".\report\{}.html".format(hostname)) # write report to directory
-        except Exception as e: 
-            print("plot err:", e)
-        
-    elif mode == "graph: cumulative": # cumulative_devices_summary
-        try:
-            fig = go.Figure()
-            for host in block["Data"]: # device_summarised
-                datapoint = 0 
-                x_axis = [] 
-                averages_online = [] 
-                averages_offline = [] 
-
-                for list_of_two_averages in block["Data"][host]:
-                    datapoint += 1
-                    x_axis.append(datapoint)
-                    averages_online.append(list_of_two_averages[0])
-                    averages_offline.append(list_of_two_averages[1])
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x = x_axis[:],
-                        y = averages_online[:],
-                        name = host + ": " + "Online avg", # mojo
-                        marker=dict(size=3),
-                        line=dict(width=1)
-                        )
-                    )
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x = x_axis[:], 
-                        y = averages_offline[:],
-                        name = host + ": " + "Offline avg",
-                        marker=dict(size=3),
-                        line=dict(width=1)
+                connection.execute(
+                    "INSERT OR REPLACE INTO host_summaries VALUES (?,?,?,?)", (
+                        device, block["Hostname"], username, 
+                        json.dumps(dict((key, value) for key, value in host_summary.items() if key != "Sketches"))
                     )
                 )
+        record_stage(device, "Commit", time.perf_counter() - commit_start)
+        return host_summary
+    except Exception as e:
+        print("Commit_summarised_data_to_file:", e)
+        record_stage(device, "Commit", time.perf_counter() - commit_start, error=e)
+        raise
 
-            fig.update_layout(
-                title = "Daily snapshot of end-to-end average (online & offline) based on entire log (per host)",
-                xaxis_title = "Snapshot (daily)",
-                yaxis_title = "Time (sec)",
-                legend_title = "Legend",
-                font=dict(
-                    family = "Courier New, monospace",
-                    size=18,
-                    color = "RebeccaPurple"
-                    )
-                )
-            fig.write_html(r".\average_report\total_averages.html")
-        except Exception as e:
-            print("p:", e)
+def load_averages_from_store(mode):
+    """
+    Averages for the cumulative & violin charts, one query against event_store:
+    "summary": {"Data": {"host": [[online, offline], n], ...}} - daily end to end averages, oldest first
+    "okta": {"Data": {"host": 1.1, ...}} - latest okta to end average
+    """
+    temp = dict()
+    try: 
+        with store_lock: 
+            rows = open_event_store().execute(
+                "SELECT host, online_end_to_end, offline_end_to_end, okta_to_end FROM daily_averages ORDER BY host, day"
+                ).fetchall()
+        for host, online_e2e_avg, offline_e2e_avg, okta_avg in rows: 
+            if mode == "summary": # end to end
+                temp.setdefault(host, []).append([online_e2e_avg, offline_e2e_avg])
+            elif mode == "okta": # okta to end, last day wins
+                temp[host] = okta_avg
+    except Exception as e: 
+        print("o2:", e)
+    return {"Data": temp}
+            
+def load_quantiles_from_store(hosts=None):
+    """
+    p50/p90/p99 of end to end & okta to end durations merged from host_sketches, nothing else is read.
+    hosts: only these hosts (e.g. a tenancy), None for the entire fleet.
+    returns {"Fleet": {"End_to_end": {"p50": 1.1, "p90": 2.2, "p99": 3.3}, "Okta_to_end": {..}}, 
+             "Network_type": {"4G": {"End_to_end": {..}, "Okta_to_end": {..}}, n}}
+    """
+    quantiles = {"Fleet": {}, "Network_type": {}}
+    try: 
+        with store_lock: 
+            rows = open_event_store().execute("SELECT host, sketches FROM host_sketches").fetchall()
+        sketches = [json.loads(row[1]) for row in rows if hosts is None or row[0] in hosts]
+        for duration in ("End_to_end", "Okta_to_end"): 
+            quantiles["Fleet"][duration] = sketch_percentiles(merge_sketches(sketch[duration] for sketch in sketches))
+        network_types = sorted(set(network_type for sketch in sketches for network_type in sketch["Network_type"]))
+        for network_type in network_types: 
+            quantiles["Network_type"][network_type] = dict(
+                (duration, sketch_percentiles(merge_sketches(
+                    sketch["Network_type"][network_type][duration] for sketch in sketches if network_type in sketch["Network_type"]
+                    ))) for duration in ("End_to_end", "Okta_to_end")
+            )
+    except Exception as e: 
+        print("o3:", e)
+    return quantiles
 
-    elif mode == "graph: violin": 
-        try: 
-            list_of_log_avgs = [] # contains average okta times as calculated for each host/log.
-                        
-            for host in block["Data"]: # device_summarised
-                list_of_log_avgs.append(block["Data"][host])
-
-            fig = go.Figure(
-                data=go.Violin(
-                    x=list_of_log_avgs, 
-                    box_visible=True,
-                    meanline_visible=True,
-                    points="all",
-                    orientation="h",
-                    jitter=0.05,
-                    pointpos=0,
-                    marker=dict(size=3),
-                    line_color="black",
-                    fillcolor="#636EFA",
-                    opacity=0.6,
-                    name="",
-                    )
-                )
+def load_fleet_summary(hosts=None, since=None):
+    """
+    calculate_summary_table_data over every instance in event_store (months of history of the whole fleet), 
+    computed on typed columns by TecMFA_columnar (numpy, imported on first use).
+    hosts: only these hosts, None for the entire fleet. since: "YYYY-MM-DD", only instances from that day on.
+    """
+    import TecMFA_columnar
+    query = "SELECT host, auth_type, auth_sub_type, network_type, outcome, length(coalesce(errors, '')), end_to_end, okta_to_end FROM instances"
+    parameters = ()
+    if since is not None: 
+        query += " WHERE date >= ?"
+        parameters = (since,)
+    try: 
+        with store_lock: 
+            rows = open_event_store().execute(query, parameters).fetchall()
+        return TecMFA_columnar.calculate_summary_from_columns(
+            TecMFA_columnar.columns_from_rows(row[1:] for row in rows if hosts is None or row[0] in hosts)
+        )
+    except Exception as e: 
+        print("o4:", e)
 
-            fig.update_layout(
-                title = "Okta authentication duration averages based on entire log (per host)",
-                yaxis_title = "Tenancy",
-                xaxis_title = "Time (sec)",
-                font=dict(
-                    family = "Courier New, monospace",
-                    size=18,
-                    color = "RebeccaPurple"
-                    )
-                )
-            fig.write_html(r".\average_report\okta_averages_violin.html")
-        except Exception as e: 
-            print("p2:", e)
+def plot_graph(mode, block, summary=None):
+    """
+    TecMFA_report.plot_graph, imported on first use so only processes that render load plotly.
+    """
+    from TecMFA_report import plot_graph as render_graph
+    render_graph(mode, block, summary)
 
 def active_time_range(start, end): # time range during which hostlist.txt is processed
     now = dt.now().time()
-    if now > t(start[0], start[1]) and now < t(end[0], end[1]): # now > 11:30AM AND < 2:00PM
+    if now >= t(start[0], start[1]) and now < t(end[0], end[1]): # now >= 11:30AM AND < 2:00PM
         return True
     else:
         return False
 
-def map_source_location(source):
-    try:
-        os.system(r"NET USE Z: /DELETE /yes")
-    except Exception as e:
-        print("failed to remove mapped drive Z:")
-    try:
-        x = os.system(r"NET USE Z: {source} /persistent:No".format(source=source))
-        return True
-    except Exception as e:
-        print("a:", e)
-        return False
+def host_log_path(device):
+    """
+    Per-host temp location so concurrent fetches never overwrite each other: .\temp\<host>\TecMFALogs.txt
+    """
+    return os.path.join(temporary_dir, device, "TecMFALogs.txt")
 
-def ping_host(d):
-    try:
-        result = pythonping.ping(d.strip(), timeout=2, count=2)
-        if result.success():
-            return True
-    except Exception as e:
-        # print("b:", e)
+def delta_copy_log(source, destination):
+    """
+    Bring destination up to date with source reading only what was appended to source since the last copy.
+    The local copy is the record of what was fetched last time: its size is where reading resumes and the hash of 
+    its head (fingerprint_log_head) must match the head of source. Otherwise (rotated / truncated / no local copy) 
+    the entire file is copied.
+    Returns number of bytes read from source.
+    """
+    if os.path.exists(destination): 
+        local_size = os.path.getsize(destination)
+        local_fingerprint, length = fingerprint_log_head(destination)
+        with open(source, "rb") as remote: 
+            remote_head = remote.read(length)
+            remote_size = os.fstat(remote.fileno()).st_size
+            if length > 0 and remote_size >= local_size and hashlib.sha1(remote_head).hexdigest() == local_fingerprint: 
+                remote.seek(local_size)
+                with open(destination, "ab") as local: 
+                    shutil.copyfileobj(remote, local)
+                    appended = local.tell() - local_size
+                remote_stat = os.stat(source)
+                os.utime(destination, (remote_stat.st_atime, remote_stat.st_mtime)) # local mtime follows remote (fingerprint_log)
+                return length + appended
+    shutil.copy2(source, destination) # first fetch or rotated
+    return os.path.getsize(destination)
+
+def fetch_host_log(device):
+    """
+    Fetch stage: copy the log of a reachable host (see TecMFA_probe) over UNC into its own temp directory.
+    Returns local path to the copied log or None if the copy failed.
+    """
+    fetch_start = time.perf_counter()
+    try: 
+        local_log = host_log_path(device)
+        os.makedirs(os.path.dirname(local_log), exist_ok=True)
+        if delta_fetch: 
+            transferred = delta_copy_log(remote_log.format(host=device), local_log)
+        else: 
+            shutil.copy2(remote_log.format(host=device), local_log)
+            transferred = os.path.getsize(local_log)
+        print("{}, log file copied to temporary location for processing ({} bytes transferred)".format(device, transferred))
+        record_stage(device, "Fetch", time.perf_counter() - fetch_start, Bytes=transferred)
+        return local_log
+    except Exception as e: 
+        # print("Unable to copy log file:{}".format(device), e) # debug
+        record_stage(device, "Fetch", time.perf_counter() - fetch_start, error=e)
+        count_run_stat("Fetch_failed")
+        return None
+
+def parse_host_log(device, device_log):
+    """
+    CPU bound part of processing a log, runs in a parse_workers process. Returns (processed block, summary, timings)
+    of the instances added since the checkpoint. The log is read through stream_log & each instance is summarised 
+    (summary_add, sketches included) and turned into its row of the instances table (instance_row) as soon as it 
+    is parsed, so only the rows are held & sent back - block["Data"] is the list of those rows. The block holds 
+    the new checkpoint, saved by the parent once the rows are committed.
+    timings: {"Parse": seconds, "Summarise": seconds, "Line_errors": n} for record_stage in the parent. An exception 
+    is raised with .stage set to the stage it came from (attributes survive the trip back from the process).
+    """
+    timings = {"Summarise": 0.0}
+    stage = "Parse"
+    try: 
+        stage_start = time.perf_counter()
+        checkpoint = resume_checkpoint(device_log, device)
+        parse = {}
+        device_summarised = new_summary()
+        rows = []
+        for instance in stream_log(device_log, checkpoint, parse): # main processing
+            stage = "Summarise"
+            summarise_start = time.perf_counter()
+            summary_add(device_summarised, instance)
+            timings["Summarise"] += time.perf_counter() - summarise_start
+            stage = "Parse"
+            rows.append(instance_row(instance))
+        state = parse["State"]
+        processed_device_block = {
+            "Data": rows, "Username": state["Username"], 
+            "Hostname": state["Hostname"] if state["Hostname"] is not None else device, # no machineName line
+            "Checkpoint": new_checkpoint(device_log, parse), "Resumed": checkpoint is not None
+        }
+        timings["Line_errors"] = parse["Line_errors"]
+        timings["Parse"] = time.perf_counter() - stage_start - timings["Summarise"]
+
+        stage = "Summarise"
+        stage_start = time.perf_counter()
+        summary_finish(device_summarised)
+        timings["Summarise"] += time.perf_counter() - stage_start
+    except Exception as e: 
+        e.stage = stage
+        raise
+    return (processed_device_block, device_summarised, timings)
+
+run_stats = { # hosts processed / skipped as unchanged / failed at each stage, reset each window
+    "Processed": 0, "Unchanged": 0, "Unreachable": 0, "Fetch_failed": 0, "Failed": 0, "Render_seconds": 0.0
+}
+run_stats_lock = threading.Lock()
+
+def count_run_stat(key, amount=1): 
+    with run_stats_lock: 
+        run_stats[key] += amount
+
+run_stages = ["Probe", "Fetch", "Parse", "Summarise", "Commit", "Render"]
+run_metrics = {} # stage: {"Count", "Seconds", "Max", "Failed", + "Bytes" / "Instances" / "Line_errors"}, reset each window
+run_errors = {} # stage: {"<exception type>: <message>": count}, reset each window
+run_records = [] # records of record_stage not yet written to run_record, see write_run_records
+run_record_lock = threading.Lock()
+
+def reset_run_metrics(): 
+    with run_stats_lock: 
+        for key in run_stats: 
+            run_stats[key] = 0.0 if key == "Render_seconds" else 0
+    with run_record_lock: 
+        run_metrics.clear()
+        run_errors.clear()
+
+def write_run_records(): 
+    """
+    Append the records collected in run_records to run_record in one go - record_stage only keeps them in memory 
+    as it's called from the probe callbacks (event loop) & every worker. Called after probing, at the end of each 
+    sweep and with the summary of the window / batch.
+    """
+    with run_record_lock: 
+        records = run_records[:]
+        del run_records[:]
+        if not records: 
+            return
+        try: 
+            with open(run_record, "a") as run_file: 
+                run_file.write("".join(json.dumps(record) + "\n" for record in records))
+        except Exception as e: 
+            print("rr:", e)
+
+def record_stage(device, stage, seconds, error=None, **extra):
+    """
+    One stage (run_stages) of one host took seconds: queued for run_record (write_run_records) as 
+    {"Window", "Host", "Stage", "Seconds", "At", [extra e.g. Bytes], ["Error"]} and totalled in run_metrics.
+    error: exception the stage failed with, counted by stage & message in run_errors.
+    """
+    record = dict(
+        Window=run_window or "batch", Host=device, Stage=stage, Seconds=round(seconds, 4), 
+        At=dt.now().strftime("%Y-%m-%d %H:%M:%S"), **extra
+    )
+    if error is not None: 
+        record["Error"] = "{}: {}".format(type(error).__name__, error)
+    with run_record_lock: 
+        totals = run_metrics.setdefault(stage, {"Count": 0, "Seconds": 0.0, "Max": 0.0, "Failed": 0})
+        totals["Count"] += 1
+        totals["Seconds"] += seconds
+        totals["Max"] = max(totals["Max"], seconds)
+        for key in ("Bytes", "Instances", "Line_errors"): 
+            if key in extra: 
+                totals[key] = totals.get(key, 0) + extra[key]
+        if error is not None: 
+            totals["Failed"] += 1
+            errors = run_errors.setdefault(stage, {})
+            errors[record["Error"]] = errors.get(record["Error"], 0) + 1
+        run_records.append(record)
+
+def run_summary(seconds):
+    """
+    Summary of the window (or batch) that took seconds: run_stats counters, run_metrics per stage & run_errors.
+    Appended to run_record (Stage "Run") & returned.
+    """
+    with run_stats_lock: 
+        counters = dict(run_stats)
+    with run_record_lock: 
+        stages = dict((stage, dict(totals)) for stage, totals in run_metrics.items())
+        errors = dict((stage, dict(messages)) for stage, messages in run_errors.items())
+    summary = {
+        "Window": run_window or "batch", "Stage": "Run", "Version": collector_version, "Seconds": round(seconds, 1), 
+        "At": dt.now().strftime("%Y-%m-%d %H:%M:%S"), "Counters": counters, "Stages": stages, "Errors": errors
+    }
+    with run_record_lock: 
+        run_records.append(summary)
+    write_run_records() # with the records of the stages still waiting
+    return summary
+
+def print_run_summary(summary):
+    print("Run {Window} took {Seconds:.0f}s".format(**summary))
+    print("Hosts processed: {Processed}, skipped as log unchanged: {Unchanged}, unreachable: {Unreachable}, "
+          "fetch failed: {Fetch_failed}, failed processing: {Failed}".format(**summary["Counters"]))
+    print("{:<10} {:>7} {:>10} {:>8} {:>8} {:>14} {:>7}".format("stage", "count", "total s", "mean s", "max s", "bytes", "failed"))
+    for stage in run_stages: 
+        totals = summary["Stages"].get(stage)
+        if totals: 
+            print("{:<10} {:>7} {:>10.2f} {:>8.2f} {:>8.2f} {:>14} {:>7}".format(
+                stage, totals["Count"], totals["Seconds"], totals["Seconds"] / totals["Count"], totals["Max"], 
+                totals.get("Bytes", ""), totals["Failed"]
+            ))
+    for stage in summary["Errors"]: 
+        for error, count in sorted(summary["Errors"][stage].items(), key=lambda item: -item[1]): 
+            print("{} errors x{}: {}".format(stage, count, error))
+
+def fingerprint_log(path):
+    """
+    Size, mtime & hash of the last fingerprint_tail_bytes of the log - cheap way to tell the log hasn't changed.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as log: 
+        log.seek(max(0, size - fingerprint_tail_bytes))
+        tail = log.read()
+    return (size, os.path.getmtime(path), hashlib.sha1(tail).hexdigest())
+
+def log_unchanged(device, fingerprint):
+    """
+    True if fingerprint is the same as the one recorded (record_log_fingerprint) when the log was last processed.
+    """
+    try: 
+        with store_lock: 
+            row = open_event_store().execute(
+                "SELECT size, mtime, tail_hash FROM log_fingerprints WHERE host = ?", (device,)
+                ).fetchone()
+        return row is not None and tuple(row) == fingerprint
+    except Exception as e: 
+        print("f1:", e)
         return False
 
-def extract_current_selected_factor(line): 
-    """
-    Only occurs after Online authentication. 
-    Entry beyond |Info|
-    can be three outcomes: 
-        Current selected factor: sms:OKTA
-        Current selected factor: push:OKTA
-        Current selected factor: # blank i.e. remember for 24 hours OR logging in from office
-    Returns value depending on log entry.
-    """
-    temp = line[24:]
-    if "sms:OKTA" in temp: 
-        return "SMS:OKTA"
-    elif "push:OKTA" in temp: 
-        return "PUSH:OKTA"
-    else: # blank
-        return "24hr | Office"
-
-def extract_date_time(line):
+def record_log_fingerprint(device, fingerprint):
     try: 
-        index = line.find("|Info|")
-        if index == -1:
-            index = line.find("|Error|")
-        return line[:index].split(" ")
-    except Exception as e:
-        print("v:", e)
+        with store_lock: 
+            connection = open_event_store()
+            with connection: 
+                connection.execute("INSERT OR REPLACE INTO log_fingerprints VALUES (?,?,?,?)", (device,) + fingerprint)
+    except Exception as e: 
+        print("f2:", e)
+
+def process_host_log(device, device_log, parser_pool=None):
+    """
+    Process stage: parse (incrementally), summarise, commit & render a single fetched log.
+    Skipped entirely when the log hasn't changed since it was last processed.
+    parser_pool: ProcessPoolExecutor to parse in, None to parse in the calling thread.
+    """
+    fingerprint = fingerprint_log(device_log)
+    if log_unchanged(device, fingerprint): 
+        print("{}, log unchanged since last processed - skipped".format(device))
+        count_run_stat("Unchanged")
+        return
+
+    parse_start = time.perf_counter()
+    try: 
+        if parser_pool is None: 
+            parsed = parse_host_log(device, device_log)
+        else: 
+            parsed = parser_pool.submit(parse_host_log, device, device_log).result()
+    except Exception as e: 
+        record_stage(device, getattr(e, "stage", "Parse"), time.perf_counter() - parse_start, error=e)
+        count_run_stat("Failed")
+        raise
+
+    write_parsed_host(device, fingerprint, *parsed)
+
+def write_parsed_host(device, fingerprint, processed_device_block, device_summarised, timings):
+    """
+    Record the parse & summary timings of a parsed log (parse_host_log), then commit & queue its report. The 
+    checkpoint & fingerprint are only saved once the commit succeeded, otherwise this raises and the same 
+    instances are parsed again next attempt.
+    """
+    checkpoint = processed_device_block.pop("Checkpoint")
+    record_stage(
+        device, "Parse", timings["Parse"], Instances=len(processed_device_block["Data"]), Line_errors=timings["Line_errors"], 
+        Hostname=processed_device_block["Hostname"] # machineName of the log
+    )
+    record_stage(device, "Summarise", timings["Summarise"])
+    try: 
+        write_host_results(device, processed_device_block, device_summarised)
+    except Exception: 
+        count_run_stat("Failed")
+        raise
+    if checkpoint is not None: 
+        save_checkpoint(device, checkpoint)
+    record_log_fingerprint(device, fingerprint)
+    count_run_stat("Processed")
+
+def write_host_results(device, processed_device_block, device_summarised):
+    """
+    Commit summary & queue report of a parsed log for rendering.
+    """
+    commit_summarised_data_to_file(
+        device, block=processed_device_block, summary=device_summarised
+        ) # used for cummulative chart - (online end to end avg, offline end to end avg)
     
-def extract_log_entry(line):
-    return line[30:]
+    queue_render(device)
+
+def queue_render(device):
+    """
+    Add report of the host to render_queue, replacing one still waiting for the same host. The report itself is 
+    rendered from the store & named after the log's machineName (host_summaries hostname).
+    """
+    try: 
+        with store_lock: 
+            connection = open_event_store()
+            with connection: 
+                connection.execute(
+                    "INSERT OR REPLACE INTO render_queue (host, queued_at) VALUES (?,?)", (device, time.time())
+                )
+    except Exception as e: 
+        print("g1:", e)
+        record_stage(device, "Render", 0.0, error=e) # never queued
+
+def queued_renders():
+    """
+    Hosts waiting in render_queue, oldest first.
+    """
+    try: 
+        with store_lock: 
+            return [row[0] for row in open_event_store().execute("SELECT host FROM render_queue ORDER BY queued_at")]
+    except Exception as e: 
+        print("g2:", e)
+        return []
+
+def render_queued_report(host):
+    """
+    Runs in a render worker process: render the queued report of host - every stored instance of it & its running 
+    summary - & remove it from the queue (unless it was replaced by a newer one meanwhile). Own connection, the 
+    parent's can't be shared across processes.
+    Returns seconds spent rendering, None if it had already been rendered.
+    """
+    connection = sqlite3.connect(event_store, timeout=30)
+    try: 
+        row = connection.execute("SELECT queued_at FROM render_queue WHERE host = ?", (host,)).fetchone()
+        if row is None: # already rendered
+            return None
+        queued_at = row[0]
+        hostname, username, summary = load_host_summary(connection, host)
+        block = {"Data": stored_instances(connection, host), "Username": username, "Hostname": hostname}
+        render_start = time.perf_counter()
+        plot_graph(mode="graph: individual host", block=block, summary=summary)
+        render_seconds = time.perf_counter() - render_start
+        with connection: 
+            connection.execute("DELETE FROM render_queue WHERE host = ? AND queued_at = ?", (host, queued_at))
+        return render_seconds
+    finally: 
+        connection.close()
+
+def drain_render_queue(stop=None, workers=None):
+    """
+    Render everything in render_queue across workers (default render_workers) processes, 0 renders in this process.
+    stop: threading.Event - keep waiting for reports to be queued until it is set (i.e. collection finished), 
+    then return once the queue is empty. Without stop, return as soon as the queue is empty.
+    A report that fails to render is left in the queue for the next drain rather than retried by this one.
+    """
+    if workers is None: 
+        workers = render_workers
+    if workers > 0: 
+        render_pool = ProcessPoolExecutor(max_workers=workers)
+    else: 
+        render_pool = ThreadPoolExecutor(max_workers=1) # one at a time in this process
+    failed = set()
+    with render_pool: 
+        while True: 
+            hosts = [host for host in queued_renders() if host not in failed]
+            if hosts: 
+                renders = [(host, render_pool.submit(render_queued_report, host)) for host in hosts]
+                for host, render in renders: 
+                    try: 
+                        render_seconds = render.result()
+                    except Exception as e: 
+                        print("g3:", host, e)
+                        record_stage(host, "Render", 0.0, error=e)
+                        failed.add(host)
+                        continue
+                    if render_seconds is not None: 
+                        count_run_stat("Render_seconds", render_seconds)
+                        record_stage(host, "Render", render_seconds)
+            elif stop is None or stop.is_set(): 
+                return
+            else: 
+                stop.wait(render_poll_seconds)
+
+def collected_host_logs(directory):
+    """
+    Logs already fetched into directory, laid out as the temp dir: <directory>\<host>\TecMFALogs.txt
+    Returns [(host, path), ...] sorted by host.
+    """
+    host_logs = []
+    for device in sorted(os.listdir(directory)): 
+        device_log = os.path.join(directory, device, "TecMFALogs.txt")
+        if os.path.isfile(device_log): 
+            host_logs.append((device, device_log))
+    return host_logs
+
+def process_collected_logs(directory, workers=None):
+    """
+    Batch mode: parse every log in directory (see collected_host_logs) across workers processes.
+    Results come back in host order to this (single) writer which commits summaries & queues reports, so 
+    output is identical whatever the number of workers. A log that fails to parse or commit is recorded & counted 
+    as failed and the rest carry on. Queued reports are rendered once every log is parsed.
+    workers 0 parses & renders serially in this process.
+    """
+    if workers is None: 
+        workers = parse_workers
+    batch_start = time.time()
+    reset_run_metrics()
+    host_logs = []
+    fingerprints = []
+    for device, device_log in collected_host_logs(directory): 
+        fingerprint = fingerprint_log(device_log)
+        if log_unchanged(device, fingerprint): 
+            count_run_stat("Unchanged")
+        else: 
+            host_logs.append((device, device_log))
+            fingerprints.append(fingerprint)
+    if workers > 0: 
+        parser_pool = ProcessPoolExecutor(max_workers=workers)
+    else: 
+        parser_pool = ThreadPoolExecutor(max_workers=1) # one at a time, in order
+    with parser_pool: 
+        parses = [ # one future per host so a failed parse only fails that host
+            (device, fingerprint, parser_pool.submit(parse_host_log, device, device_log)) 
+            for (device, device_log), fingerprint in zip(host_logs, fingerprints)
+        ]
+        for device, fingerprint, parse in parses: # in host order
+            parse_start = time.perf_counter()
+            try: 
+                parsed = parse.result()
+            except Exception as e: 
+                print("b1:", device, e)
+                record_stage(device, getattr(e, "stage", "Parse"), time.perf_counter() - parse_start, error=e)
+                count_run_stat("Failed")
+                continue
+            try: 
+                write_parsed_host(device, fingerprint, *parsed)
+            except Exception as e: # recorded & counted by write_parsed_host
+                print("b2:", device, e)
+    drain_render_queue(workers=render_workers if workers > 0 else 0)
+
+    print("Batch processed {} logs from {}, {} unchanged & skipped, {} failed".format(
+        run_stats["Processed"], directory, run_stats["Unchanged"], run_stats["Failed"]
+    ))
+    print_run_summary(run_summary(time.time() - batch_start))
+
+def collect_hosts(hostlist_status, hosts=None, parser_pool=None):
+    """
+    One sweep over hosts (default: all unprocessed hosts in hostlist_status).
+    Hosts are taken in order of prioritise_hosts. Every host is probed at once (TecMFA_probe.probe_hosts) and put 
+    on a ready queue as it answers, meanwhile fetch_workers threads copy the logs of the best ranked hosts that answered and hand them to process_workers threads through 
+    a queue bounded by pipeline_queue_depth - when parsing falls behind, fetch workers block on the queue rather than filling the temp dir.
+    Hosts are marked True in hostlist_status once processed, hosts that couldn't be fetched get a retry timer 
+    (schedule_retry). Fetching stops once outside of the active time range.
+    Process workers hand the CPU bound parsing to parser_pool (ProcessPoolExecutor, one per window - see 
+    run_collection_window), None parses in the process workers' threads. A host that fails processing gets a 
+    retry timer too.
+    """
+    ready = queue.PriorityQueue() # (rank, host) of reachable hosts, from the probe thread - best rank fetched first
+    fetched = queue.Queue(maxsize=pipeline_queue_depth)
+    done = object() # sentinel, one per fetch / process worker
+
+    unanswered = [] # unreachable hosts, given their retry timers once probing is over (store writes)
+
+    def reachable(device): 
+        record_stage(device, "Probe", time.perf_counter() - probe_start, Reachable=True)
+        ready.put((rank[device], device))
+
+    def unreachable(device): 
+        record_stage(device, "Probe", time.perf_counter() - probe_start, Reachable=False)
+        count_run_stat("Unreachable")
+        unanswered.append(device)
+
+    def fetch_stage(): 
+        while True: 
+            device = ready.get()[1]
+            if device is done: 
+                return
+            if not active_time_range(start=start_time, end=end_time): 
+                continue # ensure schedule runs in window only
+            device_log = fetch_host_log(device)
+            if device_log: 
+                record_collection(device, os.path.getsize(device_log))
+                fetched.put((device, device_log)) # blocks while queue is full
+            else: 
+                schedule_retry(device) # copy failed
+
+    def process_stage(): 
+        while True: 
+            item = fetched.get()
+            if item is done: 
+                return
+            device, device_log = item
+            try: 
+                process_host_log(device, device_log, parser_pool)
+                mark_host_processed(hostlist_status, device)
+            except Exception as e: 
+                print("q2:", device, e)
+                schedule_retry(device) # parse / commit failed
+
+    pending = hosts if hosts is not None else [device for device in hostlist_status if hostlist_status[device] == False] # not yet processed
+    pending = prioritise_hosts(pending)
+    rank = dict((device, i) for i, device in enumerate(pending))
+    with ThreadPoolExecutor(max_workers=process_workers) as processors: 
+        for _ in range(process_workers): 
+            processors.submit(process_stage)
+        try: 
+            with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers: 
+                futures = [fetchers.submit(fetch_stage) for _ in range(fetch_workers)]
+                try: 
+                    probe_start = time.perf_counter() # probe seconds of a host: until it answered / timed out
+                    probe_hosts(pending, reachable, unreachable, probed=record_availability) # cached answers aren't counted
+                finally: 
+                    for i in range(fetch_workers): 
+                        ready.put((len(pending) + i, done)) # after every host, unique rank so done is never compared
+                schedule_retries(unanswered)
+                write_run_records() # probe records, kept in memory while the event loop ran
+                for future in futures: 
+                    try: 
+                        future.result()
+                    except Exception as e: 
+                        print("q1:", e)
+        finally: 
+            for _ in range(process_workers): 
+                fetched.put(done)
+            save_host_histories(pending) # availability & collections of the sweep, one transaction
+            write_run_records()
+
+host_history = None # host: {"Last_seen", "Last_collected", "Log_size", "Growth", "Availability"}, see load_host_history
+host_history_lock = threading.Lock()
+
+def load_host_history():
+    """
+    host_history from event_store, read once. Per host: 
+    Last_seen / Last_collected: epoch seconds the host last answered a probe / had its log fetched (None if never)
+    Log_size: bytes of the log when last fetched, Growth: bytes per day the log grows (None until fetched twice)
+    Availability: {"<hour of day>": [probes, answered], n}
+    """
+    global host_history
+    with host_history_lock: 
+        if host_history is None: 
+            history = dict()
+            try: 
+                with store_lock: 
+                    rows = open_event_store().execute(
+                        "SELECT host, last_seen, last_collected, log_size, growth, availability FROM host_history"
+                        ).fetchall()
+                for host, last_seen, last_collected, log_size, growth, availability in rows: 
+                    history[host] = {
+                        "Last_seen": last_seen, "Last_collected": last_collected, "Log_size": log_size, 
+                        "Growth": growth, "Availability": json.loads(availability)
+                    }
+            except Exception as e: 
+                print("h1:", e)
+            host_history = history
+    return host_history
+
+def save_host_histories(devices): 
+    """
+    host_history entries of devices to event_store in one transaction - record_availability & record_collection 
+    only update memory, this is called once per sweep.
+    """
+    history = load_host_history()
+    with host_history_lock: 
+        rows = [
+            (
+                device, entry["Last_seen"], entry["Last_collected"], entry["Log_size"], entry["Growth"], 
+                json.dumps(entry["Availability"])
+            ) for device, entry in ((device, history.get(device)) for device in devices) if entry is not None
+        ]
+    try: 
+        with store_lock: 
+            connection = open_event_store()
+            with connection: 
+                connection.executemany("INSERT OR REPLACE INTO host_history VALUES (?,?,?,?,?,?)", rows)
+    except Exception as e: 
+        print("h2:", e)
+
+def host_history_entry(history, device): 
+    return history.setdefault(
+        device, {"Last_seen": None, "Last_collected": None, "Log_size": None, "Growth": None, "Availability": {}}
+        )
+
+def record_availability(device, reachable): # device was probed (not answered from the cache)
+    history = load_host_history()
+    with host_history_lock: 
+        entry = host_history_entry(history, device)
+        hour = entry["Availability"].setdefault(str(dt.now().hour), [0, 0])
+        hour[0] += 1
+        if reachable: 
+            hour[1] += 1
+            entry["Last_seen"] = time.time()
+
+def record_collection(device, log_size): 
+    """
+    Log of device fetched, log_size bytes. Growth is averaged with the previous growth (exponential moving 
+    average) so one quiet / busy day doesn't decide the order on its own. Saved with the sweep (save_host_histories).
+    """
+    history = load_host_history()
+    now = time.time()
+    with host_history_lock: 
+        entry = host_history_entry(history, device)
+        if entry["Last_collected"] is not None and entry["Log_size"] is not None and now > entry["Last_collected"]: 
+            growth = max(0, log_size - entry["Log_size"]) / ((now - entry["Last_collected"]) / 86400) # smaller if rotated
+            entry["Growth"] = growth if entry["Growth"] is None else (entry["Growth"] + growth) / 2
+        entry["Last_collected"] = now
+        entry["Log_size"] = log_size
+
+def host_priority(entry, hour, now, fleet_growth): 
+    """
+    Expected value of attempting the host now: chance it answers at this hour of day (answered + 1) / (probes + 2) 
+    times the log it's expected to have grown by since last collected (its growth, or the fleet's median growth, 
+    per day x days since). Never collected hosts are never_collected_days stale.
+    """
+    probes, answered = entry["Availability"].get(hour, [0, 0])
+    online = (answered + 1) / (probes + 2)
+    if entry["Last_collected"] is None: 
+        stale_days = never_collected_days
+    else: 
+        stale_days = max(0, now - entry["Last_collected"]) / 86400
+    growth = entry["Growth"] if entry["Growth"] is not None else fleet_growth
+    return online * stale_days * growth
+
+def prioritise_hosts(hosts):
+    """
+    hosts ordered by host_priority, highest first - hosts likely to be online with the most data waiting are 
+    collected before the window closes. Equal priorities keep the order of hosts (hostlist.txt).
+    """
+    history = load_host_history()
+    now = time.time()
+    hour = str(dt.now().hour)
+    with host_history_lock: 
+        growths = sorted(entry["Growth"] for entry in history.values() if entry["Growth"])
+        fleet_growth = growths[len(growths) // 2] if growths else 1 # median
+        priorities = dict(
+            (host, host_priority(history.get(host) or host_history_entry({}, host), hour, now, fleet_growth)) for host in hosts
+        )
+    return sorted(hosts, key=lambda host: -priorities[host])
+
+run_window = None # "YYYY-MM-DD HH:MM" start of the window being collected, key of its run_hosts rows
+host_retries = {} # host: {"Attempts": n, "Next_attempt": epoch seconds} for hosts of run_window not fetched yet
+
+def window_bounds(day): 
+    return (
+        dt.combine(day, t(start_time[0], start_time[1])), dt.combine(day, t(end_time[0], end_time[1]))
+    )
+
+def next_window(now):
+    """
+    (start, end) datetimes of the window now is in, otherwise of the next one.
+    """
+    start, end = window_bounds(now.date())
+    if now >= end: # today's window has closed
+        start, end = window_bounds(now.date() + timedelta(days=1))
+    return (start, end)
 
-def extract_ip_1(line): 
-    return line[42:]
+def window_finished(window): 
+    with store_lock: 
+        row = open_event_store().execute("SELECT finished FROM run_windows WHERE window = ?", (window,)).fetchone()
+    return row is not None and row[0] == 1
+
+def finish_window(window): 
+    try: 
+        with store_lock: 
+            connection = open_event_store()
+            with connection: 
+                connection.execute("INSERT OR REPLACE INTO run_windows VALUES (?,1)", (window,))
+    except Exception as e: 
+        print("s3:", e)
+
+def load_run_state(window, hosts):
+    """
+    hostlist_status of window (hosts done since the window opened are True) & host_retries from run_hosts - 
+    what a restart during the window resumes from. Hosts not seen in the window yet are added as not done.
+    """
+    host_retries.clear()
+    hostlist_status = dict((host, False) for host in hosts)
+    with store_lock: 
+        connection = open_event_store()
+        rows = connection.execute("SELECT host, done, attempts, next_attempt FROM run_hosts WHERE window = ?", (window,)).fetchall()
+        with connection: 
+            connection.execute("INSERT OR IGNORE INTO run_windows VALUES (?,0)", (window,))
+    for host, done, attempts, next_attempt in rows: 
+        if host not in hostlist_status: # removed from hostlist.txt since
+            continue
+        hostlist_status[host] = done == 1
+        if attempts: 
+            host_retries[host] = {"Attempts": attempts, "Next_attempt": next_attempt}
+    return hostlist_status
+
+def save_host_state(device, done):
+    save_host_states([device], done)
+
+def save_host_states(devices, done): # run_hosts rows of devices in one transaction
+    if run_window is None or not devices: # not scheduled e.g. called from --batch
+        return
+    rows = []
+    for device in devices: 
+        retry = host_retries.get(device, {"Attempts": 0, "Next_attempt": 0})
+        rows.append((run_window, device, 1 if done else 0, retry["Attempts"], retry["Next_attempt"]))
+    try: 
+        with store_lock: 
+            connection = open_event_store()
+            with connection: 
+                connection.executemany("INSERT OR REPLACE INTO run_hosts VALUES (?,?,?,?,?)", rows)
+    except Exception as e: 
+        print("s4:", e)
 
-def extract_ip_2(line):
-    return line[10:]
+def mark_host_processed(hostlist_status, device): 
+    hostlist_status[device] = True # mark as done
+    save_host_state(device, True)
 
-def extract_username(line):
-    return line[12:]
+def schedule_retry(device):
+    schedule_retries([device])
 
-def previous_reset_time(prev, now):
-    if last_run == None: # first run
-        return True 
+def schedule_retries(devices):
+    """
+    Hosts couldn't be probed, fetched or processed - each not attempted again for retry_backoff_seconds, doubling 
+    with each of its failures up to retry_backoff_max_seconds, instead of with every sweep. Their cached probes are 
+    dropped so the retry probes them again - probe_cache_ttl is longer than the first backoff.
+    """
+    for device in devices: 
+        forget_probe(device)
+        retry = host_retries.setdefault(device, {"Attempts": 0, "Next_attempt": 0})
+        retry["Attempts"] += 1
+        retry["Next_attempt"] = time.time() + min(retry_backoff_seconds * 2 ** (retry["Attempts"] - 1), retry_backoff_max_seconds)
+    save_host_states(devices, False) # one transaction for the lot
+
+def hosts_due(hostlist_status, now):
+    return [
+        host for host in hostlist_status 
+        if hostlist_status[host] == False and host_retries.get(host, {"Next_attempt": 0})["Next_attempt"] <= now
+    ]
+
+def run_collection_window(start, end):
+    """
+    Collect every host of hostlist.txt between start & end (datetimes of the window). Hosts are fetched as soon 
+    as they are due - all at first, then each failed host when its retry timer expires - and the scheduler sleeps 
+    until the next timer rather than sweeping every few seconds. Progress is kept in run_hosts so a restart 
+    resumes the window. Returns False if the window had already been completed (e.g. restart after it finished).
+    """
+    global run_window
+    run_window = start.strftime("%Y-%m-%d %H:%M")
+    if window_finished(run_window): 
+        return False
+    hostlist_status = load_run_state(run_window, generate_hostlist(hostlist))
+    print("Collection window {} - {} hosts, {} already processed".format(
+        run_window, len(hostlist_status), len([h for h in hostlist_status if hostlist_status[h]])
+    ))
+    window_start = time.time()
+    reset_run_metrics()
+    render_stop = threading.Event()
+    if render_during_window: # reports rendered while the next hosts are collected
+        renderer = threading.Thread(target=drain_render_queue, args=(render_stop,))
+        renderer.start()
+    parser_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None # for the whole window
+    while not all_hosts_processed(hostlist_status) and dt.now() < end: 
+        due = hosts_due(hostlist_status, time.time())
+        if not due: # sleep until the next retry timer, or the window closes
+            wake = min(
+                host_retries.get(h, {"Next_attempt": 0})["Next_attempt"] for h in hostlist_status if hostlist_status[h] == False
+            )
+            time.sleep(max(0, min(wake - time.time(), (end - dt.now()).total_seconds())))
+            continue
+        try: 
+            collect_hosts(hostlist_status, due, parser_pool)
+        except Exception as e:
+            print("q:", e)
+        now = time.time()
+        schedule_retries([ # neither processed nor given a retry timer by the sweep (e.g. it failed), else due again at once
+            h for h in due if hostlist_status[h] == False and host_retries.get(h, {"Next_attempt": 0})["Next_attempt"] <= now
+        ])
+        remaining_hosts = [h for h in hostlist_status if hostlist_status[h] == False]
+        print("Number of remaining hosts in hostlist that weren't processed:", len(remaining_hosts))
+        print("Remaining hosts that cannot be processed:", remaining_hosts)
+    if parser_pool is not None: 
+        parser_pool.shutdown()
+    print("Either all hosts processed or have exceeded active time window")
+    finish_window(run_window)
+    render_stop.set()
+    if render_during_window: 
+        renderer.join()
     else: 
-        difference = dt.now() - prev
-        if difference.total_seconds() >= 86400: # 24 hours
-            return True
-        else:
-            return False
+        drain_render_queue()
+    print("Hostlist status as follows: {}".format(hostlist_status))
+    print_run_summary(run_summary(time.time() - window_start))
+    return True
 
 if __name__ == "__main__": 
-    last_run = None
+    arguments = argparse.ArgumentParser(description="Collect, parse & report on TecMFA logs of hosts in hostlist.txt")
+    arguments.add_argument("--batch", metavar="DIR", help="process logs already collected in DIR (<DIR>\\<host>\\TecMFALogs.txt) then exit")
+    arguments.add_argument("--workers", type=int, default=parse_workers, help="parse processes (default: number of cores)")
+    arguments.add_argument("--summary", action="store_true", help="print the summary of every stored instance of the fleet then exit")
+    arguments.add_argument("--since", metavar="YYYY-MM-DD", help="with --summary, only instances from this day on")
+    args = arguments.parse_args()
+    parse_workers = args.workers
+
+    if args.summary: 
+        print(json.dumps(load_fleet_summary(since=args.since), indent=4))
+        raise SystemExit
+
+    if args.batch: 
+        create_nonexistent_directories()
+        process_collected_logs(args.batch, parse_workers)
+        raise SystemExit
+
     while True:
         try:
-            time.sleep(10)
-            print("Snoozing...")
-            if active_time_range(start=start_time, end=end_time):
-                create_nonexistent_directories() 
-                if previous_reset_time(last_run, dt.now()): # 24 hours elapsed
-                    last_run = dt.now()
-                    hostlist_status = generate_hostlist(hostlist) # all initialised as false
-                    while not all_hosts_processed(hostlist_status):
-                        time.sleep(5)
-                        try: 
-                            if not active_time_range(start=start_time, end=end_time): 
-                                break # ensure schedule runs in window only
-                            else: # greenlight
-                                for device in hostlist_status:
-                                    if hostlist_status[device] == False: # not yet processed
-                                        if ping_host(device): # pingable
-                                            if map_source_location(r"\\{}\c$".format(device)): # map to location # copy
-                                                try: 
-                                                    shutil.copyfile(
-                                                        r"Z:\Program Files\TecMFA\Logs\TecMFALogs.txt", r"{}\TecMFALogs.txt".format(temporary_dir)
-                                                        )
-                                                    print("{}, log file copied to temporary location for processing".format(device))
-                                                except Exception as e:
-                                                    # print("Unable to copy log file:{}".format(device), e) # debug
-                                                    continue
-                                                device_log = obtain_raw_log_file_n_path(temporary_dir)[0]
-                                                
-                                                processed_device_block = process_log(device_log) # main processing, returns block
-
-                                                device_summarised = calculate_summary_table_data(processed_device_block)
-
-                                                commit_summarised_data_to_file(
-                                                    summary=device_summarised, latest_log=device_log
-                                                    ) # used for cummulative chart - (online end to end avg, offline end to end avg)
-                                                
-                                                plot_graph(mode="graph: individual host", block=processed_device_block, summary=device_summarised)
-
-                                                hostlist_status[device] = True # mark as done
-                                            else:
-                                                continue
-                        except Exception as e:
-                            print("q:", e)
-                        remaining_hosts = [h for h in hostlist_status if h == False]
-                        print("Number of remaining hosts in hostlist that weren't processed:", len(remaining_hosts))
-                        print("Remaining hosts that cannot be processed:", remaining_hosts)
-                    print("Either all hosts processed or have exceeded active time window")
-                    print("Hostlist status as follows: {}".format(hostlist_status))
-                else:
-                    time.sleep(5)
-                    continue
-
-                try:
-                    print("Outside of active time range: {} to {}".format(start_time, end_time))
-                    cumulative_devices_summary = extract_averages_from_file("summary", average_output_end_to_end) # == {hostname: [[1,2],[2,3], n], hostname2: [[1,2],[2,3], n]}
-                    cumulative_okta_end_to_end_summary = extract_averages_from_file("okta", average_output_okta_to_end)
-                    print("Processing average report.")
-                    plot_graph(mode="graph: cumulative", block=cumulative_devices_summary)
-                    plot_graph(mode="graph: violin", block=cumulative_okta_end_to_end_summary)
-                except Exception as e:
-                    print("r:", e)
+            start, end = next_window(dt.now())
+            if dt.now() < start: 
+                print("Snoozing until {}".format(start))
+                time.sleep((start - dt.now()).total_seconds()) # no polling, wake when the window opens
+                continue
+            create_nonexistent_directories() 
+            if not run_collection_window(start, end): 
+                print("Window {} already completed, snoozing until it closes".format(start))
+                time.sleep(max(0, (end - dt.now()).total_seconds()))
+                continue
 
-                time.sleep(5)
+            try:
+                print("Outside of active time range: {} to {}".format(start_time, end_time))
+                cumulative_devices_summary = load_averages_from_store("summary") # == {hostname: [[1,2],[2,3], n], hostname2: [[1,2],[2,3], n]}
+                cumulative_okta_end_to_end_summary = load_averages_from_store("okta")
+                print("Processing average report.")
+                if len(cumulative_devices_summary["Data"]) <= fleet_chart_max_hosts: 
+                    plot_graph(mode="graph: cumulative", block=cumulative_devices_summary)
+                else: 
+                    print("{} hosts, cumulative chart skipped - see .\\dashboard\\index.html".format(len(cumulative_devices_summary["Data"])))
+                plot_graph(mode="graph: violin", block=cumulative_okta_end_to_end_summary)
+                fleet_quantiles = load_quantiles_from_store()
+                print("Fleet durations (sec): {}".format(fleet_quantiles["Fleet"]))
+                for network_type in fleet_quantiles["Network_type"]: 
+                    print("{} durations (sec): {}".format(network_type, fleet_quantiles["Network_type"][network_type]))
+            except Exception as e:
+                print("r:", e)
+            try: 
+                build_dashboard(event_store) # only days ingested into since the last build are aggregated again
+            except Exception as e: 
+                print("r2:", e)
         except Exception as e:
             print("m:", e)
             time.sleep(3)